@@ -1,12 +1,33 @@
-
-
 import os
 import sys
 import time
 import re
+import math
+import wave
+import tempfile
+import signal
+import array
+import collections
 import subprocess
 import webbrowser
+import urllib.request
+import urllib.parse
+import socket
+import struct
+import zlib
+import zipfile
+import base64
+import itertools
+import concurrent.futures
+import multiprocessing
+import json
+import shlex
+import hmac
+import secrets
+import sqlite3
+import threading
 from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
 # External libs (may be installed by run_pink.bat)
 try:
@@ -22,6 +43,40 @@ except Exception as e:
     print("Error:", e)
     raise
 
+# Win32 event hooks (window title / focus changes) via ctypes
+if sys.platform == "win32":
+    import ctypes
+    from ctypes import wintypes
+
+# optional local recognizer (offline, grammar-constrained decoding)
+try:
+    import vosk
+    vosk.SetLogLevel(-1)
+except Exception:
+    vosk = None
+
+# optional: numpy for echo cancellation, soundcard for speaker loopback capture
+try:
+    import numpy as np
+except Exception:
+    np = None
+try:
+    import soundcard
+except Exception:
+    soundcard = None
+
+# optional: audio tags for the local music library
+try:
+    import mutagen
+except Exception:
+    mutagen = None
+
+# optional frame-level voice activity detector (energy VAD is used otherwise)
+try:
+    import webrtcvad
+except Exception:
+    webrtcvad = None
+
 # optional for reliable window coordinates and window activation
 try:
     import pygetwindow as gw
@@ -41,9 +96,84 @@ CONFIG = {
         "vscode": "code.exe",
         "cmd": "cmd.exe",
         "notepad": "notepad.exe"
-    }
+    },
+    "asr_backend": "vosk",      # "vosk" (local, grammar-constrained) or "google"; vosk falls back to google
+    "vosk_model_path": os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", "vosk-model-small-en-us-0.15"),
+    "vad": {                    # endpointing; set "enabled": False for SpeechRecognition's energy listen()
+        "enabled": True,
+        "frame_ms": 30,
+        "hangover_ms": 200,     # trailing silence that ends an utterance
+        "pre_roll_ms": 150,
+        "aggressiveness": 2,    # webrtcvad 0-3
+    },
+    "echo": {                   # suppress recognition of our own replies / playing media
+        "enabled": True,
+        "delay_ms": 80,         # speaker -> mic latency used to align the reference
+        "tail_ms": 300,         # keep gating this long after playback ends
+    },
+    "asr_pool": {               # hedged recognition across backends
+        "confidence": 0.6,      # first result at/above this wins
+        "max_hedge_delay": 1.0, # seconds to wait on the primary before hedging
+        "remote_url": None,     # optional HTTP engine, e.g. "http://127.0.0.1:8766/recognize"
+        "cloud_fallback": False,  # also hedge to Google's web API; used anyway when nothing local is available
+    },
+    "power_sample_interval": 30,  # seconds between battery / AC checks
+    "playback_verify_timeout": 1.5,  # max wait for Spotify's title to confirm play/next/pause
+    "profile_dir": os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles"),  # sampling profiler output
+    "youtube_cdp": True,        # drive YouTube over DevTools when the browser was started with
+    "youtube_cdp_port": 9222,   # --remote-debugging-port=9222; keystrokes are the fallback
+    "intent_fallback": {        # classifier for paraphrases no keyword branch matches (needs numpy)
+        "enabled": True,
+        "min_confidence": 0.3,
+        "min_margin": 0.04,
+        "model_path": os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", "pink-intents.npz"),
+    },
+    "music_library": {          # local files for "pink play <song>" (Spotify is the fallback)
+        "enabled": True,
+        "folders": [os.path.join(os.path.expanduser("~"), "Music")],
+        "db_path": os.path.join(os.path.dirname(os.path.abspath(__file__)), "music_index.sqlite3"),
+        "rescan_interval": 1800,
+        "player": None,         # e.g. 'vlc --one-instance "{path}"'; None = default file association
+    },
+    "dictation": {              # "pink dictate": type what you say into the focused window
+        "stop_phrases": ["stop dictation", "end dictation"],
+        "idle_timeout": 30,     # seconds of silence that also end dictation
+    },
+    "touchscreen": {            # touchless mode runs in a supervised worker process
+        "prewarm": False,       # spawn it (and load MediaPipe) at startup instead of on first use
+        "sensitivity": 5,       # 1..10: pinch-to-click / scroll distance
+        "max_restarts": 3,      # consecutive crash restarts before giving up
+        "restart_backoff": 0.5, # seconds before the first restart, doubling per consecutive crash
+    },
+    "sessions": [],             # --multi: [{"name": "desk", "device_index": 1, "wake_word": "pink"}, ...]
+    "control_api": True,        # local HTTP API for text commands / status (loopback only)
+    "control_host": "127.0.0.1",
+    "control_port": 8765,
+    "control_token": None,      # required by /command and /status; None = generated once into control_token.txt
 }
 
+# ========== Process helpers ==========
+def _shell(cmd):
+    """
+    Run a shell command (start / taskkill / ms-settings). Kept as a single seam so the
+    benchmark's fake process backend can replace it.
+    """
+    return os.system(cmd)
+
+def _spawn(argv, env=None):
+    """
+    Start a program from an argument list. No shell is involved, so app names, file paths
+    and spoken text can never be parsed as commands.
+    """
+    return subprocess.Popen(argv, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=env)
+
+def _open_target(target):
+    """Hand a program name, file or URI to the OS launcher (ShellExecute / xdg-open), shell-free."""
+    if sys.platform == "win32":
+        os.startfile(target)
+    else:
+        _spawn(["xdg-open", target])
+
 # ========== Number parsing helpers ==========
 _number_words = {
     "zero":0,"one":1,"two":2,"three":3,"four":4,"five":5,"six":6,"seven":7,"eight":8,"nine":9,
@@ -88,14 +218,923 @@ def _extract_number_from_text(text):
         return max(0, min(100, int(total)))
     return None
 
+def _number_to_words(n):
+    n = int(n)
+    if n == 100:
+        return "hundred"
+    names = {v: k for k, v in _number_words.items()}
+    if n in names:
+        return names[n]
+    tens, ones = divmod(n, 10)
+    return f"{names[tens * 10]} {names[ones]}"
+
+def _numbers_to_digits(text):
+    """
+    Rewrite spoken number runs as digits ("select forty five" -> "select 45") so local
+    recognizer output matches what the digit-based command parser expects.
+    """
+    out, run = [], []
+    def flush():
+        if run:
+            out.append(str(_extract_number_from_text(" ".join(run))))
+            run.clear()
+    for w in (text or "").split():
+        if w in _number_words:
+            run.append(w)
+        else:
+            flush()
+            out.append(w)
+    flush()
+    return " ".join(out)
+
+# ========== Command grammar ==========
+# Registered intents and the spoken templates that reach them (mirrors what.txt).
+# Slots: <number> (0-100, spoken), <app> (CONFIG["app_paths"] names), <query> (free text).
+INTENT_PHRASES = {
+    "spotify_search": ["search spotify <query>"],
+    "spotify_select": ["select <number>", "select number <number>"],
+    "spotify_play": ["play"],
+    "spotify_play_nth": ["play <number>"],
+    "local_play": ["play <query>"],
+    "library_rescan": ["rescan music", "rescan music library"],
+    "spotify_playpause": ["hold", "stop", "resume", "playpause"],
+    "spotify_next": ["next"],
+    "spotify_previous": ["previous", "back"],
+    "spotify_volume_up": ["spotify volume up", "spotify louder", "spotify volume up <number>"],
+    "spotify_volume_down": ["spotify volume down", "spotify quieter", "spotify volume down <number>"],
+    "spotify_shuffle": ["shuffle"],
+    "spotify_like": ["like", "save", "heart"],
+    "spotify_open": ["open spotify"],
+    "youtube_open": ["open youtube"],
+    "youtube_play": ["play <query> on youtube"],
+    "youtube_search": ["search <query> on youtube"],
+    "youtube_next": ["youtube next", "next video"],
+    "youtube_forward": ["youtube forward", "youtube forward <number>", "youtube forward <number> seconds",
+                        "youtube fast forward <number>", "youtube fast forward <number> seconds"],
+    "youtube_rewind": ["youtube rewind", "youtube rewind <number>", "youtube rewind <number> seconds",
+                       "youtube back <number>", "youtube back <number> seconds"],
+    "youtube_seek_to": ["youtube restart", "youtube go to <number> seconds", "youtube go to <number> minutes",
+                        "youtube jump to <number> seconds", "youtube jump to <number> minutes"],
+    "youtube_close": ["close youtube", "close video"],
+    "youtube_speed": ["youtube speed <number>", "youtube double speed", "youtube half speed", "youtube normal speed"],
+    "brightness": ["set brightness to <number>", "increase brightness", "increase brightness by <number>",
+                   "decrease brightness", "decrease brightness by <number>", "brightness up", "brightness down"],
+    "volume": ["set volume to <number>", "increase volume", "increase volume by <number>",
+               "decrease volume", "decrease volume by <number>", "mute"],
+    "settings": ["open settings", "open settings wifi", "open settings display", "open settings sound",
+                 "open settings battery", "open settings bluetooth"],
+    "battery": ["battery"],
+    "time": ["time"],
+    "app_open": ["open <app>"],
+    "app_close": ["close <app>"],
+    "shutdown": ["shutdown", "sleep"],
+    "dictation_start": ["dictate", "start dictation"],
+    "dictation_stop": ["stop dictation", "end dictation"],
+    "touchscreen_start": ["activate touchscreen mode"],
+    "touchscreen_stop": ["stop touchscreen", "stop touchscreen mode", "deactivate touchscreen mode"],
+    "touchscreen_sensitivity": ["touchscreen sensitivity <number>"],
+    "now_playing": ["what's playing", "what is playing", "what song is this"],
+    "profiler_start": ["start profiler", "start profiling"],
+    "profiler_stop": ["stop profiler", "stop profiling"],
+}
+
+class CommandGrammar:
+    """
+    Closed command grammar generated from INTENT_PHRASES, app names and number words.
+    Expansions are cached per intent so adding an app or intent only re-expands the
+    templates it touches; `version` bumps whenever the phrase list changes.
+    """
+    def __init__(self, intents=None, apps=None, wake_word=None):
+        self.wake_word = wake_word or CONFIG["wake_word"]
+        self._intents = {k: list(v) for k, v in (intents or INTENT_PHRASES).items()}
+        self._apps = set(apps if apps is not None else CONFIG["app_paths"].keys())
+        self._numbers = [_number_to_words(n) for n in range(101)]
+        self._expanded = {}
+        self._json = None
+        self._closed = None
+        self.version = 0
+        self._free_text = []
+        for name in self._intents:
+            self._expand_intent(name)
+
+    def _expand_template(self, template):
+        if "<query>" in template:
+            # free text can't be decoded against the grammar: keep the fixed words only,
+            # [unk] absorbs the query and triggers an open-vocabulary pass
+            return [" ".join(w for w in template.split() if w != "<query>")]
+        phrases = [template]
+        for slot, values in (("<number>", self._numbers), ("<app>", sorted(self._apps))):
+            if slot in template:
+                phrases = [p.replace(slot, v) for p in phrases for v in values]
+        return phrases
+
+    def _expand_intent(self, name):
+        self._expanded[name] = [f"{self.wake_word} {p}" for t in self._intents[name] for p in self._expand_template(t)]
+        self._free_text = [self._free_text_pattern(t) for ts in self._intents.values() for t in ts if "<query>" in t]
+        self._json = None
+        self._closed = None
+        self.version += 1
+
+    @staticmethod
+    def _free_text_pattern(template):
+        parts = [re.escape(p.strip()) for p in template.split("<query>")]
+        return re.compile(r"^" + r"\b.*\b".join(p for p in parts if p) + (r"\b.*" if template.endswith("<query>") else r"$"))
+
+    def register_intent(self, name, templates):
+        self._intents[name] = list(templates)
+        self._expand_intent(name)
+
+    def add_app(self, name):
+        name = name.lower().strip()
+        if name and name not in self._apps:
+            self._apps.add(name)
+            for intent, templates in self._intents.items():
+                if any("<app>" in t for t in templates):
+                    self._expand_intent(intent)
+
+    def remove_app(self, name):
+        name = name.lower().strip()
+        if name in self._apps:
+            self._apps.discard(name)
+            for intent, templates in self._intents.items():
+                if any("<app>" in t for t in templates):
+                    self._expand_intent(intent)
+
+    def phrases(self):
+        return [p for name in self._intents for p in self._expanded[name]]
+
+    def to_json(self):
+        if self._json is None:
+            self._json = json.dumps(sorted(set(self.phrases())) + ["[unk]"])
+        return self._json
+
+    def needs_open_vocab(self, text):
+        """
+        True when a grammar decode landed on a free-text slot (e.g. "search spotify ...")
+        and the audio should be re-decoded with the open vocabulary.
+        """
+        t = (text or "").lower().strip()
+        if self.wake_word not in t:
+            return False
+        if "[unk]" in t:
+            return True
+        if self._closed is None:
+            self._closed = set(self.phrases())
+        if t in self._closed:
+            return False    # a closed phrase such as "play two" or a bare "play": no free text
+        c = t.replace(self.wake_word, "", 1).strip()
+        return any(p.search(c) for p in self._free_text)
+
+_VOSK_MODELS = {}
+_VOSK_MODELS_LOCK = threading.Lock()
+
+def _load_vosk_model(path):
+    """One vosk.Model per path per process; every recognizer/session shares it."""
+    path = os.path.abspath(path)
+    with _VOSK_MODELS_LOCK:
+        if path not in _VOSK_MODELS:
+            _VOSK_MODELS[path] = vosk.Model(path)
+        return _VOSK_MODELS[path]
+
+class GrammarRecognizer:
+    """
+    Local Vosk recognizer that decodes against CommandGrammar first and only falls back
+    to the open vocabulary for free-text slots. The model is loaded once.
+    """
+    def __init__(self, model_path, grammar, sample_rate=16000):
+        if vosk is None:
+            raise RuntimeError("vosk is not installed")
+        self.model = _load_vosk_model(model_path)
+        self.grammar = grammar
+        self.sample_rate = sample_rate
+        self._command_rec = None
+        self._command_version = -1
+        self._open_rec = None
+        self.stats = {"grammar_passes": 0, "open_vocab_passes": 0}
+
+    def _command_recognizer(self):
+        if self._command_rec is None or self._command_version != self.grammar.version:
+            if self._command_rec is not None and hasattr(self._command_rec, "SetGrammar"):
+                self._command_rec.SetGrammar(self.grammar.to_json())
+            else:
+                self._command_rec = vosk.KaldiRecognizer(self.model, self.sample_rate, self.grammar.to_json())
+                self._command_rec.SetWords(True)
+            self._command_version = self.grammar.version
+        return self._command_rec
+
+    def _open_recognizer(self):
+        if self._open_rec is None:
+            self._open_rec = vosk.KaldiRecognizer(self.model, self.sample_rate)
+            self._open_rec.SetWords(True)
+        return self._open_rec
+
+    @staticmethod
+    def _decode(rec, pcm, chunk=32000):
+        # pcm may be a memoryview (e.g. over an mmapped WAV); feed it in slices
+        for i in range(0, len(pcm), chunk):
+            rec.AcceptWaveform(bytes(pcm[i:i + chunk]))
+        res = json.loads(rec.FinalResult())
+        words = res.get("result") or []
+        conf = sum(w.get("conf", 0.0) for w in words) / len(words) if words else 0.0
+        return (res.get("text") or "").strip(), conf
+
+    def recognize(self, audio):
+        """Returns (text, confidence) for an sr.AudioData clip."""
+        return self.recognize_pcm(audio.get_raw_data(convert_rate=self.sample_rate, convert_width=2))
+
+    def recognize_pcm(self, pcm, use_grammar=True):
+        """Same for raw 16-bit mono PCM at `sample_rate`; use_grammar=False skips the command pass."""
+        if not use_grammar:
+            self.stats["open_vocab_passes"] += 1
+            return self._decode(self._open_recognizer(), pcm)
+        self.stats["grammar_passes"] += 1
+        text, conf = self._decode(self._command_recognizer(), pcm)
+        if self.grammar.needs_open_vocab(text):
+            self.stats["open_vocab_passes"] += 1
+            text, conf = self._decode(self._open_recognizer(), pcm)
+            return text, conf
+        return _numbers_to_digits(text.replace("[unk]", "").strip()), conf
+
+# ========== Fallback intent classifier ==========
+# Paraphrases the keyword branches miss. Each label re-dispatches its canonical command,
+# so only intents with a slot-free command are listed (and nothing destructive like shutdown).
+FALLBACK_INTENTS = {
+    "volume_up": ("increase volume", ["turn it up", "make it louder", "crank it up", "i can't hear it",
+                                      "sound up", "a little louder", "raise the sound", "pump up the sound", "boost the audio"]),
+    "volume_down": ("decrease volume", ["turn it down", "make it softer", "too loud", "lower the sound",
+                                        "sound down", "keep it down", "reduce the audio", "less noise"]),
+    "mute": ("mute", ["silence", "shut up", "quiet", "no sound", "kill the sound", "turn the sound off", "be quiet"]),
+    "brightness_up": ("increase brightness", ["turn the screen up", "make the screen brighter", "screen is too dark",
+                                              "lighten the screen", "more light on the monitor", "raise the screen"]),
+    "brightness_down": ("decrease brightness", ["turn the screen down", "dim the screen", "screen is too bright",
+                                                "darken the monitor", "make the screen darker", "lower the screen", "dimmer", "dim the display"]),
+    "spotify_next": ("next", ["skip this song", "skip", "skip track", "another song", "change the song",
+                              "i don't like this song", "go forward a track", "following track"]),
+    "spotify_previous": ("previous", ["last song", "play that again", "go to the last track", "the one before",
+                                      "earlier song", "replay the prior track"]),
+    "spotify_playpause": ("playpause", ["pause", "pause the music", "pause it", "unpause", "continue the music",
+                                        "keep playing", "wait a second", "halt the song"]),
+    "spotify_shuffle": ("shuffle", ["mix it up", "random order", "randomize the songs", "play in random order"]),
+    "spotify_like": ("like", ["i love this song", "add this to my favourites", "favourite this track",
+                              "keep this song", "good song"]),
+    "spotify_open": ("open spotify", ["launch spotify", "start spotify", "bring up spotify", "start the music app"]),
+    "youtube_open": ("open youtube", ["launch youtube", "go to youtube", "start youtube", "bring up youtube"]),
+    "youtube_next": ("youtube next", ["skip this video", "another video", "next clip", "skip the video"]),
+    "youtube_forward": ("youtube forward", ["skip ahead", "jump ahead", "go forward in the video", "move the video ahead"]),
+    "youtube_rewind": ("youtube rewind", ["go back a bit in the video", "jump back in the video", "rewind the video", "replay that part"]),
+    "battery": ("battery", ["how much power is left", "am i plugged in", "power level", "how long will the laptop last"]),
+    "time": ("time", ["what's the clock say", "what hour is it", "tell me the hour", "current hour", "o'clock"]),
+    "now_playing": ("what's playing", ["what song is on", "who sings this", "name of this track",
+                                       "which song is this", "who is the singer", "what am i listening to"]),
+    "settings": ("open settings", ["control panel", "system preferences", "configure the computer", "preferences"]),
+}
+
+class IntentClassifier:
+    """
+    Hashed n-gram bag of words (word unigrams/bigrams + character trigrams, IDF-weighted,
+    L2-normalized) scored by cosine against one centroid per label: a single matrix
+    product per query. Trained from INTENT_PHRASES + FALLBACK_INTENTS in milliseconds and
+    saved as a small .npz (float16 centroids/IDF) keyed by a fingerprint of the corpus.
+    """
+    STOPWORDS = {"pink", "the", "a", "an", "please", "can", "you", "could", "would", "me", "my", "to", "it", "this",
+                 "is", "i", "what", "some", "bit", "little", "of", "in", "on", "for", "just", "now", "one"}
+
+    def __init__(self, labels, commands, centroids, idf, dim):
+        self.labels = list(labels)
+        self.commands = list(commands)
+        self.centroids = centroids.astype(np.float32)
+        self.idf = idf.astype(np.float32)
+        self.dim = dim
+
+    @staticmethod
+    def corpus():
+        """[(label, text)]: the fallback paraphrases plus slot-free templates of the same intents."""
+        rows = []
+        for label, (command, examples) in FALLBACK_INTENTS.items():
+            phrases = [command] + examples + [p for p in INTENT_PHRASES.get(label, []) if "<" not in p]
+            rows.extend((label, p) for p in dict.fromkeys(phrases))
+        return rows
+
+    @classmethod
+    def fingerprint(cls, dim):
+        return zlib.crc32(json.dumps([dim, cls.corpus()]).encode("utf-8"))
+
+    @classmethod
+    def _features(cls, text, dim):
+        words = [w for w in re.findall(r"[a-z']+", text.lower()) if w not in cls.STOPWORDS]
+        grams = ["w:" + w for w in words] + ["b:" + a + " " + b for a, b in zip(words, words[1:])]
+        for w in words:
+            padded = f"#{w}#"
+            grams.extend("c:" + padded[i:i + 3] for i in range(len(padded) - 2))
+        return [zlib.crc32(g.encode("utf-8")) % dim for g in grams]
+
+    @classmethod
+    def _counts(cls, texts, dim):
+        feats = [cls._features(text, dim) for text in texts]
+        rows = np.repeat(np.arange(len(texts)), [len(f) for f in feats])
+        X = np.zeros((len(texts), dim), np.float32)
+        np.add.at(X, (rows, np.fromiter(itertools.chain.from_iterable(feats), dtype=np.int64, count=len(rows))), 1.0)
+        return np.log1p(X)
+
+    @staticmethod
+    def _normalize(X):
+        return X / np.maximum(np.linalg.norm(X, axis=1, keepdims=True), 1e-9)
+
+    def vectorize(self, texts):
+        return self._normalize(self._counts(texts, self.dim) * self.idf)
+
+    @classmethod
+    def train(cls, dim=4096):
+        rows = cls.corpus()
+        labels = list(dict.fromkeys(label for label, _ in rows))
+        texts = [text for _, text in rows]
+        y = np.array([labels.index(label) for label, _ in rows])
+        counts = cls._counts(texts, dim)
+        df = (counts > 0).sum(axis=0)
+        idf = np.log((1 + len(texts)) / (1 + df)) + 1.0
+        X = cls._normalize(counts * idf)
+        onehot = np.eye(len(labels), dtype=np.float32)[y]
+        centroids = cls._normalize(onehot.T @ X / onehot.sum(axis=0)[:, None])
+        return cls(labels, [FALLBACK_INTENTS[l][0] for l in labels], centroids, idf, dim)
+
+    def save(self, path, fingerprint):
+        """Written to a temp file beside `path` and renamed over it, so concurrent loaders never see a partial file."""
+        folder = os.path.dirname(os.path.abspath(path))
+        os.makedirs(folder, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=folder, prefix=".pink-intents-", suffix=".npz")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez_compressed(f, labels=np.array(self.labels), commands=np.array(self.commands),
+                                    centroids=self.centroids.astype(np.float16), idf=self.idf.astype(np.float16),
+                                    dim=self.dim, fingerprint=fingerprint)
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+    @classmethod
+    def load_or_train(cls, path, dim=4096):
+        """The saved model when it matches the current corpus, otherwise a freshly trained (and saved) one."""
+        fp = cls.fingerprint(dim)
+        try:
+            with np.load(path) as f:
+                if int(f["fingerprint"]) == fp:
+                    return cls(f["labels"].tolist(), f["commands"].tolist(), f["centroids"], f["idf"], int(f["dim"]))
+        except (OSError, KeyError, ValueError, EOFError, zipfile.BadZipFile):
+            pass    # missing, stale or corrupt: retrain and overwrite
+        clf = cls.train(dim)
+        try:
+            clf.save(path, fp)
+        except OSError as e:
+            print("Couldn't save intent model:", e)
+        return clf
+
+    def classify_batch(self, texts):
+        """[(label, confidence, margin)] for many texts with one matrix product."""
+        S = self.vectorize(texts) @ self.centroids.T
+        top2 = np.argsort(-S, axis=1)[:, :2]
+        rows = np.arange(len(texts))
+        best, second = S[rows, top2[:, 0]], S[rows, top2[:, 1]]
+        return [(self.labels[i], float(b), float(b - s)) for i, b, s in zip(top2[:, 0], best, second)]
+
+    def classify(self, text):
+        return self.classify_batch([text])[0]
+
+    def command_for(self, label):
+        return self.commands[self.labels.index(label)]
+
+# ========== Voice activity detection ==========
+class VadEndpointer:
+    """
+    Frame-level endpointing: reads fixed frames from the mic, classifies each as speech or
+    not (webrtcvad when installed, adaptive energy otherwise) and ends the utterance once
+    `hangover_ms` of trailing silence follows speech. Only speech frames plus a short
+    pre-roll/hangover reach the recognizer; per-utterance stats are kept in `last_stats`.
+    """
+    def __init__(self, frame_ms=30, hangover_ms=200, pre_roll_ms=150, min_speech_ms=90,
+                 aggressiveness=2, energy_ratio=3.0, gate=None):
+        self.frame_ms = frame_ms
+        self.gate = gate
+        self.hangover_frames = max(1, int(hangover_ms / frame_ms))
+        self.pre_roll_frames = max(0, int(pre_roll_ms / frame_ms))
+        self.start_frames = max(1, int(min_speech_ms / frame_ms))
+        self.energy_ratio = energy_ratio
+        self.noise_floor = None
+        self.vad = None
+        self.strict_vad = None
+        if webrtcvad is not None:
+            try:
+                self.vad = webrtcvad.Vad(aggressiveness)
+                self.strict_vad = webrtcvad.Vad(3)
+            except Exception:
+                self.vad = None
+        self.last_stats = {}
+        self.totals = {"utterances": 0, "speech_ms": 0, "silence_ms": 0, "timeouts": 0}
+
+    @staticmethod
+    def _rms(frame, width):
+        if width != 2:
+            return 0.0
+        samples = array.array("h", frame)
+        if not samples:
+            return 0.0
+        return math.sqrt(sum(s * s for s in samples) / len(samples))
+
+    def _is_speech(self, frame, rate, width, strict=False):
+        if self.vad is not None and width == 2 and rate in (8000, 16000, 32000, 48000):
+            try:
+                return (self.strict_vad if strict else self.vad).is_speech(frame, rate)
+            except Exception:
+                pass
+        rms = self._rms(frame, width)
+        if self.noise_floor is None:
+            self.noise_floor = rms
+            return False
+        # media playing without a loopback reference: demand clearly louder-than-room speech
+        ratio = self.energy_ratio * (2 if strict else 1)
+        speech = rms > max(self.noise_floor * ratio, 150)
+        if not speech:
+            # track the room slowly; only non-speech frames move the floor
+            self.noise_floor = 0.95 * self.noise_floor + 0.05 * rms
+        return speech
+
+    def listen(self, source, timeout=6, phrase_time_limit=6):
+        """
+        Returns sr.AudioData with the speech portion of one utterance, or None when nothing
+        was said within `timeout` seconds.
+        """
+        rate, width = source.SAMPLE_RATE, source.SAMPLE_WIDTH
+        samples_per_frame = int(rate * self.frame_ms / 1000)
+        max_wait = int(timeout * 1000 / self.frame_ms) if timeout else None
+        max_frames = int(phrase_time_limit * 1000 / self.frame_ms) if phrase_time_limit else None
+
+        pre_roll = collections.deque(maxlen=self.pre_roll_frames + self.start_frames)
+        voiced, started = [], False
+        run = trailing = waited = speech_frames = dropped = suppressed = 0
+        t0 = time.perf_counter()
+        while True:
+            frame = source.stream.read(samples_per_frame)
+            if not frame:
+                break
+            now = time.perf_counter()
+            if self.gate is not None and self.gate.active(now):
+                strict = self.gate.media_active() and not self.gate.loopback.available
+                # one decision per frame: every call also adapts the energy noise floor
+                speech = self._is_speech(frame, rate, width, strict)
+                frame, echo_only = self.gate.process(frame, width, now, speech)
+                if echo_only:
+                    speech = False
+                    suppressed += 1
+                    if suppressed == self.start_frames and not started:
+                        # this burst would have opened an utterance and gone to the recognizer
+                        self.gate.counters["avoided_recognitions"] += 1
+                else:
+                    suppressed = 0
+            else:
+                speech = self._is_speech(frame, rate, width)
+            if not started:
+                waited += 1
+                pre_roll.append(frame)
+                run = run + 1 if speech else 0
+                if run >= self.start_frames:
+                    started = True
+                    voiced.extend(pre_roll)
+                    speech_frames += run
+                elif max_wait is not None and waited >= max_wait:
+                    break
+                else:
+                    if not speech:
+                        dropped += 1
+                continue
+            voiced.append(frame)
+            if speech:
+                speech_frames += 1
+                trailing = 0
+            else:
+                trailing += 1
+                if trailing >= self.hangover_frames:
+                    break
+            if max_frames is not None and len(voiced) >= max_frames:
+                break
+
+        self.last_stats = {
+            "speech_ms": speech_frames * self.frame_ms,
+            "silence_ms": (dropped + trailing) * self.frame_ms,
+            "kept_ms": len(voiced) * self.frame_ms,
+            "endpoint_delay_ms": trailing * self.frame_ms,
+            "wall_ms": round((time.perf_counter() - t0) * 1000, 1),
+            "vad": "webrtc" if self.vad is not None else "energy",
+        }
+        if not started:
+            self.totals["timeouts"] += 1
+            return None
+        self.totals["utterances"] += 1
+        self.totals["speech_ms"] += self.last_stats["speech_ms"]
+        self.totals["silence_ms"] += self.last_stats["silence_ms"]
+        return sr.AudioData(b"".join(voiced), rate, width)
+
+# ========== Echo / playback gating ==========
+class SystemAudioReference:
+    """
+    Records the default speaker's loopback (what Spotify / YouTube are playing) into a
+    timestamped buffer for echo cancellation. Needs the optional `soundcard` package and
+    only runs while `media_active()` says something is playing.
+    """
+    def __init__(self, rate=16000, block_ms=30, seconds=3, media_active=None):
+        self.rate = rate
+        self.block = int(rate * block_ms / 1000)
+        self.blocks = collections.deque(maxlen=int(seconds * 1000 / block_ms))
+        self.media_active = media_active or (lambda: False)
+        self.available = soundcard is not None and np is not None
+        self._thread = None
+
+    def _run(self):
+        try:
+            speaker = soundcard.default_speaker()
+            loopback = soundcard.get_microphone(speaker.name, include_loopback=True)
+            with loopback.recorder(samplerate=self.rate, channels=1, blocksize=self.block) as rec:
+                while self.media_active():
+                    data = rec.record(numframes=self.block)
+                    self.blocks.append((time.perf_counter(), (data[:, 0] * 32767).astype(np.float32)))
+        except Exception as e:
+            print("System audio loopback unavailable:", e)
+            self.available = False
+        finally:
+            self.blocks.clear()
+            self._thread = None
+
+    def ensure_running(self):
+        if self.available and self._thread is None and self.media_active():
+            self._thread = threading.Thread(target=self._run, name="pink-loopback", daemon=True)
+            self._thread.start()
+        return self._thread is not None
+
+    def window(self, end_time, n):
+        """The last n loopback samples recorded before end_time, or None."""
+        if not self.blocks:
+            return None
+        parts = [b for t, b in list(self.blocks) if t <= end_time]
+        if not parts:
+            return None
+        x = np.concatenate(parts[-(n // self.block + 2):])
+        return x[-n:] if len(x) >= n else np.concatenate([np.zeros(n - len(x), np.float32), x])
+
+class EchoGate:
+    """
+    Keeps the recognizer from transcribing what the assistant itself is playing.
+    - Own TTS: speak() renders the reply to a WAV and registers it as the reference;
+      mic frames during playback go through a block-NLMS canceller against it. If no
+      reference could be rendered the playback window is hard-gated instead.
+    - System audio (music/video): cancelled against the speaker loopback when available;
+      otherwise the endpointer is made stricter while media is playing.
+    process() marks frames that looked like speech but were explained by playback
+    (`echo_only`); VadEndpointer treats those as silence, and every burst of them long
+    enough to have started an utterance counts as an avoided recognizer invocation.
+    """
+    def __init__(self, rate=16000, taps=512, mu=0.4, delay_ms=80, tail_ms=300, residual_ratio=0.3):
+        self.rate = rate
+        self.taps = taps
+        self.mu = mu
+        self.delay = int(rate * delay_ms / 1000)
+        self.tail = tail_ms / 1000
+        self.residual_ratio = residual_ratio
+        self.media_active = lambda: False
+        self.loopback = SystemAudioReference(rate, media_active=lambda: self.media_active())
+        self._ref = None            # float32 samples of the reply being played
+        self._ref_start = 0.0
+        self._cursor = None         # reference sample aligned with the end of the next mic frame
+        self._until = 0.0           # end of own playback (+ tail)
+        self._w = np.zeros(taps, np.float32) if np is not None else None
+        self._w_sys = np.zeros(taps, np.float32) if np is not None else None
+        self.counters = collections.Counter()
+
+    # ----- playback registration (speaking thread) -----
+    def begin_playback(self, samples, duration, start=None):
+        start = time.perf_counter() if start is None else start
+        self._ref = samples
+        self._ref_start = start
+        self._cursor = None
+        self._until = start + duration + self.tail
+        self.counters["tts_playbacks"] += 1
+
+    def end_playback(self):
+        self._until = min(self._until, time.perf_counter() + self.tail)
+
+    def load_reference(self, path):
+        """Mono float32 samples of a 16-bit WAV at the gate's rate, or None."""
+        if np is None:
+            return None
+        with wave.open(path, "rb") as w:
+            ch, width, rate = w.getnchannels(), w.getsampwidth(), w.getframerate()
+            data = w.readframes(w.getnframes())
+        if width != 2:
+            return None
+        x = np.frombuffer(data, dtype=np.int16).astype(np.float32)
+        if ch > 1:
+            x = x.reshape(-1, ch).mean(axis=1)
+        if rate != self.rate:
+            x = np.interp(np.arange(0, len(x), rate / self.rate), np.arange(len(x)), x).astype(np.float32)
+        return x
+
+    # ----- capture side -----
+    def own_playback(self, t):
+        return t < self._until
+
+    def active(self, t):
+        return self.own_playback(t) or self.media_active()
+
+    def _nlms(self, w, d, ref):
+        # ref has len(d) + taps - 1 samples, oldest first
+        X = np.lib.stride_tricks.sliding_window_view(ref, self.taps)[:, ::-1]
+        e = d - X @ w
+        # block update: each frame moves the filter about mu * len(d) / taps of the way
+        power = float(np.dot(ref, ref)) / len(ref) * self.taps + 1e3
+        w += self.mu * (X.T @ e) / power
+        return e
+
+    def _tts_window(self, t_end, n):
+        if self._ref is None:
+            return None
+        # anchor on the clock once, then follow the mic's sample count: capture is
+        # contiguous, while per-frame timestamps jitter by more than the filter tolerates
+        if self._cursor is None:
+            self._cursor = int((t_end - self._ref_start) * self.rate) - self.delay
+        self._cursor += n
+        end = self._cursor - n
+        start = end - n - self.taps + 1
+        if end <= 0 or start >= len(self._ref):
+            return None
+        lo, hi = max(0, start), min(len(self._ref), end)
+        seg = self._ref[lo:hi]
+        return np.concatenate([np.zeros(lo - start, np.float32), seg, np.zeros(end - hi, np.float32)])
+
+    def process(self, frame, width, t_end, speech_like):
+        """
+        Returns (frame, echo_only). `speech_like` is the endpointer's verdict on the raw
+        frame; the returned frame has known playback subtracted.
+        """
+        own = self.own_playback(t_end)
+        if np is None or width != 2:
+            if own and speech_like:
+                self.counters["gated_frames"] += 1
+                return frame, True
+            return frame, False
+        d = np.frombuffer(frame, dtype=np.int16).astype(np.float32)
+        e = d
+        cancelled = False
+        if own:
+            ref = self._tts_window(t_end, len(d))
+            if ref is None and self._ref is None:
+                if speech_like:
+                    self.counters["gated_frames"] += 1
+                return frame, speech_like
+            if ref is not None:
+                e = self._nlms(self._w, e, ref)
+                cancelled = True
+        if self.media_active() and self.loopback.ensure_running():
+            ref = self.loopback.window(t_end - self.delay / self.rate, len(d) + self.taps - 1)
+            if ref is not None:
+                e = self._nlms(self._w_sys, e, ref)
+                cancelled = True
+        if not cancelled:
+            return frame, False
+        self.counters["cancelled_frames"] += 1
+        mic_power = float(np.dot(d, d)) + 1.0
+        res_power = float(np.dot(e, e))
+        echo_only = speech_like and res_power / mic_power < self.residual_ratio
+        if echo_only:
+            self.counters["gated_frames"] += 1
+        return np.clip(e, -32768, 32767).astype(np.int16).tobytes(), echo_only
+
+    def status(self):
+        return {"own_playback": self.own_playback(time.perf_counter()), "media_active": bool(self.media_active()),
+                "loopback": self.loopback.available, "counters": dict(self.counters)}
+
+# ========== Hedged recognition ==========
+class VoskBackend:
+    """Local grammar-constrained decoder (see GrammarRecognizer)."""
+    name = "vosk"
+
+    def __init__(self, grammar_recognizer):
+        self.rec = grammar_recognizer
+        self._lock = threading.Lock()   # KaldiRecognizer instances are not re-entrant
+
+    def recognize(self, audio):
+        with self._lock:
+            return self.rec.recognize(audio)
+
+class GoogleBackend:
+    """SpeechRecognition's Google Web Speech endpoint."""
+    name = "google"
+
+    def __init__(self, recognizer):
+        self.recognizer = recognizer
+
+    def recognize(self, audio):
+        res = self.recognizer.recognize_google(audio, show_all=True)
+        alts = res.get("alternative") if isinstance(res, dict) else None
+        if not alts:
+            return "", 0.0
+        best = alts[0]
+        return best.get("transcript", ""), float(best.get("confidence", 0.7))
+
+class HttpBackend:
+    """
+    Remote engine: POSTs the clip as WAV and expects {"text": ..., "confidence": ...}.
+    """
+    def __init__(self, url, name="remote", timeout=5.0):
+        self.url = url
+        self.name = name
+        self.timeout = timeout
+
+    def recognize(self, audio):
+        req = urllib.request.Request(self.url, data=audio.get_wav_data(), method="POST",
+                                     headers={"Content-Type": "audio/wav"})
+        with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+            res = json.loads(resp.read() or b"{}")
+        return (res.get("text") or "").strip(), float(res.get("confidence", 0.0))
+
+class RecognizerPool:
+    """
+    Hedged recognition across several backends. The backend with the best track record
+    starts first; the others are launched only if it hasn't produced a confident result
+    within its usual latency (or fails). The first result at or above `confidence` wins
+    and pending work is cancelled. Latency and error rate are tracked per backend as EWMAs
+    and decide the launch order; backends with a high error rate are skipped except for
+    an occasional probe. Pass `executor` to run the backend calls on a shared pool.
+    """
+    def __init__(self, backends, confidence=0.6, max_hedge_delay=1.0, alpha=0.2,
+                 max_error_rate=0.8, probe_every=10, executor=None):
+        self.backends = list(backends)
+        self.confidence = confidence
+        self.max_hedge_delay = max_hedge_delay
+        self.alpha = alpha
+        self.max_error_rate = max_error_rate
+        self.probe_every = probe_every
+        self.executor = executor or concurrent.futures.ThreadPoolExecutor(max_workers=max(2, 2 * len(self.backends)),
+                                                                          thread_name_prefix="pink-asr")
+        self._lock = threading.Lock()
+        self._requests = 0
+        self.stats = {b.name: {"calls": 0, "errors": 0, "wins": 0, "cancelled": 0,
+                               "latency_ms": None, "error_rate": 0.0} for b in self.backends}
+
+    def _record(self, name, latency, ok):
+        with self._lock:
+            s = self.stats[name]
+            s["calls"] += 1
+            if not ok:
+                s["errors"] += 1
+            s["error_rate"] = (1 - self.alpha) * s["error_rate"] + self.alpha * (0.0 if ok else 1.0)
+            if ok:
+                ms = latency * 1000
+                s["latency_ms"] = ms if s["latency_ms"] is None else (1 - self.alpha) * s["latency_ms"] + self.alpha * ms
+
+    def _call(self, backend, audio):
+        t0 = time.perf_counter()
+        try:
+            text, conf = backend.recognize(audio)
+        except Exception:
+            self._record(backend.name, time.perf_counter() - t0, False)
+            raise
+        self._record(backend.name, time.perf_counter() - t0, True)
+        return text, conf
+
+    def _plan(self):
+        """Backends in launch order; unhealthy ones are dropped unless it's a probe turn."""
+        with self._lock:
+            self._requests += 1
+            probe = self.probe_every and self._requests % self.probe_every == 0
+            def cost(b):
+                s = self.stats[b.name]
+                if s["latency_ms"] is not None:
+                    lat = s["latency_ms"]
+                else:
+                    # untried backends keep their configured (local-first) order behind proven ones
+                    lat = self.max_hedge_delay * 1000
+                return lat / max(0.05, 1.0 - s["error_rate"])
+            healthy = [b for b in self.backends if probe or self.stats[b.name]["error_rate"] < self.max_error_rate]
+            return sorted(healthy or self.backends, key=cost)
+
+    def _hedge_delay(self, backend):
+        lat = self.stats[backend.name]["latency_ms"]
+        if lat is None:
+            return self.max_hedge_delay    # no history yet: give it the full budget before hedging
+        return min(self.max_hedge_delay, 1.5 * lat / 1000)
+
+    def recognize(self, audio):
+        """
+        Returns (text, confidence, backend_name). Raises sr.UnknownValueError when every
+        backend answered without speech and sr.RequestError when every backend failed.
+        """
+        plan = self._plan()
+        futures = {}
+        pending_backends = list(plan)
+        best = None
+        errors = []
+
+        def launch(b):
+            futures[self.executor.submit(self._call, b, audio)] = b
+
+        launch(pending_backends.pop(0))
+        deadline = time.perf_counter() + self._hedge_delay(plan[0])
+        while futures or pending_backends:
+            if pending_backends and (not futures or time.perf_counter() >= deadline):
+                while pending_backends:
+                    launch(pending_backends.pop(0))
+            wait = None if not pending_backends else max(0.0, deadline - time.perf_counter())
+            done, _ = concurrent.futures.wait(list(futures), timeout=wait,
+                                              return_when=concurrent.futures.FIRST_COMPLETED)
+            for f in done:
+                b = futures.pop(f)
+                try:
+                    text, conf = f.result()
+                except Exception as e:
+                    errors.append(f"{b.name}: {e}")
+                    continue
+                if not text:
+                    continue
+                if conf >= self.confidence:
+                    self._finish(b, futures)
+                    return text, conf, b.name
+                if best is None or conf > best[1]:
+                    best = (text, conf, b.name)
+        if best:
+            with self._lock:
+                self.stats[best[2]]["wins"] += 1
+            return best
+        if errors and len(errors) == len(plan):
+            raise sr.RequestError("; ".join(errors))
+        raise sr.UnknownValueError()
+
+    def _finish(self, winner, futures):
+        with self._lock:
+            self.stats[winner.name]["wins"] += 1
+            for f, b in futures.items():
+                # queued calls are dropped; running ones finish in the background and still
+                # feed the latency stats
+                if f.cancel():
+                    self.stats[b.name]["cancelled"] += 1
+
 # ========== Voice Engine ==========
+# pyttsx3 hands out one engine per driver, so speech from several sessions is serialized
+_TTS_LOCK = threading.RLock()
+
 class VoiceEngine:
-    def __init__(self):
+    def __init__(self, device_index=None, wake_word=None, executor=None):
         self.recognizer = sr.Recognizer()
-        self.mic = sr.Microphone()
+        vad_cfg = CONFIG.get("vad") or {}
+        echo_cfg = CONFIG.get("echo") or {}
+        self.echo = EchoGate(delay_ms=echo_cfg.get("delay_ms", 80), tail_ms=echo_cfg.get("tail_ms", 300)) if echo_cfg.get("enabled") else None
+        self.vad = None
+        if vad_cfg.get("enabled"):
+            self.vad = VadEndpointer(
+                gate=self.echo,
+                frame_ms=vad_cfg.get("frame_ms", 30),
+                hangover_ms=vad_cfg.get("hangover_ms", 200),
+                pre_roll_ms=vad_cfg.get("pre_roll_ms", 150),
+                aggressiveness=vad_cfg.get("aggressiveness", 2),
+            )
+            # 16 kHz suits both webrtcvad and the local recognizer
+            self.mic = sr.Microphone(device_index=device_index, sample_rate=16000)
+        else:
+            self.mic = sr.Microphone(device_index=device_index)
         self.engine = None
         self.last_command_time = 0
+        self.wake_word = wake_word or CONFIG["wake_word"]
+        self.grammar = CommandGrammar(wake_word=self.wake_word)
+        self.grammar_recognizer = None
         self._init_tts()
+        self._init_grammar_recognizer()
+        self.pool = self._init_pool(executor)
+
+    def _init_grammar_recognizer(self):
+        if CONFIG.get("asr_backend") != "vosk":
+            return
+        try:
+            self.grammar_recognizer = GrammarRecognizer(CONFIG["vosk_model_path"], self.grammar)
+        except Exception as e:
+            print("Local recognizer unavailable, using Google:", e)
+            self.grammar_recognizer = None
+
+    def _init_pool(self, executor=None):
+        cfg = CONFIG.get("asr_pool") or {}
+        backends = []
+        if self.grammar_recognizer:
+            backends.append(VoskBackend(self.grammar_recognizer))
+        if cfg.get("remote_url"):
+            backends.append(HttpBackend(cfg["remote_url"]))
+        if cfg.get("cloud_fallback") or not backends:
+            backends.append(GoogleBackend(self.recognizer))
+        return RecognizerPool(backends, confidence=cfg.get("confidence", 0.6),
+                              max_hedge_delay=cfg.get("max_hedge_delay", 1.0), executor=executor)
+
+    def recognize(self, audio):
+        text, conf, backend = self.pool.recognize(audio)
+        print(f"Recognized by {backend} (confidence {conf:.2f})")
+        return text
 
     def _init_tts(self):
         try:
@@ -118,32 +1157,81 @@ class VoiceEngine:
         print(f"PINK: {text}")
         try:
             if self.engine:
-                self.engine.say(text)
-                self.engine.runAndWait()
+                with _TTS_LOCK:
+                    if self.echo and self._speak_with_reference(text):
+                        return
+                    start = time.perf_counter()
+                    if self.echo:
+                        # no reference signal: gate the whole (open-ended) playback window
+                        self.echo.begin_playback(None, 3600, start)
+                    try:
+                        self.engine.say(text)
+                        self.engine.runAndWait()
+                    finally:
+                        if self.echo:
+                            self.echo.end_playback()
                 return
         except Exception:
             pass
         try:
             if sys.platform == "win32":
-                os.system(f'PowerShell -Command "Add-Type -AssemblyName System.Speech; (New-Object System.Speech.Synthesis.SpeechSynthesizer).Speak(\'{text}\');"')
-            else:
-                os.system(f'echo \"{text}\"')
+                # the reply can contain spoken/API text: pass it in the environment, not the command line
+                proc = _spawn(["PowerShell", "-NoProfile", "-Command",
+                               "Add-Type -AssemblyName System.Speech; "
+                               "(New-Object System.Speech.Synthesis.SpeechSynthesizer).Speak($env:PINK_TTS_TEXT)"],
+                              env=dict(os.environ, PINK_TTS_TEXT=text))
+                if proc is not None:
+                    proc.wait()
         except Exception:
             pass
 
-    def listen(self, timeout=6, phrase_time_limit=6):
-        with self.mic as source:
+    def _speak_with_reference(self, text):
+        """
+        Render the reply to a WAV, register it with the echo gate and play it, so capture
+        can cancel the assistant's own voice. Returns False to fall back to plain speech.
+        """
+        if np is None or sys.platform != "win32" or not hasattr(self.engine, "save_to_file"):
+            return False
+        fd, path = tempfile.mkstemp(suffix=".wav", prefix="pink-tts-")
+        os.close(fd)
+        try:
+            self.engine.save_to_file(text, path)
+            self.engine.runAndWait()
+            ref = self.echo.load_reference(path)
+            if ref is None or not len(ref):
+                return False
+            duration = len(ref) / self.echo.rate
+            self.echo.begin_playback(ref, duration)
+            winsound.PlaySound(path, winsound.SND_FILENAME)
+            return True
+        except Exception as e:
+            print("Reference TTS failed:", e)
+            return False
+        finally:
             try:
-                self.recognizer.adjust_for_ambient_noise(source, duration=0.7)
-            except Exception:
+                os.remove(path)
+            except OSError:
                 pass
-            print("Listening...")
-            try:
-                audio = self.recognizer.listen(source, timeout=timeout, phrase_time_limit=phrase_time_limit)
-            except sr.WaitTimeoutError:
-                return ""
+
+    def listen(self, timeout=6, phrase_time_limit=6):
+        with self.mic as source:
+            if self.vad:
+                print("Listening...")
+                audio = self.vad.listen(source, timeout=timeout, phrase_time_limit=phrase_time_limit)
+                if audio is None:
+                    return ""
+            else:
+                try:
+                    self.recognizer.adjust_for_ambient_noise(source, duration=0.7)
+                except Exception:
+                    pass
+                print("Listening...")
+                try:
+                    audio = self.recognizer.listen(source, timeout=timeout, phrase_time_limit=phrase_time_limit)
+                except sr.WaitTimeoutError:
+                    return ""
             try:
-                text = self.recognizer.recognize_google(audio)
+                text = self.recognize(audio)
                 text = text.lower()
                 print("User said:", text)
                 self.last_command_time = time.time()
@@ -159,7 +1247,8 @@ class VoiceEngine:
 
 # ========== App Controller ==========
 class AppController:
-    def __init__(self):
+    def __init__(self, windows=None):
+        self.windows = windows or WindowRegistry(WinEventWatcher())
         self.search_results = []     # list of strings (query or placeholder titles)
         self.result_positions = []   # list of (x,y) coords for each result row
         self.spotify_window = None
@@ -167,15 +1256,10 @@ class AppController:
         self.last_selected = None    # index of selected list item (1-based)
 
     def _find_spotify_window(self):
-        if gw:
-            try:
-                wins = gw.getWindowsWithTitle("Spotify")
-                if wins:
-                    w = wins[0]
-                    self.spotify_window = (w.left, w.top, w.width, w.height)
-                    return self.spotify_window
-            except Exception:
-                pass
+        rect = self.windows.geometry("spotify")
+        if rect:
+            self.spotify_window = rect
+            return self.spotify_window
         screen_w, screen_h = pyautogui.size()
         self.spotify_window = (0, 0, screen_w, screen_h)
         return self.spotify_window
@@ -184,7 +1268,7 @@ class AppController:
         name = name.lower().strip()
         if name in CONFIG['app_paths']:
             try:
-                os.system(f"start {CONFIG['app_paths'][name]}")
+                _open_target(CONFIG['app_paths'][name])
                 time.sleep(1.5)
                 return True
             except Exception as e:
@@ -192,7 +1276,7 @@ class AppController:
                 return False
         else:
             try:
-                os.system(f"start {name}")
+                _open_target(name)
                 time.sleep(1.5)
                 return True
             except Exception as e:
@@ -206,7 +1290,7 @@ class AppController:
         else:
             proc = name
         try:
-            os.system(f"taskkill /f /im {proc} >nul 2>&1")
+            _spawn(["taskkill", "/f", "/im", proc])
             return True
         except Exception as e:
             print("Close app error:", e)
@@ -227,7 +1311,7 @@ class AppController:
             # focus search bar and type
             pyautogui.hotkey('ctrl', 'l')
             time.sleep(0.2)
-            pyautogui.write(text, interval=0.05)
+            _text_input.type(text)
             pyautogui.press('enter')
             time.sleep(2.5)  # wait for results to load
 
@@ -296,15 +1380,8 @@ class AppController:
                 print("No stored results — do a search first.")
                 return False
 
-            # Try to activate Spotify window
-            if gw:
-                try:
-                    wins = gw.getWindowsWithTitle("Spotify")
-                    if wins:
-                        wins[0].activate()
-                        time.sleep(0.35)
-                except Exception:
-                    pass
+            # Try to activate Spotify window (no-op when it's already in front)
+            self.windows.focus("spotify")
 
             # If user selected a list item previously, play that one
             if self.last_selected:
@@ -442,46 +1519,121 @@ class AppController:
 # ========== YouTube Controller (basic controls) ==========
 class YouTubeController:
     """
-    Lightweight YouTube controls using keyboard shortcuts and pyautogui.
-    Provides: next_video, close_tab, seek (forward/back).
+    YouTube controls. Uses the DevTools backend (CdpYouTube) when the browser exposes it,
+    otherwise keyboard shortcuts and pyautogui.
+    Provides: next_video, close_tab, seek (forward/back), seek_to, set_speed, play_query, search, open_home.
     """
-    def __init__(self):
-        pass
+    def __init__(self, windows=None, now_playing=None):
+        self.windows = windows or WindowRegistry(WinEventWatcher(), settle=0.25)
+        self.now_playing = now_playing
+        self.cdp = CdpYouTube(port=CONFIG.get("youtube_cdp_port", 9222)) if CONFIG.get("youtube_cdp") else None
+        self._cdp_checked = 0.0
+        self._cdp_up = False
+        self._playing_checked = 0.0
+        self._playing_refresh = None
+        self.rate = 1.0
+        self.position = None     # seconds, when known from the DevTools backend
 
-    def _focus_youtube_window(self):
+    def media_playing(self, max_age=2.0):
         """
-        Try to activate a window with 'youtube' in the title using pygetwindow (gw).
-        Returns True if activated, False otherwise.
+        Whether a YouTube video is actually playing, for the echo gate. Never blocks: with a
+        DevTools tab attached the player's paused flag is re-read in the background at most
+        every `max_age` seconds; without one, only a freshly loaded video title counts.
         """
-        if gw:
-            try:
-                for w in gw.getAllWindows():
-                    if w and (w.title or "").lower().find("youtube") != -1:
-                        try:
-                            w.activate()
-                            time.sleep(0.25)
-                            return True
-                        except Exception:
-                            continue
-            except Exception:
-                try:
-                    wins = gw.getWindowsWithTitle("YouTube")
-                    if wins:
-                        wins[0].activate()
-                        time.sleep(0.25)
-                        return True
-                except Exception:
-                    return False
+        st = self.now_playing.state["youtube"] if self.now_playing else {}
+        if (self.cdp is not None and self.cdp.ws and time.monotonic() - self._playing_checked > max_age
+                and not (self._playing_refresh and self._playing_refresh.is_alive())):
+            self._playing_checked = time.monotonic()
+            self._playing_refresh = threading.Thread(target=self._refresh_playing, name="pink-yt-state", daemon=True)
+            self._playing_refresh.start()
+        return st.get("running") and st.get("playing") is True
+
+    def _refresh_playing(self):
+        ok, paused = self._via_cdp("paused")
+        if ok and self.now_playing:
+            self.now_playing.set_playing("youtube", not paused)
+
+    def _via_cdp(self, op, *args):
+        """
+        Run a CdpYouTube operation. Returns (True, value), or (False, None) when the
+        DevTools endpoint is unavailable or the call failed and keystrokes should be used.
+        """
+        if self.cdp is None:
+            return False, None
+        if not self.cdp.ws and time.monotonic() - self._cdp_checked > 30:
+            # probe at most every 30 s so a browser without the debug port costs nothing
+            self._cdp_checked = time.monotonic()
+            self._cdp_up = self.cdp.available()
+        if not (self.cdp.ws or self._cdp_up):
+            return False, None
+        try:
+            return True, getattr(self.cdp, op)(*args)
+        except Exception as e:
+            print(f"YouTube DevTools {op} failed, using keystrokes:", e)
+            self._cdp_up = False
+            return False, None
+
+    def _results_url(self, query):
+        return f"https://www.youtube.com/results?search_query={query.replace(' ', '+')}"
+
+    def play_query(self, query):
+        """Start the first search result for query (DevTools), else open the results page."""
+        ok, video_id = self._via_cdp("play_first", query)
+        if ok:
+            return True
+        webbrowser.open(self._results_url(query))
         return False
 
+    def search(self, query):
+        ok, _ = self._via_cdp("open_url", self._results_url(query))
+        if not ok:
+            webbrowser.open(self._results_url(query))
+        return True
+
+    def open_home(self):
+        ok, _ = self._via_cdp("open_url", "https://www.youtube.com")
+        if not ok:
+            webbrowser.open("https://www.youtube.com")
+        return True
+
+    def set_speed(self, rate):
+        """
+        Set playback rate exactly via DevTools; the keystroke fallback steps '<' / '>'
+        (0.25 each) from the last rate we set.
+        """
+        rate = max(0.25, min(2.0, round(rate * 4) / 4))
+        ok, value = self._via_cdp("set_rate", rate)
+        if ok:
+            self.rate = value
+            return True
+        try:
+            self._focus_youtube_window()
+            steps = int(round((rate - self.rate) / 0.25))
+            for _ in range(abs(steps)):
+                pyautogui.hotkey('shift', '.' if steps > 0 else ',')
+                time.sleep(0.06)
+            self.rate = rate
+            return True
+        except Exception:
+            return False
+
+    def _focus_youtube_window(self):
+        """
+        Bring the window showing YouTube to the front via the window registry.
+        Returns True if it is focused, False otherwise.
+        """
+        return self.windows.focus("youtube")
+
     def next_video(self):
         """
         Go to next video. YouTube player shortcut: Shift+N (in player).
         If that doesn't work, try pressing 'n' as fallback.
         """
+        ok, _ = self._via_cdp("next_video")
+        if ok:
+            return True
         try:
             self._focus_youtube_window()
-            time.sleep(0.1)
             # Shift+N
             pyautogui.press('n')
 
@@ -497,9 +1649,11 @@ class YouTubeController:
         """
         Close the current tab (Ctrl+W). If that fails, caller may fallback to killing browser.
         """
+        ok, closed = self._via_cdp("close")
+        if ok and closed:
+            return True
         try:
             self._focus_youtube_window()
-            time.sleep(0.1)
             pyautogui.hotkey('ctrl', 'w')
             return True
         except Exception:
@@ -509,14 +1663,36 @@ class YouTubeController:
             except Exception:
                 return False
 
+    def seek_to(self, seconds):
+        """
+        Jump to an absolute position: exact via DevTools; otherwise '0' (start of the video)
+        followed by 'l' presses in 10 s steps.
+        """
+        ok, position = self._via_cdp("seek_to", max(0, seconds))
+        if ok:
+            self.position = position
+            return True
+        try:
+            self._focus_youtube_window()
+            pyautogui.press('0')
+            for _ in range(int(round(max(0, seconds) / 10))):
+                pyautogui.press('l')
+                time.sleep(0.06)
+            return True
+        except Exception:
+            return False
+
     def seek(self, seconds=10, direction='forward'):
         """
-        Seek forward/backward by seconds. Uses 'l' (forward 10s) and 'j' (back 10s).
-        For non-10-second steps, repeated presses are used.
+        Seek forward/backward by seconds: exactly via DevTools when available, otherwise
+        'l' (forward 10s) and 'j' (back 10s), with repeated presses for other steps.
         """
+        ok, position = self._via_cdp("seek_by", abs(seconds) if direction == 'forward' else -abs(seconds))
+        if ok:
+            self.position = position
+            return True
         try:
             self._focus_youtube_window()
-            time.sleep(0.08)
             # compute number of 10s jumps
             presses = max(1, int(round(abs(seconds) / 10)))  # e.g., 30s => 3 presses of 'l'/'j'
             key = 'l' if direction == 'forward' else 'j'
@@ -527,20 +1703,996 @@ class YouTubeController:
         except Exception:
             return False
 
-# ========== System Controller (brightness/volume etc.) ==========
-class SystemController:
-    def __init__(self, voice_engine):
-        self.voice = voice_engine
-        self.apps = AppController()
-        self.touchscreen = TouchscreenController(voice_engine)
+# ========== YouTube over Chrome DevTools Protocol ==========
+class _WebSocket:
+    """Minimal RFC 6455 client (text frames only) for the local DevTools endpoint."""
+    def __init__(self, url, timeout=3.0):
+        u = urllib.parse.urlparse(url)
+        self.sock = socket.create_connection((u.hostname, u.port or 80), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        key = base64.b64encode(os.urandom(16)).decode()
+        path = u.path + (f"?{u.query}" if u.query else "")
+        self.sock.sendall((f"GET {path} HTTP/1.1\r\nHost: {u.hostname}:{u.port}\r\n"
+                           "Upgrade: websocket\r\nConnection: Upgrade\r\n"
+                           f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n").encode())
+        resp = b""
+        while b"\r\n\r\n" not in resp:
+            chunk = self.sock.recv(4096)
+            if not chunk:
+                raise ConnectionError("websocket handshake failed")
+            resp += chunk
+        head, self._buf = resp.split(b"\r\n\r\n", 1)
+        if b" 101 " not in head.split(b"\r\n", 1)[0]:
+            raise ConnectionError(f"websocket handshake refused: {head[:80]!r}")
 
+    def _read_exact(self, n):
+        while len(self._buf) < n:
+            chunk = self.sock.recv(65536)
+            if not chunk:
+                raise ConnectionError("websocket closed")
+            self._buf += chunk
+        data, self._buf = self._buf[:n], self._buf[n:]
+        return data
 
-    def play_sound(self, path):
-        try:
-            if path and os.path.exists(path):
-                winsound.PlaySound(path, winsound.SND_FILENAME | winsound.SND_ASYNC)
-        except Exception:
-            pass
+    def _send_frame(self, opcode, payload):
+        header = bytearray([0x80 | opcode])
+        n = len(payload)
+        if n < 126:
+            header.append(0x80 | n)
+        elif n < 65536:
+            header.append(0x80 | 126)
+            header += struct.pack(">H", n)
+        else:
+            header.append(0x80 | 127)
+            header += struct.pack(">Q", n)
+        mask = os.urandom(4)
+        header += mask
+        self.sock.sendall(bytes(header) + bytes(b ^ mask[i % 4] for i, b in enumerate(payload)))
+
+    def send(self, text):
+        self._send_frame(0x1, text.encode("utf-8"))
+
+    def recv(self):
+        message = b""
+        while True:
+            b1, b2 = self._read_exact(2)
+            opcode, n = b1 & 0x0F, b2 & 0x7F
+            if n == 126:
+                n = struct.unpack(">H", self._read_exact(2))[0]
+            elif n == 127:
+                n = struct.unpack(">Q", self._read_exact(8))[0]
+            mask = self._read_exact(4) if b2 & 0x80 else None
+            data = self._read_exact(n)
+            if mask:
+                data = bytes(b ^ mask[i % 4] for i, b in enumerate(data))
+            if opcode == 0x8:
+                raise ConnectionError("websocket closed")
+            if opcode == 0x9:
+                self._send_frame(0xA, data)
+                continue
+            if opcode in (0x0, 0x1, 0x2):
+                message += data
+                if b1 & 0x80:
+                    return message.decode("utf-8")
+
+    def close(self):
+        try:
+            self._send_frame(0x8, b"")
+        except Exception:
+            pass
+        self.sock.close()
+
+class CdpYouTube:
+    """
+    Drives one reusable YouTube tab over the Chrome DevTools Protocol (start the browser
+    with --remote-debugging-port=<CONFIG["youtube_cdp_port"]>). The websocket stays open
+    between commands and every player operation is a single Runtime.evaluate, so seeks
+    are exact and need no window focus. Each expression carries a /*pink:<op> <args>*/
+    tag so the fake endpoint in pink_fakes.py can emulate it.
+    """
+    def __init__(self, host="127.0.0.1", port=9222, timeout=3.0):
+        self.base = f"http://{host}:{port}"
+        self.timeout = timeout
+        self.tab_id = None
+        self.ws = None
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.counters = collections.Counter()
+
+    def _http(self, path, method="GET"):
+        req = urllib.request.Request(self.base + path, method=method)
+        with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+            body = resp.read()
+        return json.loads(body) if body.strip().startswith((b"{", b"[")) else body
+
+    def available(self):
+        try:
+            self._http("/json/version")
+            return True
+        except Exception:
+            return False
+
+    def _attach(self, tab):
+        if self.ws:
+            self.ws.close()
+        self.tab_id = tab["id"]
+        self.ws = _WebSocket(tab["webSocketDebuggerUrl"], timeout=self.timeout)
+        self.counters["attach"] += 1
+
+    def _ensure_tab(self, url="https://www.youtube.com"):
+        """Reuse the attached tab, else any open YouTube tab, else open one."""
+        if self.ws:
+            return False
+        tabs = [t for t in self._http("/json/list") if t.get("type") == "page"]
+        tab = next((t for t in tabs if "youtube.com" in t.get("url", "")), None)
+        created = tab is None
+        if created:
+            tab = self._http("/json/new?" + urllib.parse.quote(url, safe=":/?=&"), method="PUT")
+        self._attach(tab)
+        return created
+
+    def _call(self, method, params=None):
+        msg_id = next(self._ids)
+        self.ws.send(json.dumps({"id": msg_id, "method": method, "params": params or {}}))
+        self.counters["round_trips"] += 1
+        while True:
+            msg = json.loads(self.ws.recv())
+            if msg.get("id") == msg_id:
+                if "error" in msg:
+                    raise RuntimeError(msg["error"].get("message", "CDP error"))
+                return msg.get("result", {})
+
+    def _op(self, name, js, **args):
+        """Run one tagged player operation in the tab; returns its JSON value."""
+        with self._lock:
+            for attempt in (0, 1):
+                try:
+                    self._ensure_tab()
+                    expr = f"/*pink:{name} {json.dumps(args)}*/ ({js})({json.dumps(args)})"
+                    res = self._call("Runtime.evaluate", {"expression": expr, "returnByValue": True, "awaitPromise": True})
+                    if res.get("exceptionDetails"):
+                        raise RuntimeError(res["exceptionDetails"].get("text", "script error"))
+                    return res.get("result", {}).get("value")
+                except (ConnectionError, OSError):
+                    # tab closed or browser restarted: drop it and retry once with a fresh tab
+                    self.ws, self.tab_id = None, None
+                    if attempt:
+                        raise
+
+    def seek_by(self, seconds):
+        return self._op("seek_by", "a => { const v = document.querySelector('video'); if (!v) throw new Error('no video');"
+                        " v.currentTime = Math.max(0, Math.min(v.duration || Infinity, v.currentTime + a.delta)); return v.currentTime; }",
+                        delta=seconds)
+
+    def seek_to(self, seconds):
+        return self._op("seek_to", "a => { const v = document.querySelector('video'); if (!v) throw new Error('no video');"
+                        " v.currentTime = a.t; return v.currentTime; }", t=seconds)
+
+    def set_rate(self, rate):
+        return self._op("rate", "a => { const v = document.querySelector('video'); if (!v) throw new Error('no video');"
+                        " v.playbackRate = a.rate; return v.playbackRate; }", rate=rate)
+
+    def paused(self):
+        return self._op("paused", "a => { const v = document.querySelector('video'); return !v || v.paused || v.ended; }")
+
+    def toggle(self):
+        return self._op("toggle", "a => { const v = document.querySelector('video'); if (!v) throw new Error('no video');"
+                        " if (v.paused) v.play(); else v.pause(); return !v.paused; }")
+
+    def next_video(self):
+        return self._op("next", "a => { const b = document.querySelector('.ytp-next-button');"
+                        " if (!b) throw new Error('no next button'); b.click(); return true; }")
+
+    def play_first(self, query):
+        """Resolve the first search result from the tab's own origin and load it: one round trip."""
+        return self._op("play_first", "a => fetch('https://www.youtube.com/results?search_query=' + encodeURIComponent(a.q),"
+                        " {credentials: 'include'}).then(r => r.text()).then(t => { const m = t.match(/\"videoId\":\"([\\w-]{11})\"/);"
+                        " if (!m) throw new Error('no results'); location.href = 'https://www.youtube.com/watch?v=' + m[1]; return m[1]; })",
+                        q=query)
+
+    def open_url(self, url):
+        return self._op("navigate", "a => { location.href = a.url; return a.url; }", url=url)
+
+    def close(self):
+        """Close the controlled tab."""
+        with self._lock:
+            if not self.tab_id:
+                return False
+            self._http(f"/json/close/{self.tab_id}")
+            if self.ws:
+                self.ws.close()
+            self.ws, self.tab_id = None, None
+            return True
+
+# ========== Window events / now playing ==========
+class WinEventWatcher:
+    """
+    Thin SetWinEventHook wrapper: one background thread owns the hooks and pumps messages,
+    subscribers get the hwnd of top-level windows that changed. Subscribe before start().
+    Chatty events (location changes fire on every caret move) can be subscribed per
+    process: they are only hooked for the processes passed to track_process().
+    On non-Windows platforms `available` is False and nothing is hooked.
+    """
+    EVENT_SYSTEM_FOREGROUND = 0x0003
+    EVENT_OBJECT_CREATE = 0x8000
+    EVENT_OBJECT_DESTROY = 0x8001
+    EVENT_OBJECT_LOCATIONCHANGE = 0x800B
+    EVENT_OBJECT_NAMECHANGE = 0x800C
+    WM_TRACK_PROCESS = 0x8000 + 1   # WM_APP + 1: hook the scoped events for process lParam
+
+    def __init__(self):
+        self.available = sys.platform == "win32"
+        self.running = False
+        self.counters = collections.Counter()
+        self._subs = collections.defaultdict(list)
+        self._scoped = set()     # events hooked per tracked process instead of system-wide
+        self._pids = set()
+        self._proc_names = {}
+        self._thread = None
+        self._thread_id = None
+        self._ready = threading.Event()
+
+    def subscribe(self, event, fn, per_process=False):
+        self._subs[event].append(fn)
+        if per_process:
+            self._scoped.add(event)
+
+    def track_process(self, pid):
+        """Start delivering per-process events for `pid` (idempotent)."""
+        if not pid or pid in self._pids:
+            return
+        self._pids.add(pid)
+        if self._thread_id:
+            ctypes.windll.user32.PostThreadMessageW(self._thread_id, self.WM_TRACK_PROCESS, 0, pid)
+
+    def start(self):
+        if not self.available or self._thread:
+            return self.running
+        self._thread = threading.Thread(target=self._run, name="pink-winevents", daemon=True)
+        self._thread.start()
+        self._ready.wait(2.0)
+        return self.running
+
+    def stop(self):
+        if self._thread_id:
+            ctypes.windll.user32.PostThreadMessageW(self._thread_id, 0x0012, 0, 0)  # WM_QUIT
+
+    def _run(self):
+        user32 = ctypes.windll.user32
+        proc_type = ctypes.WINFUNCTYPE(None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+                                       wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD)
+        user32.SetWinEventHook.restype = wintypes.HANDLE
+        self._proc = proc_type(self._on_event)   # keep a reference for the hook's lifetime
+        flags = 0x0000 | 0x0002                  # WINEVENT_OUTOFCONTEXT | WINEVENT_SKIPOWNPROCESS
+        hook = lambda ev, pid: user32.SetWinEventHook(ev, ev, 0, self._proc, pid, 0, flags)
+        hooks = [hook(ev, 0) for ev in self._subs if ev not in self._scoped]
+        hooked = set()
+        def hook_process(pid):
+            if pid not in hooked:
+                hooked.add(pid)
+                hooks.extend(hook(ev, pid) for ev in self._scoped)
+        self._thread_id = ctypes.windll.kernel32.GetCurrentThreadId()
+        for pid in list(self._pids):
+            hook_process(pid)
+        self.running = any(hooks)
+        self._ready.set()
+        msg = wintypes.MSG()
+        while user32.GetMessageW(ctypes.byref(msg), 0, 0, 0) > 0:
+            if not msg.hWnd and msg.message == self.WM_TRACK_PROCESS:
+                hook_process(msg.lParam)
+                continue
+            user32.TranslateMessage(ctypes.byref(msg))
+            user32.DispatchMessageW(ctypes.byref(msg))
+        for h in hooks:
+            if h:
+                user32.UnhookWinEvent(h)
+        self.running = False
+
+    def _on_event(self, hook, event, hwnd, id_object, id_child, thread, ms):
+        # only whole top-level windows (OBJID_WINDOW, CHILDID_SELF)
+        if id_object != 0 or id_child != 0 or not hwnd:
+            return
+        self.counters[event] += 1
+        if event == self.EVENT_OBJECT_DESTROY:
+            self._proc_names.pop(hwnd, None)
+        for fn in self._subs.get(event, ()):
+            try:
+                fn(hwnd)
+            except Exception as e:
+                print("Window event handler error:", e)
+
+    def title(self, hwnd):
+        user32 = ctypes.windll.user32
+        n = user32.GetWindowTextLengthW(hwnd)
+        buf = ctypes.create_unicode_buffer(n + 1)
+        user32.GetWindowTextW(hwnd, buf, n + 1)
+        return buf.value
+
+    def process_id(self, hwnd):
+        pid = wintypes.DWORD()
+        ctypes.windll.user32.GetWindowThreadProcessId(hwnd, ctypes.byref(pid))
+        return pid.value
+
+    def process_name(self, hwnd):
+        name = self._proc_names.get(hwnd)
+        if name is None:
+            pid = self.process_id(hwnd)
+            try:
+                name = psutil.Process(pid).name().lower()
+            except Exception:
+                name = ""
+            self._proc_names[hwnd] = name
+        return name
+
+    def foreground(self):
+        return ctypes.windll.user32.GetForegroundWindow() if self.available else None
+
+    def windows(self):
+        """[(hwnd, title)] for visible, titled top-level windows."""
+        if not self.available:
+            return []
+        user32 = ctypes.windll.user32
+        found = []
+        enum_type = ctypes.WINFUNCTYPE(wintypes.BOOL, wintypes.HWND, wintypes.LPARAM)
+        def cb(hwnd, _):
+            if user32.IsWindowVisible(hwnd):
+                t = self.title(hwnd)
+                if t:
+                    found.append((hwnd, t))
+            return True
+        user32.EnumWindows(enum_type(cb), 0)
+        return found
+
+class NowPlayingTracker:
+    """
+    In-memory now-playing state built from window-title change events.
+    Spotify's main window is titled "Artist - Track" while playing and "Spotify Premium"
+    (or "Spotify"/"Spotify Free") while paused; browser windows showing a YouTube tab are
+    titled "<video> - YouTube - <browser>". Titles can't show a YouTube pause, so a new
+    video title only marks it playing; set_playing() records the player's real state.
+    Readers use snapshot()/describe(); commands that change playback can wait_for_change()
+    instead of sleeping and re-checking.
+    """
+    _SPOTIFY_IDLE = ("spotify", "spotify premium", "spotify free")
+
+    def __init__(self, watcher):
+        self.watcher = watcher
+        self._cond = threading.Condition()
+        self._sources = {}      # hwnd -> "spotify" | "youtube"
+        self.state = {
+            "spotify": {"track": None, "artist": None, "playing": False, "running": False, "changed_at": None, "version": 0},
+            "youtube": {"track": None, "artist": None, "playing": None, "running": False, "changed_at": None, "version": 0},
+        }
+        watcher.subscribe(WinEventWatcher.EVENT_OBJECT_NAMECHANGE, self._on_title)
+        watcher.subscribe(WinEventWatcher.EVENT_OBJECT_DESTROY, self._on_destroy)
+
+    @property
+    def live(self):
+        return self.watcher.running
+
+    def seed(self):
+        for hwnd, title in self.watcher.windows():
+            self.update(hwnd, title)
+
+    def _on_title(self, hwnd):
+        self.update(hwnd, self.watcher.title(hwnd))
+
+    def _on_destroy(self, hwnd):
+        source = self._sources.pop(hwnd, None)
+        if source:
+            self._commit(source, {"track": None, "artist": None, "playing": False if source == "spotify" else None, "running": False})
+
+    def _classify(self, hwnd, title, process):
+        if hwnd in self._sources:
+            return self._sources[hwnd]
+        proc = process if process is not None else self.watcher.process_name(hwnd)
+        if proc == "spotify.exe":
+            return "spotify"
+        if " - YouTube" in title:
+            return "youtube"
+        return None
+
+    @staticmethod
+    def _split_artist(text):
+        if " - " in text:
+            artist, track = text.split(" - ", 1)
+            return track.strip(), artist.strip()
+        return text.strip(), None
+
+    def update(self, hwnd, title, process=None):
+        title = (title or "").strip()
+        if not title:
+            return
+        source = self._classify(hwnd, title, process)
+        if source == "spotify":
+            self._sources[hwnd] = source
+            if title.lower() in self._SPOTIFY_IDLE:
+                self._commit(source, {"playing": False, "running": True})
+            else:
+                track, artist = self._split_artist(title)
+                self._commit(source, {"track": track, "artist": artist, "playing": True, "running": True})
+        elif source == "youtube":
+            self._sources[hwnd] = source
+            if " - YouTube" not in title:
+                return   # browser switched to another tab; keep the last video
+            video = re.sub(r"^\(\d+\)\s*", "", title.split(" - YouTube")[0])
+            track, artist = self._split_artist(video)
+            fields = {"track": track, "artist": artist, "running": True}
+            if (track, artist) != (self.state[source]["track"], self.state[source]["artist"]):
+                fields["playing"] = True    # a newly loaded video autoplays
+            self._commit(source, fields)
+
+    def set_playing(self, source, playing):
+        self._commit(source, {"playing": bool(playing)})
+
+    def _commit(self, source, fields):
+        with self._cond:
+            st = self.state[source]
+            if all(st.get(k) == v for k, v in fields.items()):
+                return
+            st.update(fields)
+            st["changed_at"] = time.time()
+            st["version"] += 1
+            self._cond.notify_all()
+
+    def version(self, source):
+        return self.state[source]["version"]
+
+    def snapshot(self, source=None):
+        with self._cond:
+            if source:
+                return dict(self.state[source])
+            return {k: dict(v) for k, v in self.state.items()}
+
+    def wait_for_change(self, source, since_version, timeout=1.5):
+        """Block until `source` changes past since_version; returns the new state or None."""
+        if not self.live or not self.state[source]["running"]:
+            return None
+        with self._cond:
+            if self._cond.wait_for(lambda: self.state[source]["version"] != since_version, timeout):
+                return dict(self.state[source])
+        return None
+
+    @staticmethod
+    def label(st):
+        if not st or not st.get("track"):
+            return None
+        return f"{st['track']} by {st['artist']}" if st.get("artist") else st["track"]
+
+    def describe(self):
+        sp, yt = self.snapshot("spotify"), self.snapshot("youtube")
+        if sp["running"] and sp["track"]:
+            return f"{'Playing' if sp['playing'] else 'Paused'} on Spotify: {self.label(sp)}."
+        if yt["running"] and yt["track"]:
+            return f"On YouTube: {self.label(yt)}."
+        if sp["running"]:
+            return "Spotify is open but nothing is playing."
+        return "Nothing is playing right now."
+
+class WindowRegistry:
+    """
+    Cached window handles per logical target ("spotify", "youtube", "browser") plus the
+    current foreground window, kept fresh by WinEventWatcher create/destroy/title events;
+    move events are only hooked for the processes owning resolved targets. focus() skips
+    activation (and the settle wait) when the target is already in front; geometry()
+    serves window rects from cache. Without live hooks it falls back to
+    pygetwindow lookups on every call, as before.
+    """
+    BROWSERS = ("chrome.exe", "msedge.exe", "firefox.exe", "brave.exe", "opera.exe")
+
+    def __init__(self, watcher, settle=0.3):
+        self.watcher = watcher
+        self.settle = settle
+        self.foreground = None
+        self._handles = {}      # target -> hwnd
+        self._rects = {}        # hwnd -> (left, top, width, height)
+        self._cond = threading.Condition()
+        self.counters = collections.Counter()
+        watcher.subscribe(WinEventWatcher.EVENT_SYSTEM_FOREGROUND, self._on_foreground)
+        watcher.subscribe(WinEventWatcher.EVENT_OBJECT_CREATE, self._on_create)
+        watcher.subscribe(WinEventWatcher.EVENT_OBJECT_DESTROY, self._on_destroy)
+        watcher.subscribe(WinEventWatcher.EVENT_OBJECT_NAMECHANGE, self._on_title)
+        watcher.subscribe(WinEventWatcher.EVENT_OBJECT_LOCATIONCHANGE, self._on_move, per_process=True)
+
+    @property
+    def live(self):
+        return self.watcher.running
+
+    # ----- event handlers (watcher thread) -----
+    def _on_foreground(self, hwnd):
+        with self._cond:
+            self.foreground = hwnd
+            self._cond.notify_all()
+
+    def _on_create(self, hwnd):
+        # a new window may be a better match for targets we couldn't resolve
+        with self._cond:
+            for target in [t for t, h in self._handles.items() if h is None]:
+                del self._handles[target]
+
+    def _on_destroy(self, hwnd):
+        with self._cond:
+            self._rects.pop(hwnd, None)
+            for target in [t for t, h in self._handles.items() if h == hwnd]:
+                del self._handles[target]
+
+    def _on_title(self, hwnd):
+        # the youtube target follows whichever browser window is showing a YouTube tab
+        with self._cond:
+            if self._handles.get("youtube") in (hwnd, None):
+                self._handles.pop("youtube", None)
+
+    def _on_move(self, hwnd):
+        self._rects.pop(hwnd, None)
+
+    # ----- lookups -----
+    def _matches(self, target, hwnd, title):
+        if target == "youtube":
+            return "youtube" in title.lower()
+        proc = self.watcher.process_name(hwnd)
+        if target == "spotify":
+            return proc == "spotify.exe"
+        if target == "browser":
+            return proc in self.BROWSERS
+        return target.lower() in title.lower()
+
+    def handle(self, target):
+        if not self.live:
+            return None
+        with self._cond:
+            if target in self._handles:
+                self.counters["handle_hits"] += 1
+                return self._handles[target]
+        self.counters["handle_misses"] += 1
+        hwnd = next((h for h, t in self.watcher.windows() if self._matches(target, h, t)), None)
+        if hwnd:
+            self.watcher.track_process(self.watcher.process_id(hwnd))
+        with self._cond:
+            self._handles[target] = hwnd
+        return hwnd
+
+    def _gw_window(self, target):
+        if not gw:
+            return None
+        try:
+            if target == "youtube":
+                return next((w for w in gw.getAllWindows() if w and "youtube" in (w.title or "").lower()), None)
+            wins = gw.getWindowsWithTitle("Spotify" if target == "spotify" else target)
+            return wins[0] if wins else None
+        except Exception:
+            return None
+
+    def geometry(self, target):
+        """(left, top, width, height) of the target window, or None."""
+        if self.live:
+            hwnd = self.handle(target)
+            if not hwnd:
+                return None
+            rect = self._rects.get(hwnd)
+            if rect is None:
+                r = wintypes.RECT()
+                if not ctypes.windll.user32.GetWindowRect(hwnd, ctypes.byref(r)):
+                    return None
+                rect = (r.left, r.top, r.right - r.left, r.bottom - r.top)
+                self._rects[hwnd] = rect
+            else:
+                self.counters["geometry_hits"] += 1
+            return rect
+        w = self._gw_window(target)
+        return (w.left, w.top, w.width, w.height) if w else None
+
+    def focus(self, target):
+        """
+        Bring the target window to the front. Returns True when it is (or already was)
+        focused; activation and its settle delay are skipped if it's already in front.
+        """
+        if not self.live:
+            w = self._gw_window(target)
+            if not w:
+                return False
+            try:
+                active = gw.getActiveWindow()
+                if active is not None and getattr(active, "_hWnd", None) == getattr(w, "_hWnd", object()):
+                    self.counters["focus_elided"] += 1
+                    return True
+                w.activate()
+                time.sleep(self.settle)
+                self.counters["focus_activated"] += 1
+                return True
+            except Exception:
+                return False
+
+        hwnd = self.handle(target)
+        if not hwnd:
+            return False
+        if self.foreground is None:
+            self.foreground = self.watcher.foreground()
+        if hwnd == self.foreground:
+            self.counters["focus_elided"] += 1
+            return True
+        user32 = ctypes.windll.user32
+        if user32.IsIconic(hwnd):
+            user32.ShowWindow(hwnd, 9)   # SW_RESTORE
+        user32.SetForegroundWindow(hwnd)
+        self.counters["focus_activated"] += 1
+        # settle on the foreground event instead of a fixed sleep
+        with self._cond:
+            return self._cond.wait_for(lambda: self.foreground == hwnd, self.settle)
+
+    def status(self):
+        return {"live": self.live, "foreground": self.foreground,
+                "handles": dict(self._handles), "counters": dict(self.counters)}
+
+# ========== Power policy ==========
+POWER_PROFILES = {
+    "performance": {
+        "listen_timeout": 6,        # seconds the mic waits for speech per cycle
+        "idle_sleep": 0.4,          # pause after a cycle with no speech
+        "camera_fps": 30,
+        "camera_size": (640, 480),
+        "defer_background": False,
+    },
+    "low_power": {
+        # duty-cycled wake word spotting: short listen windows with longer gaps
+        "listen_timeout": 3,
+        "idle_sleep": 1.5,
+        "camera_fps": 12,
+        "camera_size": (320, 240),
+        "defer_background": True,
+    },
+}
+
+class PowerPolicy:
+    """
+    Samples battery / AC state in the background and picks a profile from POWER_PROFILES:
+    "low_power" on battery, "performance" on mains. Consumers read `profile` (a dict) on
+    each cycle or subscribe with on_change(). Background work submitted through defer()
+    is held while on battery and run once the charger is connected.
+    """
+    def __init__(self, interval=30):
+        self.interval = interval
+        self.name = "performance"
+        self.battery = None
+        self._listeners = []
+        self._deferred = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._since = time.monotonic()
+        self.counters = {
+            "samples": 0, "switches": 0, "deferred_run": 0,
+            "idle_sleep_s": 0.0, "camera_frames": 0, "camera_frames_skipped": 0,
+            "seconds_in": {name: 0.0 for name in POWER_PROFILES},
+        }
+
+    @property
+    def profile(self):
+        return POWER_PROFILES[self.name]
+
+    def on_change(self, fn):
+        self._listeners.append(fn)
+
+    def sample(self):
+        try:
+            b = psutil.sensors_battery()
+        except Exception:
+            b = None
+        self.counters["samples"] += 1
+        if b is None:
+            # desktops / unreadable sensors: treat as mains
+            self.battery = None
+            self._set("performance")
+            return
+        self.battery = {"percent": int(b.percent), "plugged": bool(b.power_plugged)}
+        self._set("performance" if b.power_plugged else "low_power")
+
+    def _set(self, name):
+        with self._lock:
+            if name == self.name:
+                return
+            now = time.monotonic()
+            self.counters["seconds_in"][self.name] += now - self._since
+            self._since = now
+            self.name = name
+            self.counters["switches"] += 1
+        print(f"Power profile: {name}")
+        for fn in list(self._listeners):
+            try:
+                fn(name, self.profile)
+            except Exception as e:
+                print("Power listener error:", e)
+        if not self.profile["defer_background"]:
+            self._run_deferred()
+
+    def defer(self, key, fn):
+        """
+        Run fn in a background thread now, or hold it (deduplicated by key) until the
+        profile allows background work.
+        """
+        if self.profile["defer_background"]:
+            with self._lock:
+                self._deferred[key] = fn
+            return False
+        threading.Thread(target=fn, name=f"pink-bg-{key}", daemon=True).start()
+        return True
+
+    def _run_deferred(self):
+        with self._lock:
+            jobs = list(self._deferred.items())
+            self._deferred.clear()
+        for key, fn in jobs:
+            self.counters["deferred_run"] += 1
+            threading.Thread(target=fn, name=f"pink-bg-{key}", daemon=True).start()
+
+    def idle(self):
+        """Sleep between listen cycles that heard nothing (longer on battery)."""
+        gap = self.profile["idle_sleep"]
+        self.counters["idle_sleep_s"] += gap
+        time.sleep(gap)
+
+    def start(self):
+        self.sample()
+        self._thread = threading.Thread(target=self._loop, name="pink-power", daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self):
+        seconds_in = dict(self.counters["seconds_in"])
+        seconds_in[self.name] += time.monotonic() - self._since
+        return {
+            "profile": self.name,
+            "battery": self.battery,
+            "deferred_pending": list(self._deferred),
+            "counters": dict(self.counters, seconds_in={k: round(v, 1) for k, v in seconds_in.items()}),
+        }
+
+# ========== Local music library ==========
+class MusicLibrary:
+    """
+    SQLite index of the music folders in CONFIG["music_library"], so "play <query>" can
+    start a local file in milliseconds instead of driving the Spotify UI. Tags come from
+    mutagen when installed, otherwise "Artist - Title" file names. Scans are incremental
+    (only files whose mtime/size changed are re-read, vanished ones are dropped) and run in
+    the background through PowerPolicy.defer, so startup never waits on the disk. Search
+    uses an FTS5 trigram index when SQLite has it (substring matches, ranked by bm25 with
+    title > artist > album), plain FTS5 otherwise, and LIKE as a last resort.
+    """
+    EXTENSIONS = {".mp3", ".flac", ".m4a", ".aac", ".ogg", ".opus", ".wav", ".wma"}
+    FILLER = {"the", "song", "track", "by", "some", "music", "a", "me", "please", "pink"}
+
+    def __init__(self, db_path, folders, power=None, rescan_interval=1800, player=None):
+        self.db_path = db_path
+        self.folders = [os.path.expanduser(f) for f in folders]
+        self.power = power
+        self.rescan_interval = rescan_interval
+        self.player = player
+        self._lock = threading.Lock()
+        self._scan_lock = threading.Lock()
+        self.fts = None
+        self.last_scan = None
+        self._db = self._open()
+
+    def _open(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        db = sqlite3.connect(self.db_path, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute("""CREATE TABLE IF NOT EXISTS tracks (
+                          id INTEGER PRIMARY KEY, path TEXT UNIQUE NOT NULL, mtime REAL, size INTEGER,
+                          title TEXT, artist TEXT, album TEXT, search TEXT)""")
+        for tokenizer, mode in (("trigram", "trigram"), ("unicode61 remove_diacritics 2", "fts5")):
+            try:
+                db.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS tracks_fts USING fts5("
+                           f"title, artist, album, name, tokenize='{tokenizer}')")
+                db.execute("SELECT count(*) FROM tracks_fts WHERE tracks_fts MATCH 'abc'")
+                self.fts = mode
+                break
+            except sqlite3.OperationalError:
+                continue
+        db.commit()
+        return db
+
+    # ----- scanning -----
+    @staticmethod
+    def _tags(path):
+        title = artist = album = None
+        if mutagen is not None:
+            try:
+                f = mutagen.File(path, easy=True)
+                if f is not None and f.tags:
+                    first = lambda k: (f.tags.get(k) or [None])[0]
+                    title, artist, album = first("title"), first("artist"), first("album")
+            except Exception:
+                pass
+        if not title:
+            stem = os.path.splitext(os.path.basename(path))[0]
+            stem = re.sub(r"^\d+[\s._-]+", "", stem)            # leading track numbers
+            if " - " in stem:
+                guess_artist, title = stem.split(" - ", 1)
+                artist = artist or guess_artist
+            else:
+                title = stem
+        if not album:
+            album = os.path.basename(os.path.dirname(path))
+        return title.strip(), (artist or "").strip(), (album or "").strip()
+
+    def _walk(self, folder):
+        stack = [folder]
+        while stack:
+            try:
+                with os.scandir(stack.pop()) as it:
+                    for entry in it:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif os.path.splitext(entry.name)[1].lower() in self.EXTENSIONS:
+                            yield entry
+            except OSError:
+                continue
+
+    def scan(self, batch=500):
+        """Incremental rescan; returns stats (None if a scan is already running)."""
+        if not self._scan_lock.acquire(blocking=False):
+            return None
+        try:
+            t0 = time.perf_counter()
+            with self._lock:
+                known = {p: (m, s, i) for i, p, m, s in self._db.execute("SELECT id, path, mtime, size FROM tracks")}
+            seen, changed = set(), []
+            stats = {"files": 0, "added": 0, "updated": 0, "removed": 0}
+            for folder in self.folders:
+                for entry in self._walk(folder):
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    stats["files"] += 1
+                    seen.add(entry.path)
+                    old = known.get(entry.path)
+                    if old and old[0] == st.st_mtime and old[1] == st.st_size:
+                        continue
+                    changed.append((entry.path, st.st_mtime, st.st_size, old[2] if old else None))
+                    if len(changed) >= batch:
+                        self._store(changed, stats)
+                        changed = []
+            self._store(changed, stats)
+            gone = [v[2] for p, v in known.items() if p not in seen]
+            if gone:
+                with self._lock, self._db:
+                    for i in range(0, len(gone), batch):
+                        chunk = [(g,) for g in gone[i:i + batch]]
+                        self._db.executemany("DELETE FROM tracks WHERE id = ?", chunk)
+                        if self.fts:
+                            self._db.executemany("DELETE FROM tracks_fts WHERE rowid = ?", chunk)
+                stats["removed"] = len(gone)
+            stats["seconds"] = round(time.perf_counter() - t0, 2)
+            self.last_scan = dict(stats, finished=datetime.now().isoformat(timespec="seconds"))
+            if stats["added"] or stats["updated"] or stats["removed"]:
+                print(f"Music library: {stats['files']} files, +{stats['added']} ~{stats['updated']} -{stats['removed']} "
+                      f"in {stats['seconds']} s")
+            return stats
+        finally:
+            self._scan_lock.release()
+
+    def _store(self, changed, stats):
+        if not changed:
+            return
+        rows = []
+        for path, mtime, size, track_id in changed:
+            title, artist, album = self._tags(path)
+            name = os.path.splitext(os.path.basename(path))[0]
+            rows.append((track_id, path, mtime, size, title, artist, album, name))
+            stats["updated" if track_id else "added"] += 1
+        with self._lock, self._db:
+            for track_id, path, mtime, size, title, artist, album, name in rows:
+                search = " ".join((title, artist, album, name)).lower()
+                cur = self._db.execute(
+                    "INSERT INTO tracks (id, path, mtime, size, title, artist, album, search) VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(path) DO UPDATE SET mtime=excluded.mtime, size=excluded.size, title=excluded.title, "
+                    "artist=excluded.artist, album=excluded.album, search=excluded.search",
+                    (track_id, path, mtime, size, title, artist, album, search))
+                rowid = track_id or cur.lastrowid
+                if self.fts:
+                    self._db.execute("DELETE FROM tracks_fts WHERE rowid = ?", (rowid,))
+                    self._db.execute("INSERT INTO tracks_fts (rowid, title, artist, album, name) VALUES (?, ?, ?, ?, ?)",
+                                     (rowid, title, artist, album, name))
+
+    def schedule_scan(self):
+        if self.power:
+            return self.power.defer("music-scan", self.scan)
+        threading.Thread(target=self.scan, name="pink-bg-music-scan", daemon=True).start()
+        return True
+
+    def start(self):
+        """Background scan now (or when the power profile allows) and every rescan_interval."""
+        if not self.folders:
+            return
+        def loop():
+            while True:
+                self.schedule_scan()
+                time.sleep(self.rescan_interval)
+        threading.Thread(target=loop, name="pink-music-rescan", daemon=True).start()
+
+    # ----- lookup / playback -----
+    def search(self, query, limit=5):
+        """Best matches for a spoken query as dicts (path, title, artist, album), best first."""
+        words = [w for w in re.findall(r"[\w']+", (query or "").lower()) if w not in self.FILLER]
+        if not words:
+            return []
+        cols = "t.path, t.title, t.artist, t.album"
+        usable = [w for w in words if len(w) >= 3] if self.fts == "trigram" else words
+        with self._lock:
+            if self.fts and usable:
+                match = " AND ".join('"' + w.replace('"', '""') + '"' for w in usable)
+                rows = self._db.execute(
+                    f"SELECT {cols} FROM tracks_fts f JOIN tracks t ON t.id = f.rowid "
+                    f"WHERE tracks_fts MATCH ? ORDER BY bm25(tracks_fts, 10.0, 5.0, 2.0, 1.0) LIMIT ?",
+                    (match, limit)).fetchall()
+            else:
+                rows = self._db.execute(
+                    f"SELECT {cols} FROM tracks t WHERE " + " AND ".join(["t.search LIKE ?"] * len(words)) +
+                    " ORDER BY length(t.title) LIMIT ?", [f"%{w}%" for w in words] + [limit]).fetchall()
+        return [dict(zip(("path", "title", "artist", "album"), r)) for r in rows]
+
+    def play(self, track):
+        path = track["path"]
+        if not os.path.exists(path):
+            return False
+        try:
+            if self.player:
+                _spawn(self._player_argv(path))
+            else:
+                _open_target(path)
+            return True
+        except Exception as e:
+            print("Local playback error:", e)
+            return False
+
+    def _player_argv(self, path):
+        """Split the player template first, then drop the path into its own argument (no shell)."""
+        posix = sys.platform != "win32"
+        argv = [a if posix else a.strip('"') for a in shlex.split(self.player, posix=posix)]
+        if not any("{path}" in a for a in argv):
+            return argv + [path]
+        return [a.replace("{path}", path) for a in argv]
+
+    def status(self):
+        with self._lock:
+            count = self._db.execute("SELECT count(*) FROM tracks").fetchone()[0]
+        return {"tracks": count, "index": self.fts or "like", "last_scan": self.last_scan,
+                "scanning": self._scan_lock.locked()}
+
+# ========== System Controller (brightness/volume etc.) ==========
+class SystemController:
+    def __init__(self, voice_engine):
+        self.voice = voice_engine
+        self.power = PowerPolicy(CONFIG.get("power_sample_interval", 30))
+        self.win_events = WinEventWatcher()
+        self.windows = WindowRegistry(self.win_events)
+        self.now_playing = NowPlayingTracker(self.win_events)
+        self.apps = AppController(self.windows)
+        self.touchscreen = TouchscreenController(voice_engine, self.power)
+        self.library = None
+        lib = CONFIG.get("music_library") or {}
+        if lib.get("enabled"):
+            try:
+                self.library = MusicLibrary(lib["db_path"], lib.get("folders", []), self.power,
+                                            lib.get("rescan_interval", 1800), lib.get("player"))
+            except Exception as e:
+                print("Music library unavailable:", e)
+
+
+    def play_sound(self, path):
+        try:
+            if path and os.path.exists(path):
+                winsound.PlaySound(path, winsound.SND_FILENAME | winsound.SND_ASYNC)
+        except Exception:
+            pass
 
     def check_battery(self):
         try:
@@ -691,9 +2843,9 @@ class SystemController:
                 "battery": "ms-settings:batterysaver"
             }
             if page in pages:
-                os.system(f"start {pages[page]}")
+                _shell(f"start {pages[page]}")
                 return f"Opened {page} settings."
-            os.system("start ms-settings:")
+            _shell("start ms-settings:")
             return "Opened Windows settings."
         except Exception as e:
             return f"Couldn't open settings: {e}"
@@ -703,96 +2855,1067 @@ class SystemController:
         return now.strftime("%I:%M %p")
 
 # ========== Touchless Touchscreen Controller ==========
-class TouchscreenController:
-    def __init__(self, voice_engine):
-        self.voice = voice_engine
-        self.running = False
-
-    def start(self):
+def _touchscreen_worker(conn, sensitivity=5):
+    """
+    Child process for touchless mode. Imports OpenCV/MediaPipe and builds the hand tracker
+    once, then idles on the pipe; each "start" runs a camera session until a "stop"
+    message, the exit gesture or ESC. Sends "ready", periodic "status" (fps, hand
+    detected, frame counts since the last status) and "stopped" back to the parent.
+    A "profiler" message samples this process with its own SamplingProfiler.
+    """
+    try:
         import cv2
         import mediapipe as mp
         import numpy as np
         import pyautogui
-        import math
+    except Exception as e:
+        conn.send({"type": "error", "error": f"touchless mode needs opencv-python and mediapipe: {e}"})
+        return
+    mp_hands = mp.solutions.hands
+    hands = mp_hands.Hands(max_num_hands=1, min_detection_confidence=0.7, min_tracking_confidence=0.7)
+    mp_draw = mp.solutions.drawing_utils
+    screen_w, screen_h = pyautogui.size()
+    state = {"sensitivity": sensitivity, "profile": POWER_PROFILES["performance"], "profiler": None}
+    conn.send({"type": "ready"})
 
-        self.running = True
-        self.voice.speak("Touchscreen mode activated")
+    def apply_profile(cap, profile):
+        w, h = profile["camera_size"]
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, w)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, h)
+        cap.set(cv2.CAP_PROP_FPS, profile["camera_fps"])
 
-        screen_w, screen_h = pyautogui.size()
+    def handle(msg):
+        """Applies a control message; returns it when it ends the session."""
+        if msg["type"] == "sensitivity":
+            state["sensitivity"] = msg["value"]
+        elif msg["type"] == "profile":
+            state["profile"] = msg["profile"]
+        elif msg["type"] == "profiler":
+            if msg["on"] and state["profiler"] is None:
+                state["profiler"] = SamplingProfiler(out_dir=msg["out_dir"], name="pink-touchscreen")
+                state["profiler"].start()
+            elif not msg["on"] and state["profiler"] is not None:
+                conn.send({"type": "profiled", "paths": state["profiler"].stop()})
+                state["profiler"] = None
+        elif msg["type"] in ("stop", "quit"):
+            return msg["type"]
+        return None
+
+    def session():
         cap = cv2.VideoCapture(0)
+        if not cap.isOpened():
+            return "camera"
+        profile = state["profile"]
+        apply_profile(cap, profile)
+        next_frame = time.perf_counter()
+        click_delay = 0
+        frames = skipped = 0
+        hand_seen = False
+        last_status = time.perf_counter()
+        reason = None
+        try:
+            while reason is None:
+                while conn.poll():
+                    reason = handle(conn.recv())
+                if reason:
+                    break
+                if state["profile"] is not profile:
+                    profile = state["profile"]
+                    apply_profile(cap, profile)
+                now = time.perf_counter()
+                if now - last_status >= 1.0:
+                    conn.send({"type": "status", "fps": round(frames / (now - last_status), 1), "hand": hand_seen,
+                               "frames": frames, "skipped": skipped})
+                    frames = skipped = 0
+                    last_status = now
+                # pace inference to the profile's frame rate; drivers often ignore CAP_PROP_FPS
+                if now < next_frame:
+                    if cap.grab():
+                        skipped += 1
+                    continue
+                next_frame = now + 1.0 / profile["camera_fps"]
 
-        mp_hands = mp.solutions.hands
-        hands = mp_hands.Hands(
-            max_num_hands=1,
-            min_detection_confidence=0.7,
-            min_tracking_confidence=0.7
-        )
-        mp_draw = mp.solutions.drawing_utils
+                success, frame = cap.read()
+                if not success:
+                    continue
+                frames += 1
 
-        click_delay = 0
+                frame = cv2.flip(frame, 1)
+                h, w, _ = frame.shape
+                results = hands.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+                hand_seen = bool(results.multi_hand_landmarks)
 
-        while self.running:
-            success, frame = cap.read()
-            if not success:
+                if hand_seen:
+                    hand = results.multi_hand_landmarks[0]
+                    lm = hand.landmark
+
+                    ix, iy = int(lm[8].x * w), int(lm[8].y * h)
+                    tx, ty = int(lm[4].x * w), int(lm[4].y * h)
+                    mx, my = int(lm[12].x * w), int(lm[12].y * h)
+
+                    screen_x = np.interp(ix, [0, w], [0, screen_w])
+                    screen_y = np.interp(iy, [0, h], [0, screen_h])
+                    pyautogui.moveTo(screen_x, screen_y, duration=0.01)
+
+                    # sensitivity 1..10 widens the pinch / scroll bands (5 = the original 30 / 40 px)
+                    s = state["sensitivity"]
+                    pinch = math.hypot(ix - tx, iy - ty)
+                    if pinch < 15 + 3 * s and click_delay == 0:
+                        pyautogui.click()
+                        click_delay = 15
+
+                    if abs(my - iy) < 25 + 3 * s:
+                        pyautogui.scroll(40 if my < iy else -40)
+
+                    # ✋ Exit gesture (2 fingers down)
+                    if lm[8].y > lm[6].y and lm[12].y > lm[10].y:
+                        reason = "gesture"
+
+                    mp_draw.draw_landmarks(frame, hand, mp_hands.HAND_CONNECTIONS)
+
+                if click_delay > 0:
+                    click_delay -= 1
+
+                cv2.imshow("Touchscreen Mode", frame)
+                if cv2.waitKey(1) & 0xFF == 27:
+                    reason = "esc"
+        finally:
+            cap.release()
+            cv2.destroyAllWindows()
+        return reason
+
+    while True:
+        try:
+            msg = conn.recv()
+        except (EOFError, OSError):
+            return
+        if msg["type"] == "start":
+            state["sensitivity"] = msg.get("sensitivity", state["sensitivity"])
+            state["profile"] = msg.get("profile", state["profile"])
+            reason = session()
+            conn.send({"type": "stopped", "reason": reason})
+            if reason == "quit":
+                return
+        elif handle(msg) == "quit":
+            return
+
+class TouchscreenController:
+    """
+    Touchless mode, hosted in a supervised child process (_touchscreen_worker) so the
+    voice loop keeps running and a MediaPipe crash can't take the assistant down. The
+    worker stays resident between activations, so reactivation skips the imports and
+    model setup. Control (start / stop / sensitivity / power profile, pushed from
+    PowerPolicy.on_change) and status (fps, hand detected) travel over a Pipe; a
+    supervisor thread reads status and restarts a crashed worker, resuming the session,
+    after a doubling `restart_backoff` delay, up to `max_restarts` times in a row.
+    """
+    def __init__(self, voice_engine, power=None, worker=None):
+        cfg = CONFIG.get("touchscreen") or {}
+        self.voice = voice_engine
+        self.power = power
+        self.worker = worker or _touchscreen_worker
+        self.sensitivity = cfg.get("sensitivity", 5)
+        self.max_restarts = cfg.get("max_restarts", 3)
+        self.restart_backoff = cfg.get("restart_backoff", 0.5)
+        self.running = False
+        self.profiling = False
+        self._proc = None
+        self._conn = None
+        self._profile = None
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._supervisor = None
+        self._crashes = 0
+        self.info = {"ready": False, "fps": 0.0, "hand": False, "restarts": 0, "last_error": None, "last_stop": None,
+                     "last_profile": None}
+        if power:
+            power.on_change(self._on_power_change)
+        if cfg.get("prewarm"):
+            self._ensure_worker()
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._proc is not None and self._proc.is_alive():
+                return
+            ctx = multiprocessing.get_context("spawn")
+            parent, child = ctx.Pipe()
+            self._proc = ctx.Process(target=self.worker, args=(child, self.sensitivity),
+                                     name="pink-touchscreen", daemon=True)
+            self._proc.start()
+            child.close()
+            self._conn = parent
+            self.info["ready"] = False
+            if self._supervisor is None:
+                self._supervisor = threading.Thread(target=self._supervise, name="pink-touchscreen-supervisor", daemon=True)
+                self._supervisor.start()
+
+    def _send(self, msg):
+        try:
+            with self._send_lock:
+                self._conn.send(msg)
+            return True
+        except (OSError, EOFError, AttributeError):
+            return False
+
+    def _current_profile(self):
+        return self.power.profile if self.power else POWER_PROFILES["performance"]
+
+    def start(self):
+        if self.running:
+            return True
+        try:
+            self._ensure_worker()
+        except Exception as e:
+            print("Touchscreen worker failed to start:", e)
+            return False
+        self._profile = self._current_profile()
+        self.running = True
+        if self.profiling:
+            self._send({"type": "profiler", "on": True, "out_dir": CONFIG["profile_dir"]})
+        return self._send({"type": "start", "profile": self._profile, "sensitivity": self.sensitivity})
+
+    def stop(self):
+        if not self.running:
+            return False
+        self.running = False
+        return self._send({"type": "stop"})
+
+    def _on_power_change(self, name, profile):
+        """PowerPolicy listener: retune a running camera session to the new profile."""
+        self._profile = profile
+        if self.running:
+            self._send({"type": "profile", "profile": profile})
+
+    def set_profiling(self, on):
+        """SamplingProfiler listener: profile the worker too while the assistant is profiled."""
+        self.profiling = on
+        if self._proc is not None and self._proc.is_alive():
+            self._send({"type": "profiler", "on": on, "out_dir": CONFIG["profile_dir"]})
+
+    def set_sensitivity(self, value):
+        self.sensitivity = max(1, min(10, int(value)))
+        if self._proc is not None and self._proc.is_alive():
+            self._send({"type": "sensitivity", "value": self.sensitivity})
+        return self.sensitivity
+
+    def close(self):
+        self.running = False
+        proc = self._proc
+        if proc is not None and proc.is_alive():
+            self._send({"type": "quit"})
+            proc.join(2)
+            if proc.is_alive():
+                proc.terminate()
+
+    def _on_message(self, msg):
+        kind = msg.get("type")
+        if kind == "ready":
+            self.info["ready"] = True
+        elif kind == "status":
+            self._crashes = 0
+            self.info.update(fps=msg["fps"], hand=msg["hand"])
+            if self.power:
+                self.power.counters["camera_frames"] += msg["frames"]
+                self.power.counters["camera_frames_skipped"] += msg["skipped"]
+        elif kind == "stopped":
+            self.info.update(last_stop=msg["reason"], fps=0.0, hand=False)
+            if self.running and msg["reason"] in ("gesture", "esc", "camera"):
+                self.running = False
+                self.voice.speak("Touchscreen mode deactivated" if msg["reason"] != "camera" else "Couldn't open the camera.")
+        elif kind == "profiled":
+            self.info["last_profile"] = msg["paths"]
+        elif kind == "error":
+            self.info["last_error"] = msg["error"]
+            print("Touchscreen worker error:", msg["error"])
+            if self.running:
+                self.running = False
+                self.voice.speak("Touchscreen mode is unavailable.")
+
+    def _supervise(self):
+        while True:
+            conn, proc = self._conn, self._proc
+            try:
+                if conn.poll(0.5):
+                    self._on_message(conn.recv())
+                    continue
+            except (EOFError, OSError):
+                proc.join(1)
+            if proc.is_alive():
                 continue
+            self.info["ready"] = False
+            if not self.running or self.info["last_error"]:
+                with self._lock:
+                    if self._proc is proc:      # nothing to resume; the next start() respawns
+                        self._supervisor = None
+                        return
+                continue
+            self._crashes += 1
+            self.info["restarts"] += 1
+            if self._crashes > self.max_restarts:
+                print(f"Touchscreen worker crashed {self._crashes} times in a row; giving up.")
+                self.running = False
+                with self._lock:
+                    self._supervisor = None
+                self.voice.speak("Touchscreen mode stopped after repeated crashes.")
+                return
+            delay = self.restart_backoff * 2 ** (self._crashes - 1)
+            print(f"Touchscreen worker exited (code {proc.exitcode}); restarting in {delay:g}s.")
+            time.sleep(delay)
+            if not self.running:
+                continue        # stopped during the backoff: the check above ends supervision
+            self.running = False
+            self.start()
 
-            frame = cv2.flip(frame, 1)
-            h, w, _ = frame.shape
-            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            results = hands.process(rgb)
+    def status(self):
+        return dict(self.info, running=self.running, sensitivity=self.sensitivity,
+                    worker_alive=bool(self._proc is not None and self._proc.is_alive()))
 
-            if results.multi_hand_landmarks:
-                hand = results.multi_hand_landmarks[0]
-                lm = hand.landmark
+# ========== Sampling profiler ==========
+class SamplingProfiler:
+    """
+    Wall-clock sampling profiler for every thread (listen loop, touchscreen loop, control
+    API, ...). While running, a daemon thread snapshots sys._current_frames() every
+    `interval` seconds; stopping writes collapsed stacks ("thread;frame;frame count", the
+    input format for flamegraph.pl / speedscope) plus a top-N hot-function summary.
+    When stopped there is no sampler thread and no hook installed, so it costs nothing.
+    Other processes sample themselves: `listeners` are called with True/False on start
+    and stop (the touchscreen worker writes its own "pink-touchscreen-*" report).
+    """
+    def __init__(self, interval=0.005, out_dir=None, top_n=25, name="pink"):
+        self.interval = interval
+        self.out_dir = out_dir or CONFIG["profile_dir"]
+        self.top_n = top_n
+        self.name = name
+        self.listeners = []
+        self.running = False
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self.started_at = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
 
-                ix, iy = int(lm[8].x * w), int(lm[8].y * h)
-                tx, ty = int(lm[4].x * w), int(lm[4].y * h)
-                mx, my = int(lm[12].x * w), int(lm[12].y * h)
+    @staticmethod
+    def _frame_label(code):
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
 
-                screen_x = np.interp(ix, [0, w], [0, screen_w])
-                screen_y = np.interp(iy, [0, h], [0, screen_h])
-                pyautogui.moveTo(screen_x, screen_y, duration=0.01)
+    def _sample_loop(self):
+        me = threading.get_ident()
+        labels = {}
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    label = labels.get(code)
+                    if label is None:
+                        label = labels[code] = self._frame_label(code)
+                    stack.append(label)
+                    frame = frame.f_back
+                stack.append(names.get(ident, f"thread-{ident}"))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
 
-                pinch = math.hypot(ix - tx, iy - ty)
-                if pinch < 30 and click_delay == 0:
-                    pyautogui.click()
-                    click_delay = 15
+    def start(self):
+        with self._lock:
+            if self.running:
+                return False
+            self.stacks = collections.Counter()
+            self.samples = 0
+            self.started_at = time.time()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._sample_loop, name="pink-profiler", daemon=True)
+            self.running = True
+            self._thread.start()
+        self._notify(True)
+        print(f"Profiler started (every {self.interval * 1000:.0f} ms).")
+        return True
 
-                if abs(my - iy) < 40:
-                    pyautogui.scroll(40 if my < iy else -40)
+    def _notify(self, on):
+        for fn in self.listeners:
+            try:
+                fn(on)
+            except Exception as e:
+                print("Profiler listener error:", e)
 
-                # ✋ Exit gesture (2 fingers down)
-                if lm[8].y > lm[6].y and lm[12].y > lm[10].y:
-                    self.voice.speak("Touchscreen mode deactivated")
-                    break
+    def stop(self):
+        """Stops sampling and writes the reports; returns (collapsed_path, summary_path) or None."""
+        with self._lock:
+            if not self.running:
+                return None
+            self._stop.set()
+            self._thread.join()
+            self.running = False
+        self._notify(False)
+        return self.write()
+
+    def toggle(self):
+        return self.stop() if self.running else self.start()
 
-                mp_draw.draw_landmarks(frame, hand, mp_hands.HAND_CONNECTIONS)
+    def top(self, n=None):
+        """[(function, self_samples, total_samples)] sorted by self samples."""
+        own, total = collections.Counter(), collections.Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")[1:]
+            if not frames:
+                continue
+            own[frames[-1]] += count
+            for f in set(frames):
+                total[f] += count
+        return [(f, c, total[f]) for f, c in own.most_common(n or self.top_n)]
 
-            if click_delay > 0:
-                click_delay -= 1
+    def write(self):
+        os.makedirs(self.out_dir, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(self.started_at or time.time()))
+        base = os.path.join(self.out_dir, f"{self.name}-{stamp}")
+        with open(base + ".collapsed", "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        thread_samples = sum(self.stacks.values()) or 1
+        with open(base + "-top.txt", "w", encoding="utf-8") as f:
+            f.write(f"{self.samples} sampling rounds, {thread_samples} thread samples, interval {self.interval * 1000:.1f} ms\n")
+            f.write(f"{'self%':>7} {'total%':>7}  function\n")
+            for func, own, total in self.top():
+                f.write(f"{100.0 * own / thread_samples:7.2f} {100.0 * total / thread_samples:7.2f}  {func}\n")
+        print(f"Profile written to {base}.collapsed and {base}-top.txt")
+        return base + ".collapsed", base + "-top.txt"
 
-            cv2.imshow("Touchscreen Mode", frame)
-            if cv2.waitKey(1) & 0xFF == 27:
+    def install_signal(self):
+        """Toggle on SIGUSR1 (POSIX) or Ctrl+Break / SIGBREAK (Windows)."""
+        sig = getattr(signal, "SIGUSR1", None) or getattr(signal, "SIGBREAK", None)
+        if sig is None:
+            return False
+        # the handler runs on the main thread; do the file writing elsewhere
+        signal.signal(sig, lambda *_: threading.Thread(target=self.toggle, daemon=True).start())
+        return True
+
+# ========== Action scheduling ==========
+class ActionQueue:
+    """
+    FIFO between dispatch and the controllers, run by one worker thread. Relative commands
+    ("volume up", "youtube forward 10", "select 3") are planned as (target, mode, value);
+    a new one for the same target as the last still-pending entry is folded into it
+    (+10 +10 +10 -> +30, set then delta -> adjusted set, a newer select replaces the older)
+    and the merged command runs once. A planned action only speaks its reply if no newer
+    action for the same target is waiting, so a burst ends in a single confirmation.
+    Replies that wait on a playback confirmation are finished on a side thread so the
+    next command doesn't queue behind the wait.
+    """
+    # (pattern, target, mode, sign, default amount)
+    PLANS = [
+        (r"(?:increase|raise|turn up) (?:the )?volume(?: by (?P<n>.+))?|volume up(?: (?P<n2>.+))?|louder", "volume", "delta", 1, 10),
+        (r"(?:decrease|lower|turn down) (?:the )?volume(?: by (?P<n>.+))?|volume down(?: (?P<n2>.+))?|quieter", "volume", "delta", -1, 10),
+        (r"set (?:the )?volume to (?P<n>.+)", "volume", "set", 1, None),
+        (r"(?:increase|raise) (?:the )?brightness(?: by (?P<n>.+))?|brightness up(?: (?P<n2>.+))?", "brightness", "delta", 1, 20),
+        (r"(?:decrease|lower) (?:the )?brightness(?: by (?P<n>.+))?|brightness down(?: (?P<n2>.+))?", "brightness", "delta", -1, 20),
+        (r"set (?:the )?brightness to (?P<n>.+)", "brightness", "set", 1, None),
+        (r"spotify (?:volume up|louder)(?: (?P<n>.+))?", "spotify_volume", "delta", 1, 6),
+        (r"spotify (?:volume down|quieter)(?: (?P<n>.+))?", "spotify_volume", "delta", -1, 6),
+        (r"youtube (?:fast )?forward(?: (?P<n>\d+)(?: seconds?)?)?", "youtube_seek", "delta", 1, 10),
+        (r"youtube (?:rewind|back)(?: (?P<n>\d+)(?: seconds?)?)?", "youtube_seek", "delta", -1, 10),
+        (r"select (?:number )?(?P<n>.+)", "spotify_select", "set", 1, None),
+    ]
+    RENDER = {
+        "volume": ("increase volume by {}", "decrease volume by {}", "set volume to {}"),
+        "brightness": ("increase brightness by {}", "decrease brightness by {}", "set brightness to {}"),
+        "spotify_volume": ("spotify volume up {}", "spotify volume down {}", None),
+        "youtube_seek": ("youtube forward {}", "youtube rewind {}", None),
+        "spotify_select": (None, None, "select {}"),
+    }
+    BOUNDED = {"volume", "brightness"}      # percentages: clamp merged values to 0..100
+
+    def __init__(self, execute, wake_word="pink"):
+        self.execute = execute          # (command, speak, speak_if) -> result dict
+        self.wake_word = wake_word
+        self._plans = [(re.compile(p), target, mode, sign, default) for p, target, mode, sign, default in self.PLANS]
+        self._cond = threading.Condition()
+        self._pending = collections.deque()
+        self._thread = None
+        self.counters = collections.Counter()
+
+    def plan(self, command):
+        """(target, mode, value) for a mergeable command, else None."""
+        c = " ".join((command or "").lower().replace(self.wake_word, " ").replace(",", " ").split())
+        for rx, target, mode, sign, default in self._plans:
+            m = rx.fullmatch(c)
+            if not m:
+                continue
+            arg = m.groupdict().get("n") or m.groupdict().get("n2")
+            if arg is None:
+                n = default
+            elif target == "youtube_seek":
+                n = int(arg)
+            else:
+                n = _extract_number_from_text(arg)
+            if n is None:
+                return None
+            return target, mode, sign * n
+        return None
+
+    def render(self, target, mode, value):
+        up, down, absolute = self.RENDER[target]
+        if mode == "set":
+            return absolute.format(value)
+        if value == 0:
+            return None
+        return (up if value > 0 else down).format(abs(value))
+
+    @staticmethod
+    def _merge(old, new, bounded):
+        target, old_mode, old_value = old
+        _, mode, value = new
+        if mode == "set":
+            return new
+        merged = old_value + value
+        if bounded:
+            merged = max(0, min(100, merged)) if old_mode == "set" else max(-100, min(100, merged))
+        return target, old_mode, merged
+
+    def submit(self, command, speak=True):
+        """Queue a command; returns a Future resolving to its (possibly merged) result."""
+        future = concurrent.futures.Future()
+        plan = self.plan(command)
+        with self._cond:
+            self.counters["submitted"] += 1
+            tail = self._pending[-1] if self._pending else None
+            if plan and tail and tail["plan"] and tail["plan"][0] == plan[0]:
+                if plan[1] == "set" and tail["plan"][1] == "set":
+                    self.counters["superseded"] += 1
+                else:
+                    self.counters["coalesced"] += 1
+                tail["plan"] = self._merge(tail["plan"], plan, plan[0] in self.BOUNDED)
+                tail["commands"].append(command)
+                tail["futures"].append(future)
+                tail["speak"] = tail["speak"] or speak
+            else:
+                self._pending.append({"plan": plan, "commands": [command], "futures": [future],
+                                      "speak": speak, "queued_at": time.perf_counter()})
+            self._ensure_worker()
+            self._cond.notify()
+        return future
+
+    def _ensure_worker(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="pink-actions", daemon=True)
+            self._thread.start()
+
+    def _newer_pending(self, target):
+        with self._cond:
+            return any(e["plan"] and e["plan"][0] == target for e in self._pending)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                entry = self._pending.popleft()
+            started = time.perf_counter()
+            try:
+                result = self._run_entry(entry)
+            except Exception as e:
+                for f in entry["futures"]:
+                    f.set_exception(e)
+                continue
+            result["timing"]["queue_wait_ms"] = round((started - entry["queued_at"]) * 1000, 3)
+            if len(entry["commands"]) > 1:
+                result["coalesced"] = list(entry["commands"])
+            self.counters["executed"] += 1
+            if callable(result.get("reply")):
+                threading.Thread(target=self._confirm, args=(result, entry["futures"]),
+                                 name="pink-confirm", daemon=True).start()
+                continue
+            for f in entry["futures"]:
+                f.set_result(result)
+
+    def _confirm(self, result, futures):
+        t0 = time.perf_counter()
+        try:
+            result["reply"], extra = result["reply"]()
+            result["slots"].update(extra)
+        except Exception as e:
+            for f in futures:
+                f.set_exception(e)
+            return
+        result["timing"]["confirm_ms"] = round((time.perf_counter() - t0) * 1000, 3)
+        for f in futures:
+            f.set_result(result)
+
+    def _run_entry(self, entry):
+        plan = entry["plan"]
+        if not plan:
+            return self.execute(entry["commands"][0], entry["speak"], None)
+        command = entry["commands"][0] if len(entry["commands"]) == 1 else self.render(*plan)
+        if command is None:
+            # the burst cancelled itself out (e.g. forward 10, rewind 10)
+            self.counters["cancelled"] += 1
+            return {"intent": plan[0], "slots": {"net": 0}, "success": True, "reply": None,
+                    "command": " / ".join(entry["commands"]), "timing": {"queue_wait_ms": 0.0, "execute_ms": 0.0,
+                                                                         "speak_ms": 0.0, "total_ms": 0.0}}
+        return self.execute(command, entry["speak"], lambda: not self._newer_pending(plan[0]))
+
+    def status(self):
+        with self._cond:
+            return dict(self.counters, pending=len(self._pending))
+
+# ========== Dictation ==========
+class TextInjector:
+    """
+    Types text into the focused window. On Windows every update is one SendInput call
+    (KEYEVENTF_UNICODE per UTF-16 unit, VK_BACK / VK_RETURN for edits and new lines);
+    elsewhere pyautogui.write with no per-character delay.
+    """
+    KEYEVENTF_KEYUP, KEYEVENTF_UNICODE = 0x0002, 0x0004
+    VK_BACK, VK_RETURN = 0x08, 0x0D
+
+    def __init__(self):
+        self._input_type = None
+        self._send = None
+        if sys.platform == "win32":
+            try:
+                self._init_sendinput()
+            except Exception as e:
+                print("SendInput unavailable, typing with pyautogui:", e)
+
+    def _init_sendinput(self):
+        class KEYBDINPUT(ctypes.Structure):
+            _fields_ = [("wVk", wintypes.WORD), ("wScan", wintypes.WORD), ("dwFlags", wintypes.DWORD),
+                        ("time", wintypes.DWORD), ("dwExtraInfo", ctypes.c_size_t)]
+
+        class MOUSEINPUT(ctypes.Structure):
+            _fields_ = [("dx", wintypes.LONG), ("dy", wintypes.LONG), ("mouseData", wintypes.DWORD),
+                        ("dwFlags", wintypes.DWORD), ("time", wintypes.DWORD), ("dwExtraInfo", ctypes.c_size_t)]
+
+        class _U(ctypes.Union):
+            _fields_ = [("ki", KEYBDINPUT), ("mi", MOUSEINPUT)]
+
+        class INPUT(ctypes.Structure):
+            _fields_ = [("type", wintypes.DWORD), ("u", _U)]
+
+        self._kbd = KEYBDINPUT
+        self._input_type = INPUT
+        self._send = ctypes.windll.user32.SendInput
+
+    def _events(self, backspaces, text):
+        ev = []
+        key = lambda vk, scan, flags: ev.append((vk, scan, flags))
+        for _ in range(backspaces):
+            key(self.VK_BACK, 0, 0)
+            key(self.VK_BACK, 0, self.KEYEVENTF_KEYUP)
+        for line_no, line in enumerate(text.split("\n")):
+            if line_no:
+                key(self.VK_RETURN, 0, 0)
+                key(self.VK_RETURN, 0, self.KEYEVENTF_KEYUP)
+            units = line.encode("utf-16-le")
+            for i in range(0, len(units), 2):
+                unit = units[i] | (units[i + 1] << 8)
+                key(0, unit, self.KEYEVENTF_UNICODE)
+                key(0, unit, self.KEYEVENTF_UNICODE | self.KEYEVENTF_KEYUP)
+        return ev
+
+    def edit(self, backspaces=0, text=""):
+        """Delete `backspaces` characters before the caret, then type `text`: one injection."""
+        if not backspaces and not text:
+            return True
+        try:
+            if self._send is not None:
+                ev = self._events(backspaces, text)
+                arr = (self._input_type * len(ev))()
+                for slot, (vk, scan, flags) in zip(arr, ev):
+                    slot.type = 1       # INPUT_KEYBOARD
+                    slot.u.ki = self._kbd(vk, scan, flags, 0, 0)
+                return self._send(len(ev), arr, ctypes.sizeof(self._input_type)) == len(ev)
+            if backspaces:
+                pyautogui.press("backspace", presses=backspaces, interval=0)
+            for line_no, line in enumerate(text.split("\n")):
+                if line_no:
+                    pyautogui.press("enter")
+                if line:
+                    pyautogui.write(line, interval=0)
+            return True
+        except Exception as e:
+            print("Text injection error:", e)
+            return False
+
+    def type(self, text):
+        return self.edit(0, text)
+
+_text_input = TextInjector()
+
+class DictationSession:
+    """
+    "pink dictate": streams the mic through an open-vocabulary Vosk recognizer and types
+    into the focused window as the user speaks. A word is shown once two consecutive
+    partial hypotheses agree on it; each update diffs the shown text against what is
+    already on screen and sends one edit (backspaces for the changed tail + new text), so
+    only the unstable tail is ever corrected. Final results replace the utterance's
+    partials. Spoken punctuation ("comma", "new line", ...) is converted; a stop phrase or
+    `idle_timeout` seconds of silence ends the session. Without Vosk, whole phrases from
+    the normal recognizer are typed instead. Only a listening loop (PinkAssistant.run or a
+    StationSession) can run it, so "pink dictate" is refused while none is `attached`.
+    """
+    PUNCTUATION = {"comma": ",", "period": ".", "full stop": ".", "question mark": "?",
+                   "exclamation mark": "!", "colon": ":", "new line": "\n", "new paragraph": "\n\n"}
+
+    def __init__(self, voice, injector=None, stop_phrases=("stop dictation", "end dictation"),
+                 idle_timeout=30, chunk_ms=100):
+        self.voice = voice
+        self.injector = injector or _text_input
+        self.stop_phrases = [p.lower() for p in stop_phrases]
+        self.idle_timeout = idle_timeout
+        self.chunk_ms = chunk_ms
+        self.requested = threading.Event()
+        self.attached = False       # a listening loop checks `requested` between utterances
+        self.running = False
+        self.stats = {}
+
+    def _model(self):
+        rec = self.voice.grammar_recognizer
+        if rec is not None:
+            return rec.model
+        if vosk is None:
+            return None
+        try:
+            return _load_vosk_model(CONFIG["vosk_model_path"])
+        except Exception as e:
+            print("Dictation model unavailable:", e)
+            return None
+
+    def _format(self, words, leading):
+        """Spoken words -> text, with spoken punctuation attached to the previous word."""
+        out = ""
+        i = 0
+        while i < len(words):
+            two = " ".join(words[i:i + 2])
+            mark = self.PUNCTUATION.get(two) if len(words) > i + 1 else None
+            if mark is not None:
+                i += 2
+            else:
+                mark = self.PUNCTUATION.get(words[i])
+                i += 1
+            if mark is not None:
+                out += mark
+            else:
+                word = words[i - 1]
+                out += word if (not out and not leading) or out.endswith("\n") else " " + word
+        return out
+
+    def _strip_stop(self, words):
+        """Words before the first whole-word stop phrase, and whether one was said."""
+        for at in range(len(words)):
+            for phrase in self.stop_phrases:
+                p = phrase.split()
+                if words[at:at + len(p)] == p:
+                    return words[:at], True
+        return words, False
+
+    def _show(self, target):
+        """Bring the on-screen text of the current utterance to `target` with one edit."""
+        shown = self._shown
+        common = 0
+        for a, b in zip(shown, target):
+            if a != b:
+                break
+            common += 1
+        deletes, new = len(shown) - common, target[common:]
+        if deletes or new:
+            self.injector.edit(deletes, new)
+            self.stats["updates"] += 1
+            self.stats["chars_typed"] += len(new)
+            self.stats["chars_corrected"] += deletes
+            self._shown = target
+
+    def run(self, source=None):
+        """
+        Blocking dictation loop (runs on the listening thread). `source` is an already open
+        audio source (a station's ring buffer); by default the engine's microphone is opened.
+        """
+        self.requested.clear()
+        self.running = True
+        # first_text_ms: first non-empty hypothesis -> its first text on screen
+        self.stats = {"updates": 0, "chars_typed": 0, "chars_corrected": 0, "utterances": 0,
+                      "first_text_ms": None, "mode": None}
+        try:
+            model = self._model()
+            self.voice.speak("Dictating. Say stop dictation when you're done.")
+            if model is None:
+                self.stats["mode"] = "phrases"
+                self._run_phrases(source)
+            elif source is None:
+                self.stats["mode"] = "streaming"
+                with self.voice.mic as mic:
+                    self._run_streaming(model, mic)
+            else:
+                self.stats["mode"] = "streaming"
+                self._run_streaming(model, source)
+        finally:
+            self.running = False
+        self.voice.speak("Dictation stopped.")
+        return self.stats
+
+    def _run_streaming(self, model, source):
+        committed = False           # something typed already: later utterances start with a space
+        rec = vosk.KaldiRecognizer(model, source.SAMPLE_RATE)
+        frames = int(source.SAMPLE_RATE * self.chunk_ms / 1000)
+        prev, self._shown = [], ""
+        last_voice = time.perf_counter()
+        first_heard = None
+        while True:
+            data = source.stream.read(frames)
+            now = time.perf_counter()
+            if rec.AcceptWaveform(data):
+                words = json.loads(rec.Result()).get("text", "").split()
+                final = True
+            else:
+                words = json.loads(rec.PartialResult()).get("partial", "").split()
+                final = False
+            if words:
+                last_voice = now
+                first_heard = first_heard or now
+            elif now - last_voice > self.idle_timeout:
+                break
+            words, stop = self._strip_stop(words)
+            if final or stop:
+                show = words
+            else:
+                agreed = 0
+                for a, b in zip(words, prev):
+                    if a != b:
+                        break
+                    agreed += 1
+                show = words[:agreed]
+                prev = words
+            self._show(self._format(show, committed))
+            if self._shown and self.stats["first_text_ms"] is None:
+                self.stats["first_text_ms"] = round((time.perf_counter() - first_heard) * 1000)
+            if final or stop:
+                if self._shown:
+                    committed = True
+                    self.stats["utterances"] += 1
+                prev, self._shown = [], ""
+            if stop:
+                break
+
+    def _listen(self, source):
+        if source is None:
+            text = self.voice.listen(timeout=5, phrase_time_limit=15)
+            return "" if text == "unrecognized" else text
+        audio = self.voice.vad.listen(source, timeout=5, phrase_time_limit=15)
+        if audio is None:
+            return ""
+        try:
+            return self.voice.recognize(audio).lower()
+        except Exception:
+            return ""
+
+    def _run_phrases(self, source=None):
+        committed = False
+        idle_since = time.perf_counter()
+        self._shown = ""
+        while True:
+            text = self._listen(source)
+            if not text:
+                if time.perf_counter() - idle_since > self.idle_timeout:
+                    break
+                continue
+            idle_since = time.perf_counter()
+            words, stop = self._strip_stop(text.lower().split())
+            self._shown = ""
+            self._show(self._format(words, committed))
+            committed = committed or bool(words)
+            self.stats["utterances"] += 1
+            if stop:
                 break
 
+# ========== Multi-station sessions ==========
+class AudioRingBuffer:
+    """
+    Bounded buffer of fixed-size audio frames between a capture thread and the endpointer.
+    Capture never waits on decoding; when the reader falls behind the oldest audio is
+    dropped (and counted). Exposes stream.read() so VadEndpointer can read from it.
+    """
+    def __init__(self, max_frames):
+        self.frames = collections.deque(maxlen=max_frames)
+        self.dropped = 0
+        self.closed = False
+        self._cond = threading.Condition()
+
+    def push(self, frame):
+        with self._cond:
+            if len(self.frames) == self.frames.maxlen:
+                self.dropped += 1
+            self.frames.append(frame)
+            self._cond.notify()
+
+    def read(self, size=None):
+        with self._cond:
+            self._cond.wait_for(lambda: self.frames or self.closed)
+            return self.frames.popleft() if self.frames else b""
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+class _BufferedSource:
+    """AudioSource look-alike over a ring buffer (what VadEndpointer.listen expects)."""
+    def __init__(self, ring, sample_rate, sample_width):
+        self.stream = ring
+        self.SAMPLE_RATE = sample_rate
+        self.SAMPLE_WIDTH = sample_width
+
+class StationSession:
+    """
+    One microphone/station: its own capture thread and ring buffer, VAD, wake word,
+    controllers (a PinkAssistant without boot) and TTS voice. Its recognizer backends run
+    on the host's shared decode executor, so decoding across all stations is bounded by
+    that pool; the Vosk model behind it is loaded once per process.
+    """
+    def __init__(self, name, decode_pool, device_index=None, wake_word=None,
+                 latency_budget_ms=800, buffer_seconds=10):
+        self.name = name
+        self.voice = VoiceEngine(device_index=device_index, wake_word=wake_word, executor=decode_pool)
+        if self.voice.vad is None:
+            self.voice.vad = VadEndpointer()
+        self.assistant = PinkAssistant(voice=self.voice, boot=False)
+        self.latency_budget_ms = latency_budget_ms
+        frame_ms = self.voice.vad.frame_ms
+        self.ring = AudioRingBuffer(int(buffer_seconds * 1000 / frame_ms))
         self.running = False
-        cap.release()
-        cv2.destroyAllWindows()
+        self.latencies = collections.deque(maxlen=200)
+        self.counters = collections.Counter()
+        self._threads = []
 
-# ========== Main Assistant ==========
-class PinkAssistant:
-    
+    def _capture(self):
+        with self.voice.mic as source:
+            self.source = _BufferedSource(self.ring, source.SAMPLE_RATE, source.SAMPLE_WIDTH)
+            self._source_ready.set()
+            samples = int(source.SAMPLE_RATE * self.voice.vad.frame_ms / 1000)
+            while self.running:
+                self.ring.push(source.stream.read(samples))
+        self.ring.close()
+
+    def _loop(self):
+        self._source_ready.wait()
+        dictation = self.assistant.dictation
+        while self.running:
+            if dictation.requested.is_set():
+                dictation.run(source=self.source)
+                continue
+            audio = self.voice.vad.listen(self.source, timeout=None, phrase_time_limit=6)
+            if audio is None:
+                continue
+            t0 = time.perf_counter()
+            try:
+                text = self.voice.recognize(audio).lower()
+            except Exception:
+                self.counters["unrecognized"] += 1
+                continue
+            decode_ms = (time.perf_counter() - t0) * 1000
+            self.latencies.append(decode_ms)
+            self.counters["utterances"] += 1
+            if decode_ms > self.latency_budget_ms:
+                self.counters["over_budget"] += 1
+                print(f"[{self.name}] decode took {decode_ms:.0f} ms (budget {self.latency_budget_ms} ms)")
+            if self.assistant.wake_word in text:
+                self.counters["commands"] += 1
+                print(f"[{self.name}] User said: {text}")
+                future = self.assistant.actions.submit(text)
+                if "dictat" in text:
+                    future.result()     # dictation takes over this station's audio next
 
+    def start(self):
+        self.running = True
+        self.assistant.dictation.attached = True
+        self._source_ready = threading.Event()
+        for target, suffix in ((self._capture, "capture"), (self._loop, "listen")):
+            t = threading.Thread(target=target, name=f"pink-{self.name}-{suffix}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self):
         self.running = False
-        cap.release()
-        cv2.destroyAllWindows()
+        self.assistant.dictation.attached = False
+        self.ring.close()
 
-    def __init__(self):
-        self.voice = VoiceEngine()
+    def stats(self):
+        lat = sorted(self.latencies)
+        pct = lambda p: round(lat[min(len(lat) - 1, int(p * len(lat)))], 1) if lat else None
+        return {"name": self.name, "wake_word": self.assistant.wake_word,
+                "decode_ms_p50": pct(0.5), "decode_ms_p95": pct(0.95),
+                "ring_dropped": self.ring.dropped, "counters": dict(self.counters)}
+
+class MultiSessionHost:
+    """
+    Runs several StationSessions in one process over a decode pool sized to the CPU count.
+    Configure stations in CONFIG["sessions"], e.g.
+        [{"name": "desk", "device_index": 1}, {"name": "lab", "device_index": 3, "wake_word": "pink"}]
+    """
+    def __init__(self, sessions=None, workers=None):
+        sessions = sessions or CONFIG.get("sessions") or [{"name": "default"}]
+        self.workers = workers or os.cpu_count() or 2
+        self.pool = concurrent.futures.ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pink-decode")
+        self.sessions = [StationSession(decode_pool=self.pool, **cfg) for cfg in sessions]
+
+    def status(self):
+        return {"workers": self.workers, "models_loaded": len(_VOSK_MODELS),
+                "sessions": [s.stats() for s in self.sessions]}
+
+    def run(self, report_every=60):
+        for s in self.sessions:
+            s.start()
+        print(f"Serving {len(self.sessions)} stations on {self.workers} decode workers.")
+        try:
+            while True:
+                time.sleep(report_every)
+                print(json.dumps(self.status()))
+        except KeyboardInterrupt:
+            for s in self.sessions:
+                s.stop()
+
+# ========== Main Assistant ==========
+# Whole "play ..." phrasings that are playback control rather than a song to search for;
+# each re-dispatches the canonical command of its FALLBACK_INTENTS label. Only exact
+# matches count, so titles like "stop and go" or "play it again" are still searched.
+PLAY_CONTROL_PHRASES = {
+    "pause": "spotify_playpause", "unpause": "spotify_playpause", "resume": "spotify_playpause",
+    "that again": "spotify_previous", "that song again": "spotify_previous", "the previous song": "spotify_previous",
+    "the previous track": "spotify_previous", "the last song": "spotify_previous",
+    "in random order": "spotify_shuffle", "randomly": "spotify_shuffle", "on shuffle": "spotify_shuffle",
+    "shuffled": "spotify_shuffle",
+}
+
+class PinkAssistant:
+    def __init__(self, voice=None, boot=True, wake_word=None):
+        self.voice = voice or VoiceEngine(wake_word=wake_word)
+        self.wake_word = wake_word or self.voice.wake_word
         self.system = SystemController(self.voice)
         # instantiate YouTube controller for basic video controls
-        self.youtube = YouTubeController()
-        self.boot()
+        self.youtube = YouTubeController(self.system.windows, self.system.now_playing)
+        if self.voice.echo:
+            np_state = self.system.now_playing.state
+            self.voice.echo.media_active = lambda: np_state["spotify"]["playing"] or self.youtube.media_playing()
+        # voice loop and control API share one dispatch path; controllers are not thread-safe
+        self._dispatch_lock = threading.Lock()
+        self._quiet = False
+        self._speak_if = None
+        self._speak_time = 0.0
+        self.actions = ActionQueue(self._execute, self.wake_word)
+        dcfg = CONFIG.get("dictation") or {}
+        self.dictation = DictationSession(self.voice, stop_phrases=dcfg.get("stop_phrases", ("stop dictation",)),
+                                          idle_timeout=dcfg.get("idle_timeout", 30))
+        self.last_result = None
+        self.control = None
+        self.profiler = SamplingProfiler()
+        self.profiler.listeners.append(self.system.touchscreen.set_profiling)
+        self.intent_classifier = None
+        fb = CONFIG.get("intent_fallback") or {}
+        if fb.get("enabled") and np is not None:
+            self.intent_classifier = IntentClassifier.load_or_train(fb["model_path"])
+        if boot:
+            self.boot()
 
     def boot(self):
         if CONFIG.get("mustang_sound"):
@@ -812,41 +3935,125 @@ class PinkAssistant:
             return "afternoon"
         return "evening"
 
-    def parse_and_execute(self, command):
+    def _reply(self, intent, ok, text, **slots):
+        """
+        Speak the reply for a handled command and return its structured result. `text` may
+        be a callable returning (text, extra_slots) that has to wait for something (playback
+        confirmation); the result then carries it as "reply" and the action queue resolves
+        and speaks it off the dispatch path.
+        """
+        if callable(text):
+            confirm, quiet, speak_if = text, self._quiet, self._speak_if
+            def deferred():
+                reply, extra = confirm()
+                self._say(reply, quiet, speak_if)
+                return reply, extra
+            return {"intent": intent, "slots": slots, "success": bool(ok), "reply": deferred}
+        self._speak_time += self._say(text, self._quiet, self._speak_if)
+        return {"intent": intent, "slots": slots, "success": bool(ok), "reply": text}
+
+    def _say(self, text, quiet=False, speak_if=None):
+        """Speak (or just print) a reply; returns the seconds spent speaking."""
+        if text and not quiet and (speak_if is None or speak_if()):
+            t0 = time.perf_counter()
+            self.voice.speak(text)
+            return time.perf_counter() - t0
+        if text:
+            print(f"PINK: {text}")
+        return 0.0
+
+    def parse_and_execute(self, command, speak=True):
+        """
+        Dispatch one command (voice or control API) through the action queue and return a
+        result dict: {"intent", "slots", "success", "reply", "command", "timing"} with
+        timings in ms, plus "coalesced" when other queued commands were merged into it.
+        """
+        return self.actions.submit(command, speak).result()
+
+    def _execute(self, command, speak=True, speak_if=None):
+        t_wait = time.perf_counter()
+        with self._dispatch_lock:
+            t0 = time.perf_counter()
+            self._quiet = not speak
+            self._speak_if = speak_if
+            self._speak_time = 0.0
+            try:
+                result = self._dispatch(command)
+            finally:
+                self._quiet = False
+                self._speak_if = None
+            total = time.perf_counter() - t0
+            result["command"] = command
+            result["timing"] = {
+                "queue_wait_ms": round((t0 - t_wait) * 1000, 3),
+                "execute_ms": round((total - self._speak_time) * 1000, 3),
+                "speak_ms": round(self._speak_time * 1000, 3),
+                "total_ms": round(total * 1000, 3),
+            }
+            self.last_result = result
+        return result
+
+    def _dispatch(self, command, fallback=True):
         c = (command or "").lower()
         if not c or c == "unrecognized":
-            return
-        if CONFIG["wake_word"] in c:
-            c = c.replace(CONFIG["wake_word"], "").strip()
+            return {"intent": None, "slots": {}, "success": False, "reply": None}
+        if self.wake_word in c:
+            c = c.replace(self.wake_word, "").strip()
+        ts = self.system.touchscreen
+        if "touchscreen" in c and any(w in c for w in ["stop", "deactivate", "exit"]):
+            ok = ts.stop()
+            return self._reply("touchscreen_stop", ok, "Touchscreen mode deactivated." if ok else "Touchscreen mode isn't running.")
+        if "touchscreen" in c and "sensitivity" in c:
+            n = _extract_number_from_text(c)
+            if n is None:
+                return self._reply("touchscreen_sensitivity", False, "Say a sensitivity from 1 to 10.")
+            n = ts.set_sensitivity(n)
+            return self._reply("touchscreen_sensitivity", True, f"Touchscreen sensitivity set to {n}.", sensitivity=n)
+        if re.search(r"\bdictat(e|ion)\b", c):
+            if any(w in c for w in ["stop", "end"]):
+                return self._reply("dictation_stop", False, "Dictation isn't running.")
+            if not self.dictation.attached:
+                return self._reply("dictation_start", False, "Dictation needs the microphone loop, which isn't running.")
+            # the listening loop picks this up and streams into the focused window
+            self.dictation.requested.set()
+            return {"intent": "dictation_start", "slots": {}, "success": True, "reply": None}
         if "activate touchscreen mode" in c:
-            self.system.touchscreen.start()
-            return
+            ok = ts.start()
+            return self._reply("touchscreen_start", ok, "Touchscreen mode activated." if ok else "Couldn't start touchscreen mode.")
 
+        # built-in profiler (before "stop", which toggles playback)
+        if "profiler" in c or "profiling" in c:
+            if any(w in c for w in ["stop", "end", "off"]):
+                paths = self.profiler.stop()
+                return self._reply("profiler_stop", bool(paths), "Profiler stopped, report saved." if paths else "The profiler isn't running.")
+            ok = self.profiler.start()
+            return self._reply("profiler_start", ok, "Profiler started." if ok else "The profiler is already running.")
+
+        # what's playing: answered from the now-playing cache, no focus change needed
+        if re.search(r"what(?:'s| is)\s+playing|what song is (?:this|playing)", c):
+            now_playing = self.system.now_playing
+            return self._reply("now_playing", True, now_playing.describe(), **{k: v for k, v in now_playing.snapshot("spotify").items() if k in ("track", "artist", "playing")})
 
         # ----------------- YouTube commands (added) -----------------
         # play <query> on youtube  OR play <query> youtube
         m = re.search(r'play\s+(.+?)\s+(?:on\s+)?youtube\b', c)
         if m:
             query = m.group(1).strip()
-            query_url = query.replace(" ", "+")
-            self.voice.speak(f"Searching YouTube for {query}")
-            webbrowser.open(f"https://www.youtube.com/results?search_query={query_url}")
-            return
+            if self.youtube.play_query(query):
+                return self._reply("youtube_play", True, f"Playing {query} on YouTube.", query=query)
+            return self._reply("youtube_play", False, f"Couldn't start a video, opened the YouTube results for {query}.", query=query)
 
         # search <query> on youtube
         m = re.search(r'search\s+(.+?)\s+(?:on\s+)?youtube\b', c)
         if m:
             query = m.group(1).strip()
-            query_url = query.replace(" ", "+")
-            self.voice.speak(f"Searching YouTube for {query}")
-            webbrowser.open(f"https://www.youtube.com/results?search_query={query_url}")
-            return
+            self.youtube.search(query)
+            return self._reply("youtube_search", True, f"Searching YouTube for {query}", query=query)
 
         # open youtube
         if "open youtube" in c or c.strip() == "youtube":
-            self.voice.speak("Opening YouTube")
-            webbrowser.open("https://www.youtube.com")
-            return
+            self.youtube.open_home()
+            return self._reply("youtube_open", True, "Opening YouTube")
 
         # close youtube: try to close YouTube tab (Ctrl+W) after focusing a YouTube window; fallback to killing browsers
         if "close youtube" in c or "close youtube tab" in c or "close video" in c or "close youtube tab" in c:
@@ -854,20 +4061,17 @@ class PinkAssistant:
             try:
                 ok = self.youtube.close_tab()
                 if ok:
-                    self.voice.speak("Closed the current YouTube tab.")
-                    return
+                    return self._reply("youtube_close", True, "Closed the current YouTube tab.")
             except Exception:
                 pass
 
             # If that didn't work, fallback: try to kill common browser processes (Chrome, Edge, Firefox)
             try:
                 for proc in ("chrome.exe", "msedge.exe", "firefox.exe"):
-                    os.system(f"taskkill /f /im {proc} >nul 2>&1")
-                self.voice.speak("Closed YouTube by closing the browser.")
-                return
+                    _spawn(["taskkill", "/f", "/im", proc])
+                return self._reply("youtube_close", True, "Closed YouTube by closing the browser.")
             except Exception:
-                self.voice.speak("Couldn't close YouTube.")
-                return
+                return self._reply("youtube_close", False, "Couldn't close YouTube.")
 
         # YouTube next / forward / rewind voice commands
         # next video
@@ -877,68 +4081,91 @@ class PinkAssistant:
                 ok = self.youtube.next_video()
             except Exception:
                 ok = False
-            self.voice.speak("Playing next video." if ok else "Couldn't go to next video.")
-            return
+            return self._reply("youtube_next", ok, "Playing next video." if ok else "Couldn't go to next video.")
+
+        # playback speed: "youtube speed 1.5", "youtube speed 150 percent", "youtube double speed"
+        if "youtube" in c and "speed" in c:
+            m = re.search(r'(\d+(?:\.\d+)?)\s*(percent|%)?', c)
+            if "double" in c:
+                rate = 2.0
+            elif "half" in c:
+                rate = 0.5
+            elif "normal" in c or "reset" in c:
+                rate = 1.0
+            elif m:
+                rate = float(m.group(1))
+                if m.group(2):
+                    rate /= 100     # "speed 150 percent" -> 1.5x; a bare number is a multiplier
+            else:
+                rate = 1.0
+            ok = self.youtube.set_speed(rate)
+            return self._reply("youtube_speed", ok, f"Playback speed set to {self.youtube.rate:g}x." if ok else "Couldn't change the playback speed.", rate=rate)
+
+        # absolute position: "youtube restart", "youtube go to 90 seconds", "youtube jump to 2 minutes"
+        m = re.search(r'youtube\s+(?:go|jump|skip)\s+to\s+(\d+)\s*(minutes?|seconds?)?', c)
+        if m or re.search(r'youtube\s+(?:restart|start over)', c):
+            secs = int(m.group(1)) * (60 if m.group(2) and m.group(2).startswith("minute") else 1) if m else 0
+            ok = self.youtube.seek_to(secs)
+            return self._reply("youtube_seek_to", ok, ("Restarted the video." if not secs else f"Jumped to {secs // 60}:{secs % 60:02d}.") if ok else "Couldn't move in the video.", seconds=secs)
 
         # fast forward / forward N seconds (e.g., "youtube forward 30 seconds")
         m = re.search(r'youtube\s+(?:fast\s+forward|forward|ff)\s+(\d+)', c)
         if m:
             secs = int(m.group(1))
             ok = self.youtube.seek(seconds=secs, direction='forward')
-            self.voice.speak(f"Fast forwarded {secs} seconds." if ok else "Couldn't fast forward.")
-            return
+            return self._reply("youtube_forward", ok, f"Fast forwarded {secs} seconds." if ok else "Couldn't fast forward.", seconds=secs)
         # also accept "youtube forward" with no number -> default 10s
         if any(kw in c for kw in ["youtube fast forward", "youtube forward", "fast forward youtube"]) and not re.search(r'(\d+)', c):
             ok = self.youtube.seek(seconds=10, direction='forward')
-            self.voice.speak("Fast forwarded 10 seconds." if ok else "Couldn't fast forward.")
-            return
+            return self._reply("youtube_forward", ok, "Fast forwarded 10 seconds." if ok else "Couldn't fast forward.", seconds=10)
 
         # rewind / slow in / back N seconds
         m = re.search(r'youtube\s+(?:rewind|back|rew)\s+(\d+)', c)
         if m:
             secs = int(m.group(1))
             ok = self.youtube.seek(seconds=secs, direction='back')
-            self.voice.speak(f"Rewinded {secs} seconds." if ok else "Couldn't rewind.")
-            return
+            return self._reply("youtube_rewind", ok, f"Rewinded {secs} seconds." if ok else "Couldn't rewind.", seconds=secs)
         # also accept "youtube rewind" "youtube back" without number -> default 10s
         if any(kw in c for kw in ["youtube rewind", "youtube back", "youtube slow in", "slow in youtube"]) and not re.search(r'(\d+)', c):
             ok = self.youtube.seek(seconds=10, direction='back')
-            self.voice.speak("Rewinded 10 seconds." if ok else "Couldn't rewind.")
-            return
+            return self._reply("youtube_rewind", ok, "Rewinded 10 seconds." if ok else "Couldn't rewind.", seconds=10)
         # ------------------------------------------------------------
 
+        if "rescan" in c and ("music" in c or "library" in c):
+            lib = self.system.library
+            if not lib:
+                return self._reply("library_rescan", False, "The music library is turned off.")
+            started = lib.schedule_scan()
+            return self._reply("library_rescan", True, "Rescanning your music library." if started else "I'll rescan the music library once you're plugged in.")
         if "battery" in c or "charge" in c:
-            self.voice.speak(self.system.check_battery()); return
+            return self._reply("battery", True, self.system.check_battery())
         if "time" in c:
             t = self.system.get_time()
-            self.voice.speak(f"The time is {t}"); return
+            return self._reply("time", True, f"The time is {t}")
         if any(w in c for w in ["brightness", "display", "bright"]):
             res = self.system.adjust_brightness(c)
-            self.voice.speak(res); return
+            return self._reply("brightness", res.startswith("Brightness set"), res)
         if any(w in c for w in ["volume", "louder", "quieter", "mute"]) and ("spotify" not in c):
             res = self.system.adjust_volume(c)
-            self.voice.speak(res); return
+            return self._reply("volume", not res.startswith("Couldn't"), res)
         if "settings" in c:
             page = ""
             for p in ["wifi", "bluetooth", "display", "sound", "battery"]:
                 if p in c:
                     page = p; break
             res = self.system.open_settings(page)
-            self.voice.speak(res); return
+            return self._reply("settings", res.startswith("Opened"), res, page=page)
 
         # Spotify flow
         if "search" in c and "spotify" in c:
             try:
                 q = c.split("search")[-1].replace("spotify","").strip()
                 if not q:
-                    self.voice.speak("Please tell me what to search for in Spotify.")
-                    return
+                    return self._reply("spotify_search", False, "Please tell me what to search for in Spotify.")
                 ok = self.system.apps.search_spotify(q)
-                self.voice.speak("Search done. Say 'pink select number N' to move to result N, 'pink play N' to play N, or 'pink play' to play the top result." if ok else "Couldn't perform Spotify search.")
-                return
+                return self._reply("spotify_search", ok, "Search done. Say 'pink select number N' to move to result N, 'pink play N' to play N, or 'pink play' to play the top result." if ok else "Couldn't perform Spotify search.", query=q)
             except Exception:
-                self.voice.speak("Couldn't parse your Spotify search command.")
-                return
+                return self._reply("spotify_search", False, "Couldn't parse your Spotify search command.")
 
         # "select N" or "select number N"
         if "select" in c and any(ch.isdigit() for ch in c) :
@@ -950,45 +4177,60 @@ class PinkAssistant:
                 else:
                     n = int(ntext.group(1))
                 if not n:
-                    self.voice.speak("Please say a valid number after select.")
-                    return
+                    return self._reply("spotify_select", False, "Please say a valid number after select.")
                 ok = self.system.apps.select_result(n)
-                self.voice.speak(f"Selected result {n}." if ok else "Couldn't select that result.")
+                return self._reply("spotify_select", ok, f"Selected result {n}." if ok else "Couldn't select that result.", number=n)
             except Exception:
-                self.voice.speak("Please say a valid number after select.")
-            return
+                return self._reply("spotify_select", False, "Please say a valid number after select.")
 
         # play nth or plain play
         if re.search(r'\bplay\b', c):
             # check for "play N"
-            m = re.search(r'play\s+(\d+)', c)
+            m = re.search(r'play\s+(\d+)', c) or re.fullmatch(r'play (?:number |result )?(\d+)', _numbers_to_digits(c.strip()))
             if m:
                 n = int(m.group(1))
+                since = self.system.now_playing.version("spotify")
                 ok = self.system.apps.play_nth_result(n)
-                self.voice.speak(f"Playing result {n}." if ok else f"Couldn't play result {n}.")
-                return
+                return self._reply("spotify_play_nth", ok, self._confirm_playback(since, "Playing", f"Playing result {n}.") if ok else f"Couldn't play result {n}.", number=n)
+            # "play <song>": local library first, Spotify search only when nothing matches
+            m = re.fullmatch(r"play (?:the song |song |track )?(.+)", c.strip())
+            query = m.group(1).strip() if m else ""
+            label = PLAY_CONTROL_PHRASES.get(query)
+            if label:
+                result = self._dispatch(FALLBACK_INTENTS[label][0], fallback=False)
+                result["slots"] = dict(result.get("slots") or {}, phrase=query)
+                return result
+            if query and query not in ("it", "music", "something", "result", "top result", "the top result", "first result", "selected"):
+                return self._play_query(query)
             # otherwise play first / selected
+            since = self.system.now_playing.version("spotify")
             ok = self.system.apps.play_first_result()
-            self.voice.speak("Playing result." if ok else "Couldn't play the song. Try 'pink search spotify <song>' first.")
-            return
+            return self._reply("spotify_play", ok, self._confirm_playback(since, "Playing", "Playing result.") if ok else "Couldn't play the song. Try 'pink search spotify <song>' first.")
 
         # hold / stop / resume / playpause
         if any(w in c for w in ["hold", "stop", "resume", "playpause", "play/pause"]):
+            since = self.system.now_playing.version("spotify")
             ok = self.system.apps.spotify_play_pause()
-            self.voice.speak("Toggled play/pause." if ok else "Couldn't toggle play/pause.")
-            return
+            if not ok:
+                return self._reply("spotify_playpause", ok, "Couldn't toggle play/pause.")
+            def confirm():
+                st = self.system.now_playing.wait_for_change("spotify", since, CONFIG.get("playback_verify_timeout", 1.5))
+                if st is None:
+                    return "Toggled play/pause.", {}
+                return (self._playback_text(st, "Playing", "Resumed.") if st["playing"] else "Paused."), {"playing": st["playing"]}
+            return self._reply("spotify_playpause", ok, confirm)
 
         # next / previous (spotify)
         if "next" in c and "youtube" not in c:
+            since = self.system.now_playing.version("spotify")
             ok = self.system.apps.spotify_next()
-            self.voice.speak("Skipped to next track." if ok else "Couldn't skip to next track.")
-            return
+            return self._reply("spotify_next", ok, self._confirm_playback(since, "Skipped to", "Skipped to next track.") if ok else "Couldn't skip to next track.")
         if "previous" in c or "back" in c:
             # avoid interfering with youtube rewind/back already handled (youtube keywords checked earlier)
             if "spotify" in c or ("previous" in c and "youtube" not in c):
+                since = self.system.now_playing.version("spotify")
                 ok = self.system.apps.spotify_previous()
-                self.voice.speak("Went to previous track." if ok else "Couldn't go to previous track.")
-                return
+                return self._reply("spotify_previous", ok, self._confirm_playback(since, "Back to", "Went to previous track.") if ok else "Couldn't go to previous track.")
 
         # spotify volume controls
         if "spotify" in c and any(w in c for w in ["volume", "louder", "quieter", "mute", "up", "down"]):
@@ -997,70 +4239,287 @@ class PinkAssistant:
                 num = _extract_number_from_text(c)
                 steps = max(1, (num // 2) if num else 3)
                 ok = self.system.apps.spotify_volume_up(steps)
-                self.voice.speak("Increased Spotify volume." if ok else "Couldn't change Spotify volume.")
-                return
+                return self._reply("spotify_volume_up", ok, "Increased Spotify volume." if ok else "Couldn't change Spotify volume.", steps=steps)
             if "down" in c or "lower" in c or "decrease" in c or "quieter" in c:
                 num = _extract_number_from_text(c)
                 steps = max(1, (num // 2) if num else 3)
                 ok = self.system.apps.spotify_volume_down(steps)
-                self.voice.speak("Decreased Spotify volume." if ok else "Couldn't change Spotify volume.")
-                return
+                return self._reply("spotify_volume_down", ok, "Decreased Spotify volume." if ok else "Couldn't change Spotify volume.", steps=steps)
             if "mute" in c:
                 ok = self.system.apps.spotify_mute_toggle()
-                self.voice.speak("Toggled mute." if ok else "Couldn't toggle mute.")
-                return
+                return self._reply("spotify_mute", ok, "Toggled mute." if ok else "Couldn't toggle mute.")
 
         # shuffle toggle
         if "shuffle" in c:
             ok = self.system.apps.spotify_toggle_shuffle()
-            self.voice.speak("Toggled shuffle." if ok else "Couldn't toggle shuffle.")
-            return
+            return self._reply("spotify_shuffle", ok, "Toggled shuffle." if ok else "Couldn't toggle shuffle.")
 
         # like/unlike
         if "like" in c or "save" in c or "heart" in c:
             ok = self.system.apps.spotify_like_unlike()
-            self.voice.speak("Toggled like on current track." if ok else "Couldn't like the track.")
-            return
+            track = NowPlayingTracker.label(self.system.now_playing.snapshot("spotify"))
+            return self._reply("spotify_like", ok, (f"Toggled like on {track}." if track else "Toggled like on current track.") if ok else "Couldn't like the track.")
 
         # open spotify
         if "open spotify" in c:
             ok = self.system.apps.open_app("spotify")
-            self.voice.speak("Spotify opened." if ok else "Couldn't open Spotify.")
-            return
+            return self._reply("spotify_open", ok, "Spotify opened." if ok else "Couldn't open Spotify.")
 
         # generic app open / close
         if c.startswith("open "):
             app = c.split("open",1)[1].strip()
             ok = self.system.apps.open_app(app)
-            self.voice.speak(f"Opened {app}." if ok else f"Couldn't open {app}.")
-            return
+            return self._reply("app_open", ok, f"Opened {app}." if ok else f"Couldn't open {app}.", app=app)
         if c.startswith("close "):
             app = c.split("close",1)[1].strip()
             ok = self.system.apps.close_app(app)
-            self.voice.speak(f"Closed {app}." if ok else f"Couldn't close {app}.")
-            return
+            return self._reply("app_close", ok, f"Closed {app}." if ok else f"Couldn't close {app}.", app=app)
 
         if "shutdown" in c or "sleep" in c:
-            self.voice.speak("Shutting down. Goodbye.")
+            reply = self._reply("shutdown", True, "Shutting down. Goodbye.")
             if sys.platform == "win32":
-                os.system("shutdown /s /t 5")
-            return
+                _shell("shutdown /s /t 5")
+            return reply
+
+        if fallback and self.intent_classifier:
+            fb = CONFIG["intent_fallback"]
+            label, conf, margin = self.intent_classifier.classify(c)
+            if conf >= fb["min_confidence"] and margin >= fb["min_margin"]:
+                result = self._dispatch(self.intent_classifier.command_for(label), fallback=False)
+                result["slots"] = dict(result.get("slots") or {}, fallback=label, fallback_confidence=round(conf, 3))
+                return result
+        return self._reply(None, False, "I didn't understand that command.")
+
+    def _play_query(self, query):
+        lib = self.system.library
+        matches = lib.search(query, limit=1) if lib else []
+        if matches:
+            track = matches[0]
+            ok = lib.play(track)
+            name = f"{track['title']} by {track['artist']}" if track["artist"] else track["title"]
+            return self._reply("local_play", ok, f"Playing {name}." if ok else f"Couldn't play {name}.",
+                               query=query, title=track["title"], artist=track["artist"], path=track["path"])
+        since = self.system.now_playing.version("spotify")
+        ok = self.system.apps.search_spotify(query) and self.system.apps.play_first_result()
+        return self._reply("spotify_play", ok, self._confirm_playback(since, "Playing", f"Playing {query} on Spotify.") if ok else f"Couldn't find {query}.", query=query)
+
+    def _confirm_playback(self, since, verb, fallback):
+        """
+        Deferred reply for a Spotify playback change, confirmed from the now-playing cache:
+        waits for the window-title event (up to playback_verify_timeout) rather than sleeping.
+        """
+        def confirm():
+            st = self.system.now_playing.wait_for_change("spotify", since, CONFIG.get("playback_verify_timeout", 1.5))
+            return self._playback_text(st, verb, fallback), {}
+        return confirm
+
+    @staticmethod
+    def _playback_text(st, verb, fallback):
+        label = NowPlayingTracker.label(st)
+        return f"{verb} {label}." if label else fallback
+
+    def register_app(self, name, executable):
+        """
+        Add an app to CONFIG["app_paths"] and to the recognizer grammar.
+        """
+        name = name.lower().strip()
+        CONFIG["app_paths"][name] = executable
+        self.voice.grammar.add_app(name)
 
-        self.voice.speak("I didn't understand that command.")
+    def status(self):
+        """
+        Snapshot of controller state for the control API. Read without the dispatch lock
+        so status queries never wait behind a long-running command.
+        """
+        apps = self.system.apps
+        return {
+            "wake_word": self.wake_word,
+            "busy": self._dispatch_lock.locked(),
+            "spotify": {
+                "search_results": list(apps.search_results),
+                "result_positions": [list(p) for p in apps.result_positions],
+                "top_play_pos": list(apps.top_play_pos) if apps.top_play_pos else None,
+                "last_selected": apps.last_selected,
+            },
+            "touchscreen": self.system.touchscreen.status(),
+            "power": self.system.power.status(),
+            "now_playing": self.system.now_playing.snapshot(),
+            "windows": self.system.windows.status(),
+            "last_command_time": self.voice.last_command_time,
+            "profiler": {"running": self.profiler.running, "samples": self.profiler.samples},
+            "actions": self.actions.status(),
+            "dictation": {"running": self.dictation.running, "last": self.dictation.stats},
+            "library": self.system.library.status() if self.system.library else None,
+            "asr": self.voice.pool.stats,
+            "echo": self.voice.echo.status() if self.voice.echo else None,
+            "vad": {"last": self.voice.vad.last_stats, "totals": self.voice.vad.totals} if self.voice.vad else None,
+            # a reply still waiting on its playback confirmation isn't known yet
+            "last_result": dict(self.last_result, reply=None) if callable((self.last_result or {}).get("reply")) else self.last_result,
+        }
 
     def run(self):
-        print(f"Pink Assistant running. Say the wake word exactly: '{CONFIG['wake_word']}' before your command.")
+        if CONFIG.get("control_api"):
+            try:
+                self.control = ControlServer(self, CONFIG.get("control_host", "127.0.0.1"), CONFIG.get("control_port", 8765))
+                self.control.start()
+            except Exception as e:
+                print("Control API unavailable:", e)
+        self.system.power.start()
+        if self.system.library:
+            self.system.library.start()
+        if self.system.win_events.start():
+            self.system.now_playing.seed()
+        print(f"Pink Assistant running. Say the wake word exactly: '{self.wake_word}' before your command.")
+        self.dictation.attached = True
         while True:
-            text = self.voice.listen()
+            if self.dictation.requested.is_set():
+                self.dictation.run()
+                continue
+            profile = self.system.power.profile
+            text = self.voice.listen(timeout=profile["listen_timeout"])
             if not text:
-                time.sleep(0.4)
+                self.system.power.idle()
                 continue
-            if CONFIG["wake_word"] in text:
-                self.parse_and_execute(text)
+            if self.wake_word in text:
+                # don't wait: the next utterance can merge with this one while it runs
+                future = self.actions.submit(text)
+                if "dictat" in text:
+                    future.result()     # dictation takes over the mic on this thread
             else:
                 print("No wake word detected; ignoring.")
             time.sleep(0.2)
 
+# ========== Local Control API ==========
+class _ControlHandler(BaseHTTPRequestHandler):
+    """
+    Loopback HTTP endpoints:
+      POST /command  {"text": "pink next", "speak": true}  -> dispatch result
+      GET  /status                                         -> controller state
+      GET  /health                                         -> {"ok": true}
+    Browsers must not be able to drive it: requests need a loopback Host header and no
+    Origin header, /command and /status need the install's token (X-Pink-Token or
+    "Authorization: Bearer"), and POST bodies must be application/json.
+    """
+    LOOPBACK_HOSTS = {"127.0.0.1", "localhost", "::1"}
+
+    def _host_ok(self):
+        host = (self.headers.get("Host") or "").strip().lower()
+        if host.startswith("["):
+            name = host[1:host.find("]")] if "]" in host else ""
+        else:
+            name = host.rsplit(":", 1)[0] if host.count(":") == 1 else host
+        return name in self.LOOPBACK_HOSTS
+
+    def _token_ok(self):
+        sent = self.headers.get("X-Pink-Token") or ""
+        auth = self.headers.get("Authorization") or ""
+        if not sent and auth.lower().startswith("bearer "):
+            sent = auth[7:].strip()
+        return bool(sent) and hmac.compare_digest(sent.encode("utf-8"), self.server.token.encode("utf-8"))
+
+    def _allowed(self, need_token=True):
+        """Sends the rejection and returns False unless the request passes the checks above."""
+        if not self._host_ok() or self.headers.get("Origin") is not None:
+            self._send_json(403, {"error": "forbidden"})
+            return False
+        if need_token and not self._token_ok():
+            self._send_json(401, {"error": "missing or wrong token"})
+            return False
+        return True
+
+    def _send_json(self, code, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if not self._allowed(need_token=self.path != "/health"):
+            return
+        if self.path == "/status":
+            self._send_json(200, self.server.assistant.status())
+        elif self.path == "/health":
+            self._send_json(200, {"ok": True})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if not self._allowed():
+            return
+        if self.path != "/command":
+            self._send_json(404, {"error": "not found"})
+            return
+        ctype = (self.headers.get("Content-Type") or "").split(";")[0].strip().lower()
+        if ctype != "application/json":
+            self._send_json(415, {"error": "Content-Type must be application/json"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            text = str(payload.get("text", "")).strip()
+        except Exception as e:
+            self._send_json(400, {"error": f"bad request: {e}"})
+            return
+        if not text:
+            self._send_json(400, {"error": "missing 'text'"})
+            return
+        try:
+            result = self.server.assistant.parse_and_execute(text, speak=bool(payload.get("speak", True)))
+        except Exception as e:
+            self._send_json(500, {"error": str(e)})
+            return
+        self._send_json(200, result)
+
+    def log_message(self, format, *args):
+        pass
+
+CONTROL_TOKEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "control_token.txt")
+
+def _control_token(path=CONTROL_TOKEN_PATH):
+    """CONFIG["control_token"], or a random per-install token kept in control_token.txt."""
+    if CONFIG.get("control_token"):
+        return CONFIG["control_token"]
+    try:
+        with open(path, encoding="utf-8") as f:
+            token = f.read().strip()
+        if token:
+            return token
+    except OSError:
+        pass
+    token = secrets.token_urlsafe(32)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(token + "\n")
+    return token
+
+class ControlServer:
+    """
+    Threaded loopback HTTP server that feeds text commands into PinkAssistant.parse_and_execute.
+    Each client gets its own thread; dispatch itself is serialized by the assistant.
+    """
+    def __init__(self, assistant, host="127.0.0.1", port=8765, token=None):
+        self.httpd = ThreadingHTTPServer((host, port), _ControlHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.assistant = assistant
+        self.httpd.token = token or _control_token()
+        self.thread = None
+
+    @property
+    def address(self):
+        return self.httpd.server_address
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="pink-control", daemon=True)
+        self.thread.start()
+        host, port = self.address[:2]
+        print(f"Control API listening on http://{host}:{port} (token in {CONTROL_TOKEN_PATH} unless set in CONFIG)")
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
 # ========== Start ==========
 if __name__ == "__main__":
     missing = []
@@ -1088,6 +4547,13 @@ if __name__ == "__main__":
     if missing:
         print("Missing packages detected:", missing)
         print("Run run_pink.bat to auto-install required packages, or install them manually via pip.")
+    if "--multi" in sys.argv:
+        print("Starting Pink Assistant in multi-station mode...")
+        MultiSessionHost().run()
+        sys.exit(0)
     print("Starting Pink Assistant...")
     assistant = PinkAssistant()
+    assistant.profiler.install_signal()
+    if "--profile" in sys.argv:
+        assistant.profiler.start()
     assistant.run()
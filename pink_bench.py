@@ -0,0 +1,150 @@
+"""
+End-to-end action-latency benchmark for Pink Assistant on simulated OS backends.
+
+Every command in what.txt is pushed through PinkAssistant.parse_and_execute with the
+fake input/window/brightness/audio/process/TTS backends from pink_fakes, so it runs on
+Linux/CI. For each command it reports:
+    wall_ms  real time spent in Python (dispatch, parsing, our own logic)
+    sim_ms   virtual time the same calls would take on a real machine (sleeps, key
+             presses, mouse travel, process launches, spoken reply)
+
+Usage:
+    python pink_bench.py
+    python pink_bench.py --save-baseline bench_baseline.json
+    python pink_bench.py --baseline bench_baseline.json --tolerance 0.15 --json report.json
+Exits with status 1 when any command regresses against the baseline.
+"""
+
+import os
+import io
+import sys
+import json
+import time
+import argparse
+import importlib
+import contextlib
+
+import pink_fakes
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# values substituted for the <slot> placeholders in what.txt
+SLOT_VALUES = {
+    "<query>": "faded",
+    "<number>": "3",
+    "<seconds>": "30",
+    "<appname>": "notepad",
+}
+
+def load_commands(path=os.path.join(HERE, "what.txt")):
+    commands = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip().strip('"').strip()
+            if not line.startswith("pink "):
+                continue
+            for slot, value in SLOT_VALUES.items():
+                line = line.replace(slot, value)
+            commands.append(line)
+    return commands
+
+def load_assistant(env):
+    """Import main against the fake backends and build an assistant without side services."""
+    env.install()
+    main = importlib.import_module("main")
+    env.attach(main)
+    main.CONFIG["asr_backend"] = "google"
+    main.CONFIG["control_api"] = False
+    main.CONFIG["music_library"]["db_path"] = ":memory:"     # empty index: "play <song>" takes the Spotify path
+    with contextlib.redirect_stdout(io.StringIO()):
+        assistant = main.PinkAssistant()
+    return main, assistant
+
+def run(commands, env, assistant, repeat=1):
+    rows = []
+    for cmd in commands:
+        walls, sims = [], []
+        result, calls = None, {}
+        for _ in range(repeat):
+            env.recorder.reset()
+            sim0 = env.clock.now
+            t0 = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = assistant.parse_and_execute(cmd)
+            walls.append((time.perf_counter() - t0) * 1000)
+            sims.append((env.clock.now - sim0) * 1000)
+            calls = env.recorder.by_backend()
+        rows.append({
+            "command": cmd,
+            "intent": result.get("intent") if result else None,
+            "success": bool(result and result.get("success")),
+            "wall_ms": round(min(walls), 3),
+            "sim_ms": round(min(sims), 1),
+            "calls": calls,
+        })
+    return rows
+
+def compare(rows, baseline, tolerance, wall_slack_ms=5.0, sim_slack_ms=1.0):
+    """Marks rows whose wall or simulated latency exceeds baseline * (1 + tolerance) + slack."""
+    base = {r["command"]: r for r in baseline.get("results", [])}
+    regressions = []
+    for row in rows:
+        b = base.get(row["command"])
+        if not b:
+            row["regressed"] = []
+            continue
+        flags = []
+        if row["sim_ms"] > b["sim_ms"] * (1 + tolerance) + sim_slack_ms:
+            flags.append("sim")
+        if row["wall_ms"] > b["wall_ms"] * (1 + tolerance) + wall_slack_ms:
+            flags.append("wall")
+        row["regressed"] = flags
+        row["baseline_sim_ms"] = b["sim_ms"]
+        row["baseline_wall_ms"] = b["wall_ms"]
+        if flags:
+            regressions.append(row)
+    return regressions
+
+def print_table(rows):
+    print(f"{'command':44} {'intent':20} {'ok':3} {'wall_ms':>9} {'sim_ms':>9}  flags")
+    for r in rows:
+        flags = ",".join(r.get("regressed", [])) and "REGRESSED(" + ",".join(r["regressed"]) + ")"
+        print(f"{r['command'][:44]:44} {str(r['intent'])[:20]:20} {'y' if r['success'] else 'n':3} "
+              f"{r['wall_ms']:9.3f} {r['sim_ms']:9.1f}  {flags}")
+    print(f"total: wall {sum(r['wall_ms'] for r in rows):.1f} ms, simulated {sum(r['sim_ms'] for r in rows) / 1000:.2f} s "
+          f"over {len(rows)} commands")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pink Assistant per-command latency benchmark")
+    parser.add_argument("--commands", default=os.path.join(HERE, "what.txt"))
+    parser.add_argument("--repeat", type=int, default=3, help="runs per command; the fastest is kept")
+    parser.add_argument("--baseline", help="baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative slowdown")
+    parser.add_argument("--save-baseline", help="write this run as the new baseline")
+    parser.add_argument("--json", help="write the full report here")
+    args = parser.parse_args(argv)
+
+    env = pink_fakes.FakeEnvironment()
+    _main, assistant = load_assistant(env)
+    rows = run(load_commands(args.commands), env, assistant, repeat=max(1, args.repeat))
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(rows, json.load(f), args.tolerance)
+    print_table(rows)
+
+    report = {"generated": time.strftime("%Y-%m-%dT%H:%M:%S"), "platform": sys.platform,
+              "tolerance": args.tolerance, "results": rows,
+              "regressions": [r["command"] for r in regressions]}
+    for path in (args.json, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+    if regressions:
+        print(f"{len(regressions)} command(s) regressed against {args.baseline}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,292 @@
+"""
+Offline evaluation of recognition + dispatch against a corpus of recorded commands.
+
+Each WAV is recognized with the configured backend and the transcript is pushed through
+PinkAssistant.parse_and_execute on the simulated OS backends from pink_fakes (nothing on
+the machine is touched). Files are spread over a process pool; every worker loads the
+model once and reads audio through mmap.
+
+Expected results come from a manifest (JSONL {"file", "text", "intent"} or TSV
+file<TAB>text[<TAB>intent]) or, without one, from a sidecar <name>.txt transcript per WAV.
+When no intent is given, the expected intent is whatever the reference transcript
+dispatches to.
+
+Reported: word error rate, intent accuracy, real-time factor (decode time / audio time)
+and throughput in files per second.
+
+Usage:
+    python pink_eval.py recordings/
+    python pink_eval.py recordings/ --manifest recordings/manifest.jsonl --workers 4 --json eval.json
+    python pink_eval.py recordings/ --backend open --model models/vosk-model-en-us-0.22
+    python pink_eval.py recordings/ --backend remote --remote-url http://127.0.0.1:8766/recognize
+"""
+
+import os
+import io
+import re
+import sys
+import json
+import mmap
+import time
+import struct
+import argparse
+import importlib
+import contextlib
+import concurrent.futures
+
+import pink_fakes
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SAMPLE_RATE = 16000
+
+# ========== Corpus ==========
+def load_manifest(path, root):
+    items = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if not line.strip() or line.startswith("#"):
+                continue
+            if path.endswith(".jsonl"):
+                row = json.loads(line)
+            else:
+                parts = line.split("\t")
+                row = {"file": parts[0], "text": parts[1] if len(parts) > 1 else None,
+                       "intent": parts[2] if len(parts) > 2 else None}
+            row["file"] = os.path.join(root, row["file"])
+            items.append({"file": row["file"], "text": row.get("text"), "intent": row.get("intent") or None})
+    return items
+
+def load_corpus(root, manifest=None):
+    """(file, reference text, expected intent) for every WAV under root."""
+    if manifest is None:
+        for name in ("manifest.jsonl", "manifest.tsv"):
+            if os.path.exists(os.path.join(root, name)):
+                manifest = os.path.join(root, name)
+                break
+    if manifest:
+        return load_manifest(manifest, os.path.dirname(os.path.abspath(manifest)))
+    items = []
+    for dirpath, _dirs, files in os.walk(root):
+        for name in sorted(files):
+            if not name.lower().endswith(".wav"):
+                continue
+            path = os.path.join(dirpath, name)
+            text = None
+            sidecar = os.path.splitext(path)[0] + ".txt"
+            if os.path.exists(sidecar):
+                with open(sidecar, encoding="utf-8") as f:
+                    text = f.read().strip()
+            items.append({"file": path, "text": text, "intent": None})
+    return items
+
+class MappedWav:
+    """A PCM WAV mapped read-only; `pcm` is a memoryview over its data chunk."""
+    def __init__(self, path):
+        self._f = open(path, "rb")
+        self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:4] != b"RIFF" or self._mm[8:12] != b"WAVE":
+            self.close()
+            raise ValueError("not a RIFF/WAVE file")
+        pos, fmt, data = 12, None, None
+        while pos + 8 <= len(self._mm):
+            cid, size = self._mm[pos:pos + 4], struct.unpack("<I", self._mm[pos + 4:pos + 8])[0]
+            if cid == b"fmt ":
+                fmt = struct.unpack("<HHIIHH", self._mm[pos + 8:pos + 24])
+            elif cid == b"data":
+                data = (pos + 8, min(size, len(self._mm) - pos - 8))
+                break
+            pos += 8 + size + (size & 1)
+        if fmt is None or data is None or fmt[0] != 1:
+            self.close()
+            raise ValueError("unsupported WAV (need uncompressed PCM)")
+        _tag, self.channels, self.rate, _bps, _align, bits = fmt
+        self.width = bits // 8
+        self._view = memoryview(self._mm)
+        self.pcm = self._view[data[0]:data[0] + data[1]]
+        self.duration = len(self.pcm) / float(self.rate * self.width * self.channels)
+
+    def mono16(self, rate):
+        """16-bit mono PCM at `rate`: the mapped buffer itself when it already matches."""
+        if self.width == 2 and self.channels == 1 and self.rate == rate:
+            return self.pcm
+        np = _WORKER["main"].np
+        if np is None or self.width != 2:
+            raise ValueError(f"{self.channels}ch/{self.width * 8}bit/{self.rate}Hz needs numpy and 16-bit samples")
+        x = np.frombuffer(self.pcm, dtype=np.int16).astype(np.float32)
+        if self.channels > 1:
+            x = x[:len(x) - len(x) % self.channels].reshape(-1, self.channels).mean(axis=1)
+        if self.rate != rate:
+            x = np.interp(np.arange(0, len(x), self.rate / rate), np.arange(len(x)), x)
+        return np.clip(x, -32768, 32767).astype(np.int16).tobytes()
+
+    def close(self):
+        for obj in ("pcm", "_view"):
+            if getattr(self, obj, None) is not None:
+                getattr(self, obj).release()
+                setattr(self, obj, None)
+        self._mm.close()
+        self._f.close()
+
+# ========== Scoring ==========
+def normalize(text):
+    text = re.sub(r"[^a-z0-9' ]+", " ", (text or "").lower())
+    return _WORKER["main"]._numbers_to_digits(" ".join(text.split())) if _WORKER else " ".join(text.split())
+
+def word_errors(ref, hyp):
+    """(edit distance in words, reference word count)"""
+    r, h = ref.split(), hyp.split()
+    prev = list(range(len(h) + 1))
+    for i, rw in enumerate(r, 1):
+        cur = [i] + [0] * len(h)
+        for j, hw in enumerate(h, 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (rw != hw))
+        prev = cur
+    return prev[-1], len(r)
+
+# ========== Worker ==========
+_WORKER = {}
+
+def init_worker(settings):
+    """Runs once per pool process: fake OS backends, one assistant, one loaded model."""
+    t0 = time.perf_counter()
+    env = pink_fakes.FakeEnvironment()
+    env.install()
+    main = importlib.import_module("main")
+    env.attach(main)
+    main.CONFIG["control_api"] = False
+    main.CONFIG["music_library"]["db_path"] = ":memory:"
+    main.CONFIG["asr_backend"] = "google" if settings["backend"] == "remote" else "vosk"
+    if settings.get("model"):
+        main.CONFIG["vosk_model_path"] = settings["model"]
+    with contextlib.redirect_stdout(io.StringIO()) as out:
+        assistant = main.PinkAssistant()
+    _WORKER.update(main=main, env=env, assistant=assistant, settings=settings, pid=os.getpid(),
+                   load_s=round(time.perf_counter() - t0, 3), error=None)
+    if settings["backend"] == "remote":
+        _WORKER["remote"] = main.HttpBackend(settings["remote_url"])
+    elif assistant.voice.grammar_recognizer is None:
+        reason = [l for l in out.getvalue().splitlines() if l.startswith("Local recognizer unavailable")]
+        _WORKER["error"] = reason[0] if reason else "local recognizer unavailable"
+
+def recognize(wav):
+    main, settings = _WORKER["main"], _WORKER["settings"]
+    if settings["backend"] == "remote":
+        audio = main.sr.AudioData(bytes(wav.mono16(SAMPLE_RATE)), SAMPLE_RATE, 2)
+        return _WORKER["remote"].recognize(audio)
+    rec = _WORKER["assistant"].voice.grammar_recognizer
+    return rec.recognize_pcm(wav.mono16(rec.sample_rate), use_grammar=settings["backend"] == "vosk")
+
+def dispatch(text):
+    assistant = _WORKER["assistant"]
+    if not text or assistant.wake_word not in text.lower():
+        return None     # the live loop ignores anything without the wake word
+    with contextlib.redirect_stdout(io.StringIO()):
+        return assistant.parse_and_execute(text, speak=False).get("intent")
+
+def evaluate_file(item):
+    row = {"file": item["file"], "worker": _WORKER["pid"], "worker_load_s": _WORKER["load_s"]}
+    if _WORKER["error"]:
+        row["error"] = _WORKER["error"]
+        return row
+    try:
+        wav = MappedWav(item["file"])
+    except (OSError, ValueError) as e:
+        row["error"] = str(e)
+        return row
+    try:
+        t0 = time.perf_counter()
+        hyp, conf = recognize(wav)
+        decode_s = time.perf_counter() - t0
+        row.update(hyp=hyp, confidence=round(conf, 3), audio_s=round(wav.duration, 3),
+                   decode_s=round(decode_s, 4), rtf=round(decode_s / wav.duration, 4) if wav.duration else None)
+    except Exception as e:
+        row["error"] = f"recognition failed: {e}"
+        return row
+    finally:
+        wav.close()
+    row["intent"] = dispatch(hyp)
+    if item.get("text") is not None:
+        row["ref"] = item["text"]
+        row["word_errors"], row["ref_words"] = word_errors(normalize(item["text"]), normalize(hyp))
+    expected = item.get("intent") or (dispatch(item["text"]) if item.get("text") else None)
+    if expected is not None or item.get("text"):
+        row["expected_intent"] = expected
+        row["intent_ok"] = row["intent"] == expected
+    return row
+
+# ========== Report ==========
+def summarize(rows, wall_s):
+    ok = [r for r in rows if "error" not in r]
+    scored = [r for r in ok if "ref_words" in r]
+    intents = [r for r in ok if "intent_ok" in r]
+    audio_s = sum(r["audio_s"] for r in ok)
+    decode_s = sum(r["decode_s"] for r in ok)
+    ref_words = sum(r["ref_words"] for r in scored)
+    workers = {r["worker"]: r["worker_load_s"] for r in rows}
+    return {
+        "files": len(rows),
+        "errors": len(rows) - len(ok),
+        "wer": round(sum(r["word_errors"] for r in scored) / ref_words, 4) if ref_words else None,
+        "intent_accuracy": round(sum(r["intent_ok"] for r in intents) / len(intents), 4) if intents else None,
+        "rtf": round(decode_s / audio_s, 4) if audio_s else None,
+        "files_per_sec": round(len(rows) / wall_s, 2) if wall_s else None,
+        "audio_s": round(audio_s, 2),
+        "decode_s": round(decode_s, 2),
+        "wall_s": round(wall_s, 2),
+        "workers": len(workers),
+        "worker_load_s": round(max(workers.values()), 3) if workers else None,
+    }
+
+def print_summary(rows, summary):
+    for r in rows:
+        if "error" in r:
+            print(f"ERR  {os.path.basename(r['file'])}: {r['error']}")
+        elif r.get("intent_ok") is False or r.get("word_errors"):
+            print(f"MISS {os.path.basename(r['file'])}: {r.get('ref')!r} -> {r['hyp']!r} "
+                  f"({r.get('expected_intent')} -> {r['intent']})")
+    fmt = lambda v, pct=False: "n/a" if v is None else (f"{v * 100:.1f}%" if pct else f"{v}")
+    print(f"files {summary['files']} (errors {summary['errors']}), WER {fmt(summary['wer'], True)}, "
+          f"intent accuracy {fmt(summary['intent_accuracy'], True)}, RTF {fmt(summary['rtf'])}, "
+          f"{fmt(summary['files_per_sec'])} files/s on {summary['workers']} worker(s) "
+          f"(model load {fmt(summary['worker_load_s'])} s)")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pink Assistant offline recognition/dispatch evaluation")
+    parser.add_argument("corpus", help="directory of WAV files")
+    parser.add_argument("--manifest", help="JSONL or TSV with file, text and optional intent")
+    parser.add_argument("--backend", choices=("vosk", "open", "remote"), default="vosk",
+                        help="vosk: grammar pass + open fallback (as live); open: open vocabulary only")
+    parser.add_argument("--model", help="Vosk model directory (default: CONFIG['vosk_model_path'])")
+    parser.add_argument("--remote-url", help="recognizer URL for --backend remote")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--limit", type=int, help="evaluate only the first N files")
+    parser.add_argument("--json", help="write the full report here")
+    args = parser.parse_args(argv)
+    if args.backend == "remote" and not args.remote_url:
+        parser.error("--backend remote needs --remote-url")
+
+    items = load_corpus(args.corpus, args.manifest)[:args.limit]
+    if not items:
+        print(f"No WAV files found in {args.corpus}")
+        return 1
+    settings = {"backend": args.backend, "model": os.path.abspath(args.model) if args.model else None,
+                "remote_url": args.remote_url}
+    workers = max(1, min(args.workers, len(items)))
+    t0 = time.perf_counter()
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                                initargs=(settings,)) as pool:
+        rows = list(pool.map(evaluate_file, items, chunksize=max(1, len(items) // (workers * 4))))
+    summary = summarize(rows, time.perf_counter() - t0)
+    print_summary(rows, summary)
+
+    if args.json:
+        report = {"generated": time.strftime("%Y-%m-%dT%H:%M:%S"), "platform": sys.platform,
+                  "settings": dict(settings, workers=workers, corpus=os.path.abspath(args.corpus)),
+                  "summary": summary, "results": rows}
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,629 @@
+"""
+Local stand-ins for Pink Assistant's external dependencies, for testing without the real
+services.
+
+Usage:
+    python pink_fakes.py asr --port 8766 --delay 1.5 --jitter 0.5 --fail-rate 0.3 --text "pink next"
+      -> then set CONFIG["asr_pool"]["remote_url"] = "http://127.0.0.1:8766/recognize"
+
+    python pink_fakes.py cdp --port 9222
+      -> DevTools stand-in for CdpYouTube (CONFIG["youtube_cdp_port"])
+
+    env = FakeEnvironment(); env.install(); import main; env.attach(main)
+      -> main runs on any OS; input/window/brightness/audio/process/TTS calls are recorded
+         against a virtual clock instead of touching the machine (see pink_bench.py)
+"""
+
+import io
+import os
+import re
+import sys
+import json
+import time
+import types
+import wave
+import base64
+import struct
+import hashlib
+import itertools
+import urllib.parse
+import random
+import argparse
+import threading
+import collections
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ========== Fake remote recognizer ==========
+class _AsrHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        srv = self.server
+        length = int(self.headers.get("Content-Length") or 0)
+        self.rfile.read(length)
+        with srv.lock:
+            srv.requests += 1
+        time.sleep(max(0.0, srv.delay + random.uniform(-srv.jitter, srv.jitter)))
+        if random.random() < srv.fail_rate:
+            with srv.lock:
+                srv.failures += 1
+            self.send_response(503)
+            self.end_headers()
+            return
+        body = json.dumps({"text": self.headers.get("X-Transcript", srv.text),
+                           "confidence": srv.confidence}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class FakeAsrServer:
+    """
+    Slow and/or flaky HTTP recognizer speaking HttpBackend's protocol: accepts a WAV body
+    and answers {"text", "confidence"} after `delay` +/- `jitter` seconds, or 503 with
+    probability `fail_rate`.
+    """
+    def __init__(self, host="127.0.0.1", port=0, text="pink next", confidence=0.9,
+                 delay=1.0, jitter=0.0, fail_rate=0.0):
+        self.httpd = ThreadingHTTPServer((host, port), _AsrHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.lock = threading.Lock()
+        self.httpd.requests = 0
+        self.httpd.failures = 0
+        self.httpd.text = text
+        self.httpd.confidence = confidence
+        self.httpd.delay = delay
+        self.httpd.jitter = jitter
+        self.httpd.fail_rate = fail_rate
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/recognize"
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, name="fake-asr", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+# ========== Fake Chrome DevTools endpoint ==========
+_WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+class _CdpHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _json(self, payload, code=200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        srv = self.server.fake
+        if self.headers.get("Upgrade", "").lower() == "websocket":
+            return self._websocket(self.path.rsplit("/", 1)[-1])
+        if self.path == "/json/version":
+            return self._json({"Browser": "FakeChrome/1.0", "Protocol-Version": "1.3"})
+        if self.path in ("/json", "/json/list"):
+            return self._json([srv.describe(t) for t in srv.tabs.values()])
+        if self.path.startswith("/json/close/"):
+            tab_id = self.path.rsplit("/", 1)[-1]
+            if srv.tabs.pop(tab_id, None) is None:
+                return self._json({"error": "no such target"}, 404)
+            return self._json({"closed": tab_id})
+        self._json({"error": "not found"}, 404)
+
+    def do_PUT(self):
+        srv = self.server.fake
+        if self.path.startswith("/json/new"):
+            url = urllib.parse.unquote(self.path.split("?", 1)[1]) if "?" in self.path else "about:blank"
+            return self._json(srv.describe(srv.new_tab(url)))
+        self._json({"error": "not found"}, 404)
+
+    # ----- websocket -----
+    def _websocket(self, tab_id):
+        srv = self.server.fake
+        accept = base64.b64encode(hashlib.sha1((self.headers["Sec-WebSocket-Key"] + _WS_GUID).encode()).digest()).decode()
+        self.send_response(101)
+        self.send_header("Upgrade", "websocket")
+        self.send_header("Connection", "Upgrade")
+        self.send_header("Sec-WebSocket-Accept", accept)
+        self.end_headers()
+        self.close_connection = True
+        while True:
+            try:
+                text = self._ws_recv()
+            except ConnectionError:
+                return
+            if text is None:
+                return
+            msg = json.loads(text)
+            with srv.lock:
+                srv.round_trips += 1
+                tab = srv.tabs.get(tab_id)
+                if tab is None:
+                    self._ws_send(json.dumps({"id": msg["id"], "error": {"message": "target closed"}}))
+                    continue
+                reply = {"id": msg["id"], "result": srv.handle(tab, msg["method"], msg.get("params", {}))}
+            self._ws_send(json.dumps(reply))
+
+    def _ws_recv(self):
+        head = self.rfile.read(2)
+        if len(head) < 2:
+            raise ConnectionError("closed")
+        opcode, n = head[0] & 0x0F, head[1] & 0x7F
+        if n == 126:
+            n = struct.unpack(">H", self.rfile.read(2))[0]
+        elif n == 127:
+            n = struct.unpack(">Q", self.rfile.read(8))[0]
+        mask = self.rfile.read(4) if head[1] & 0x80 else b"\0\0\0\0"
+        data = bytes(b ^ mask[i % 4] for i, b in enumerate(self.rfile.read(n)))
+        if opcode == 0x8:
+            return None
+        return data.decode("utf-8")
+
+    def _ws_send(self, text):
+        payload = text.encode("utf-8")
+        n = len(payload)
+        if n < 126:
+            header = bytes([0x81, n])
+        elif n < 65536:
+            header = bytes([0x81, 126]) + struct.pack(">H", n)
+        else:
+            header = bytes([0x81, 127]) + struct.pack(">Q", n)
+        self.wfile.write(header + payload)
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+class FakeCdpServer:
+    """
+    Local DevTools stand-in for CdpYouTube: /json/version, /json/list, PUT /json/new,
+    /json/close/<id> and a websocket per tab that answers Runtime.evaluate by reading the
+    /*pink:<op> <args>*/ tag and applying it to a simulated <video>. `round_trips` counts
+    websocket requests so tests can check each operation costs exactly one.
+    """
+    _TAG = re.compile(r"^/\*pink:(\w+) (.*?)\*/")
+
+    def __init__(self, host="127.0.0.1", port=0, duration=300.0):
+        self.lock = threading.Lock()
+        self.tabs = {}
+        self.round_trips = 0
+        self.duration = duration
+        self._ids = itertools.count(1)
+        self.httpd = ThreadingHTTPServer((host, port), _CdpHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.fake = self
+
+    @property
+    def port(self):
+        return self.httpd.server_address[1]
+
+    def new_tab(self, url):
+        tab_id = f"TAB{next(self._ids)}"
+        self.tabs[tab_id] = {"id": tab_id, "url": url, "video": {
+            "currentTime": 0.0, "duration": self.duration, "playbackRate": 1.0, "paused": False, "videoId": None}}
+        return self.tabs[tab_id]
+
+    def describe(self, tab):
+        host, port = self.httpd.server_address[:2]
+        return {"id": tab["id"], "type": "page", "url": tab["url"], "title": tab["url"],
+                "webSocketDebuggerUrl": f"ws://{host}:{port}/devtools/page/{tab['id']}"}
+
+    def handle(self, tab, method, params):
+        if method == "Page.navigate":
+            tab["url"] = params.get("url", tab["url"])
+            return {"frameId": tab["id"]}
+        if method != "Runtime.evaluate":
+            return {}
+        m = self._TAG.match(params.get("expression", ""))
+        if not m:
+            return {"result": {"type": "undefined"}}
+        op, args = m.group(1), json.loads(m.group(2))
+        v = tab["video"]
+        if op == "seek_by":
+            v["currentTime"] = max(0.0, min(v["duration"], v["currentTime"] + args["delta"]))
+            value = v["currentTime"]
+        elif op == "seek_to":
+            v["currentTime"] = max(0.0, min(v["duration"], args["t"]))
+            value = v["currentTime"]
+        elif op == "rate":
+            v["playbackRate"] = args["rate"]
+            value = v["playbackRate"]
+        elif op == "paused":
+            value = v["paused"]
+        elif op == "toggle":
+            v["paused"] = not v["paused"]
+            value = not v["paused"]
+        elif op == "next":
+            v.update(currentTime=0.0, videoId=f"next{next(self._ids):07d}")
+            value = True
+        elif op == "play_first":
+            v.update(currentTime=0.0, paused=False, videoId=f"q{abs(hash(args['q'])) % 10 ** 10:010d}")
+            tab["url"] = f"https://www.youtube.com/watch?v={v['videoId']}"
+            value = v["videoId"]
+        elif op == "navigate":
+            tab["url"] = args["url"]
+            value = args["url"]
+        else:
+            return {"result": {"type": "undefined"},
+                    "exceptionDetails": {"text": f"unknown op {op}"}}
+        return {"result": {"type": type(value).__name__, "value": value}}
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, name="fake-cdp", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+# ========== Simulated OS backends ==========
+# Simulated cost (seconds) of one call on a real Windows box, charged to the virtual clock
+# on top of any explicit duration (sleep, moveTo duration, typing interval, speech).
+BACKEND_COSTS = {
+    "input": 0.004,         # pyautogui / keybd_event
+    "window": 0.003,        # window lookup / activation
+    "brightness": 0.040,    # WMI / DDC round trip
+    "audio": 0.002,         # winsound
+    "process": 0.250,       # start / taskkill via the shell
+    "browser": 0.400,       # webbrowser.open handing off to the browser
+    "tts": 0.050,           # engine setup per utterance, plus speaking time
+}
+
+class VirtualClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def advance(self, seconds):
+        if seconds and seconds > 0:
+            self.now += seconds
+
+class CallRecorder:
+    """Every fake backend call as (virtual_time, backend, name, args)."""
+    def __init__(self, clock):
+        self.clock = clock
+        self.calls = []
+
+    def record(self, backend, name, args=(), cost=0.0):
+        self.clock.advance(cost)
+        self.calls.append((round(self.clock.now, 6), backend, name, args))
+
+    def reset(self):
+        self.calls = []
+
+    def by_backend(self):
+        return dict(collections.Counter(c[1] for c in self.calls))
+
+class FakeWindow:
+    _next_hwnd = 1000
+
+    def __init__(self, env, title, left=0, top=0, width=1280, height=720):
+        FakeWindow._next_hwnd += 1
+        self._hWnd = FakeWindow._next_hwnd
+        self.env = env
+        self.title = title
+        self.left, self.top, self.width, self.height = left, top, width, height
+
+    def activate(self):
+        self.env.call("window", "activate", self.title)
+        self.env.active = self
+
+class FakeWinEventWatcher:
+    """
+    WinEventWatcher over env.windows with live hooks: window hwnds double as process ids
+    and the process name comes from the title. fire() delivers an event to subscribers.
+    """
+    PROCESSES = (("spotify", "spotify.exe"), ("google chrome", "chrome.exe"), ("edge", "msedge.exe"))
+
+    def __init__(self, env):
+        self.env = env
+        self.running = True
+        self.tracked = set()
+        self._subs = collections.defaultdict(list)
+
+    def subscribe(self, event, fn, per_process=False):
+        self._subs[event].append(fn)
+
+    def fire(self, event, hwnd):
+        for fn in self._subs.get(event, ()):
+            fn(hwnd)
+
+    def track_process(self, pid):
+        self.tracked.add(pid)
+
+    def _window(self, hwnd):
+        return next((w for w in self.env.windows if w._hWnd == hwnd), None)
+
+    def windows(self):
+        self.env.call("window", "enumWindows")
+        return [(w._hWnd, w.title) for w in self.env.windows]
+
+    def process_id(self, hwnd):
+        return hwnd
+
+    def process_name(self, hwnd):
+        w = self._window(hwnd)
+        title = w.title.lower() if w else ""
+        return next((exe for key, exe in self.PROCESSES if key in title), "")
+
+    def foreground(self):
+        return self.env.active._hWnd if self.env.active else None
+
+class FakeTTSEngine:
+    def __init__(self, env):
+        self.env = env
+        self.props = {"rate": 200, "volume": 1.0}
+        self.queue = []
+
+    def setProperty(self, name, value):
+        self.props[name] = value
+
+    def getProperty(self, name):
+        return self.props.get(name)
+
+    def say(self, text):
+        self.queue.append(text)
+
+    def runAndWait(self):
+        for text in self.queue:
+            words = max(1, len(text.split()))
+            self.env.call("tts", "speak", text, extra=words * 60.0 / self.props["rate"])
+        self.queue = []
+
+class FakeEnvironment:
+    """
+    Builds fake modules for every OS-facing dependency main.py imports (input, windows,
+    brightness, audio, processes, TTS, speech) and records their calls with virtual
+    timestamps. install() must run before `import main`; attach(main) then routes the
+    shell, browser and time.sleep through the fakes.
+    """
+    def __init__(self, costs=None, battery=(80, True)):
+        self.clock = VirtualClock()
+        self.recorder = CallRecorder(self.clock)
+        self.costs = dict(BACKEND_COSTS, **(costs or {}))
+        self.brightness = 50
+        self.volume = 50
+        self.battery = battery
+        self.windows = [
+            FakeWindow(self, "Spotify Premium"),
+            FakeWindow(self, "Faded - YouTube - Google Chrome", left=100, top=50),
+        ]
+        self.active = None
+        self.modules = self._build_modules()
+        self.time = self._time_module()
+
+    def call(self, backend, name, *args, extra=0.0):
+        self.recorder.record(backend, name, args, self.costs.get(backend, 0.0) + extra)
+
+    def sleep(self, seconds):
+        self.recorder.record("time", "sleep", (seconds,), seconds)
+
+    # ----- process / browser -----
+    def shell(self, cmd):
+        self.call("process", "shell", cmd)
+        low = cmd.lower()
+        if low.startswith("start spotify") and not any(w.title.startswith("Spotify") for w in self.windows):
+            self.windows.append(FakeWindow(self, "Spotify Premium"))
+        return 0
+
+    def spawn(self, argv, env=None):
+        self.call("process", "spawn", " ".join(argv))
+        return None
+
+    def open_target(self, target):
+        self.call("process", "open", target)
+        if target.lower().startswith("spotify") and not any(w.title.startswith("Spotify") for w in self.windows):
+            self.windows.append(FakeWindow(self, "Spotify Premium"))
+
+    def browser_open(self, url, *args, **kwargs):
+        self.call("browser", "open", url)
+        return True
+
+    def _time_module(self):
+        shim = types.ModuleType("time")
+        for name in dir(time):
+            if not name.startswith("__"):
+                setattr(shim, name, getattr(time, name))
+        shim.sleep = self.sleep
+        return shim
+
+    # ----- module fakes -----
+    def _build_modules(self):
+        env = self
+        mods = {}
+
+        # pyautogui (input)
+        m = types.ModuleType("pyautogui")
+        m.FAILSAFE = False
+        m.size = lambda: (1920, 1080)
+        m.position = lambda: (0, 0)
+        m.moveTo = lambda x=None, y=None, duration=0.0, *a, **k: env.call("input", "moveTo", x, y, extra=duration or 0.0)
+        m.click = lambda *a, **k: env.call("input", "click")
+        m.press = lambda key, *a, **k: env.call("input", "press", key)
+        m.hotkey = lambda *keys, **k: env.call("input", "hotkey", *keys)
+        m.write = lambda text, interval=0.0, *a, **k: env.call("input", "write", text, extra=interval * len(text))
+        m.typewrite = m.write
+        m.scroll = lambda n, *a, **k: env.call("input", "scroll", n)
+        mods["pyautogui"] = m
+
+        # win32api (media / volume keys)
+        m = types.ModuleType("win32api")
+        def keybd_event(vk, scan=0, flags=0, extra=0):
+            if vk == 0xAF:
+                env.volume = min(100, env.volume + 2)
+            elif vk == 0xAE:
+                env.volume = max(0, env.volume - 2)
+            env.call("input", "keybd_event", hex(vk))
+        m.keybd_event = keybd_event
+        mods["win32api"] = m
+
+        # winsound (audio)
+        m = types.ModuleType("winsound")
+        m.SND_FILENAME, m.SND_ASYNC, m.SND_MEMORY, m.SND_PURGE = 0x20000, 0x1, 0x4, 0x40
+        m.PlaySound = lambda sound, flags: env.call("audio", "PlaySound", flags)
+        mods["winsound"] = m
+
+        # screen_brightness_control (brightness)
+        m = types.ModuleType("screen_brightness_control")
+        def get_brightness(*a, **k):
+            env.call("brightness", "get")
+            return [env.brightness]
+        def set_brightness(value, *a, **k):
+            env.call("brightness", "set", value)
+            env.brightness = max(0, min(100, int(value)))
+        m.get_brightness, m.set_brightness = get_brightness, set_brightness
+        mods["screen_brightness_control"] = m
+
+        # pygetwindow (windows)
+        m = types.ModuleType("pygetwindow")
+        def getWindowsWithTitle(title):
+            env.call("window", "getWindowsWithTitle", title)
+            return [w for w in env.windows if title.lower() in w.title.lower()]
+        def getAllWindows():
+            env.call("window", "getAllWindows")
+            return list(env.windows)
+        m.getWindowsWithTitle = getWindowsWithTitle
+        m.getAllWindows = getAllWindows
+        m.getAllTitles = lambda: [w.title for w in env.windows]
+        m.getActiveWindow = lambda: env.active
+        mods["pygetwindow"] = m
+
+        # psutil (battery / processes)
+        m = types.ModuleType("psutil")
+        Battery = collections.namedtuple("sbattery", "percent secsleft power_plugged")
+        m.sensors_battery = lambda: Battery(env.battery[0], -2, env.battery[1]) if env.battery else None
+        class Process:
+            def __init__(self, pid=None):
+                self.pid = pid
+            def name(self):
+                return "python.exe"
+        m.Process = Process
+        m.cpu_count = lambda logical=True: 4
+        mods["psutil"] = m
+
+        # pyttsx3 (TTS)
+        m = types.ModuleType("pyttsx3")
+        m.init = lambda driverName=None, *a, **k: FakeTTSEngine(env)
+        mods["pyttsx3"] = m
+
+        # speech_recognition (no microphone / network in the simulation)
+        m = types.ModuleType("speech_recognition")
+        class WaitTimeoutError(Exception): pass
+        class UnknownValueError(Exception): pass
+        class RequestError(Exception): pass
+        class AudioData:
+            def __init__(self, frame_data, sample_rate, sample_width):
+                self.frame_data, self.sample_rate, self.sample_width = frame_data, sample_rate, sample_width
+            def get_raw_data(self, convert_rate=None, convert_width=None):
+                return self.frame_data
+            def get_wav_data(self, convert_rate=None, convert_width=None):
+                buf = io.BytesIO()
+                with wave.open(buf, "wb") as w:
+                    w.setnchannels(1)
+                    w.setsampwidth(self.sample_width)
+                    w.setframerate(self.sample_rate)
+                    w.writeframes(self.frame_data)
+                return buf.getvalue()
+        class Microphone:
+            SAMPLE_WIDTH = 2
+            def __init__(self, device_index=None, sample_rate=None, chunk_size=1024):
+                self.device_index = device_index
+                self.SAMPLE_RATE = sample_rate or 16000
+                self.CHUNK = chunk_size
+                self.stream = None
+            def __enter__(self):
+                return self
+            def __exit__(self, *exc):
+                return False
+        class Recognizer:
+            energy_threshold = 300
+            def adjust_for_ambient_noise(self, source, duration=1):
+                pass
+            def listen(self, source, timeout=None, phrase_time_limit=None):
+                raise WaitTimeoutError()
+            def recognize_google(self, audio, show_all=False, **kwargs):
+                raise RequestError("offline simulation")
+        for obj in (WaitTimeoutError, UnknownValueError, RequestError, AudioData, Microphone, Recognizer):
+            setattr(m, obj.__name__, obj)
+        mods["speech_recognition"] = m
+        return mods
+
+    def install(self):
+        sys.modules.update(self.modules)
+
+    def attach(self, main):
+        main._shell = self.shell
+        main._spawn = self.spawn
+        main._open_target = self.open_target
+        main.webbrowser = types.SimpleNamespace(open=self.browser_open)
+        main.time = self.time
+        main.gw = self.modules["pygetwindow"]
+        return main
+
+# ========== Touchscreen workers ==========
+# Stand-ins for main._touchscreen_worker (module level so the spawn context can pickle them).
+def crashing_touchscreen_worker(conn, sensitivity=5):
+    """Dies right after starting, like a worker whose camera stack segfaults."""
+    conn.close()
+    os._exit(3)
+
+def idle_touchscreen_worker(conn, sensitivity=5):
+    """Reports ready and follows start/stop/quit without touching a camera."""
+    conn.send({"type": "ready"})
+    while True:
+        try:
+            msg = conn.recv()
+        except (EOFError, OSError):
+            return
+        if msg["type"] == "start":
+            conn.send({"type": "status", "fps": 0.0, "hand": False, "frames": 0, "skipped": 0})
+        elif msg["type"] == "stop":
+            conn.send({"type": "stopped", "reason": "stop"})
+        elif msg["type"] == "quit":
+            return
+
+# ========== CLI ==========
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pink Assistant fake backends")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    asr = sub.add_parser("asr", help="serve a slow/flaky remote recognizer")
+    asr.add_argument("--host", default="127.0.0.1")
+    asr.add_argument("--port", type=int, default=8766)
+    asr.add_argument("--text", default="pink next")
+    asr.add_argument("--confidence", type=float, default=0.9)
+    asr.add_argument("--delay", type=float, default=1.0)
+    asr.add_argument("--jitter", type=float, default=0.0)
+    asr.add_argument("--fail-rate", type=float, default=0.0)
+    cdp = sub.add_parser("cdp", help="serve a fake Chrome DevTools endpoint")
+    cdp.add_argument("--host", default="127.0.0.1")
+    cdp.add_argument("--port", type=int, default=9222)
+    args = parser.parse_args(argv)
+
+    if args.cmd == "asr":
+        server = FakeAsrServer(args.host, args.port, args.text, args.confidence,
+                               args.delay, args.jitter, args.fail_rate)
+        print(f"Fake recognizer at {server.url} (delay {args.delay}s, fail rate {args.fail_rate})")
+        try:
+            server.httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+    elif args.cmd == "cdp":
+        server = FakeCdpServer(args.host, args.port)
+        print(f"Fake DevTools endpoint at http://{args.host}:{server.port}")
+        try:
+            server.httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
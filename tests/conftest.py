@@ -0,0 +1,30 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pink_bench
+import pink_fakes
+
+
+@pytest.fixture(scope="session")
+def env():
+    return pink_fakes.FakeEnvironment()
+
+
+@pytest.fixture(scope="session")
+def loaded(env):
+    return pink_bench.load_assistant(env)
+
+
+@pytest.fixture(scope="session")
+def main(loaded):
+    return loaded[0]
+
+
+@pytest.fixture
+def assistant(loaded, env):
+    env.recorder.reset()
+    return loaded[1]
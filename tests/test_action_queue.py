@@ -0,0 +1,112 @@
+import threading
+
+import pytest
+
+
+class RecordingExecutor:
+    """Stands in for PinkAssistant._execute; the first command blocks until released."""
+    def __init__(self):
+        self.calls = []
+        self.spoken = []
+        self.release = threading.Event()
+        self.on_execute = None
+
+    def __call__(self, command, speak=True, speak_if=None):
+        if not self.calls:
+            self.release.wait(5)
+        self.calls.append(command)
+        if self.on_execute:
+            self.on_execute(command)
+        if speak and (speak_if is None or speak_if()):
+            self.spoken.append(command)
+        return {"intent": "stub", "slots": {}, "success": True, "reply": command,
+                "command": command, "timing": {}}
+
+
+@pytest.fixture
+def queue(main):
+    executor = RecordingExecutor()
+    q = main.ActionQueue(executor, "pink")
+    q.submit("pink time")       # occupies the worker so the burst below queues up
+    return q, executor
+
+
+def drain(q, executor, futures):
+    executor.release.set()
+    return [f.result(5) for f in futures]
+
+
+def test_burst_runs_once_and_speaks_once(queue):
+    q, executor = queue
+    futures = [q.submit("pink volume up") for _ in range(3)]
+    results = drain(q, executor, futures)
+    assert executor.calls == ["pink time", "increase volume by 30"]
+    assert executor.spoken == ["pink time", "increase volume by 30"]
+    assert all(r is results[0] for r in results)
+    assert results[0]["coalesced"] == ["pink volume up"] * 3
+    assert q.status()["coalesced"] == 2
+
+
+def test_absolute_command_supersedes_pending_relative_ones(queue):
+    q, executor = queue
+    futures = [q.submit(c) for c in ("pink volume up", "pink volume up", "pink set volume to 40", "pink volume down")]
+    drain(q, executor, futures)
+    assert executor.calls == ["pink time", "set volume to 30"]
+
+
+def test_newer_set_replaces_older_set(queue):
+    q, executor = queue
+    futures = [q.submit(c) for c in ("pink select 2", "pink select 5")]
+    drain(q, executor, futures)
+    assert executor.calls == ["pink time", "select 5"]
+    assert q.status()["superseded"] == 1
+
+
+@pytest.mark.parametrize("commands, executed", [
+    (["pink set volume to 95", "pink volume up", "pink volume up"], "set volume to 100"),
+    (["pink set volume to 5", "pink volume down"], "set volume to 0"),
+    (["pink increase volume by 60", "pink increase volume by 60"], "increase volume by 100"),
+])
+def test_bounded_targets_are_clamped(queue, commands, executed):
+    q, executor = queue
+    drain(q, executor, [q.submit(c) for c in commands])
+    assert executor.calls == ["pink time", executed]
+
+
+def test_unbounded_targets_are_not_clamped(queue):
+    q, executor = queue
+    drain(q, executor, [q.submit("pink youtube forward 90") for _ in range(2)])
+    assert executor.calls == ["pink time", "youtube forward 180"]
+
+
+def test_burst_that_cancels_out_is_not_executed(queue):
+    q, executor = queue
+    futures = [q.submit(c) for c in ("pink youtube forward 10", "pink youtube rewind 10")]
+    results = drain(q, executor, futures)
+    assert executor.calls == ["pink time"]
+    assert results[0]["slots"] == {"net": 0}
+    assert q.status()["cancelled"] == 1
+
+
+def test_reply_is_silent_while_a_newer_action_for_the_target_waits(queue):
+    q, executor = queue
+    later = []
+    executor.on_execute = lambda cmd: later.append(q.submit("pink set volume to 10")) if cmd == "pink volume up" else None
+    first = q.submit("pink volume up")
+    drain(q, executor, [first])
+    later[0].result(5)
+    assert executor.calls == ["pink time", "pink volume up", "pink set volume to 10"]
+    assert executor.spoken == ["pink time", "pink set volume to 10"]
+
+
+@pytest.mark.parametrize("commands, merged", [
+    (["pink volume up", "pink volume up", "pink volume up"], ("volume", "delta", 30)),
+    (["pink set volume to 40", "pink volume down"], ("volume", "set", 30)),
+    (["pink select 2", "pink select 4"], ("spotify_select", "set", 4)),
+])
+def test_merge_plans(main, commands, merged):
+    queue = main.ActionQueue(lambda *a, **k: None)
+    plan = queue.plan(commands[0])
+    for cmd in commands[1:]:
+        plan = queue._merge(plan, queue.plan(cmd), plan[0] in queue.BOUNDED)
+    assert plan == merged
@@ -0,0 +1,90 @@
+import http.client
+import json
+
+import pytest
+
+TOKEN = "test-token"
+
+
+class StubAssistant:
+    def __init__(self):
+        self.commands = []
+
+    def parse_and_execute(self, text, speak=True):
+        self.commands.append(text)
+        return {"intent": "stub", "ok": True, "reply": None}
+
+    def status(self):
+        return {"running": True}
+
+
+@pytest.fixture
+def server(main):
+    stub = StubAssistant()
+    srv = main.ControlServer(stub, "127.0.0.1", 0, token=TOKEN)
+    srv.start()
+    yield srv, stub
+    srv.stop()
+
+
+def request(srv, method, path, body=None, headers=None):
+    port = srv.httpd.server_address[1]
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    conn.request(method, path, body=body, headers=headers or {})
+    resp = conn.getresponse()
+    data = resp.read()
+    conn.close()
+    return resp.status, data
+
+
+def command(srv, **headers):
+    base = {"Content-Type": "application/json", "X-Pink-Token": TOKEN}
+    base.update(headers)
+    return request(srv, "POST", "/command", json.dumps({"text": "pink open calc"}),
+                   {k: v for k, v in base.items() if v is not None})
+
+
+def test_command_with_token_runs(server):
+    srv, stub = server
+    status, _ = command(srv)
+    assert status == 200
+    assert stub.commands == ["pink open calc"]
+
+
+def test_bearer_token_accepted(server):
+    srv, stub = server
+    status, _ = command(srv, **{"X-Pink-Token": None, "Authorization": f"Bearer {TOKEN}"})
+    assert status == 200
+
+
+@pytest.mark.parametrize("headers, expected", [
+    ({"X-Pink-Token": None}, 401),
+    ({"X-Pink-Token": "wrong"}, 401),
+    ({"Content-Type": "text/plain"}, 415),
+    ({"Origin": "https://evil.example"}, 403),
+    ({"Origin": "null"}, 403),
+    ({"Host": "evil.example:8765"}, 403),
+])
+def test_browser_style_requests_rejected(server, headers, expected):
+    srv, stub = server
+    status, _ = command(srv, **headers)
+    assert status == expected
+    assert stub.commands == []
+
+
+def test_health_needs_no_token_but_checks_host(server):
+    srv, _ = server
+    assert request(srv, "GET", "/health")[0] == 200
+    assert request(srv, "GET", "/health", headers={"Host": "rebound.example"})[0] == 403
+
+
+def test_status_needs_token(server):
+    srv, _ = server
+    assert request(srv, "GET", "/status")[0] == 401
+    assert request(srv, "GET", "/status", headers={"X-Pink-Token": TOKEN})[0] == 200
+
+
+def test_open_app_uses_argument_list(assistant, env):
+    assert assistant.system.apps.open_app("notepad")
+    calls = [c for c in env.recorder.calls if c[1] == "process"]
+    assert calls and all(c[2] != "shell" for c in calls)
@@ -0,0 +1,65 @@
+import pytest
+
+
+class RecordingInjector:
+    def __init__(self):
+        self.screen = ""
+        self.edits = []
+
+    def edit(self, backspaces=0, text=""):
+        self.edits.append((backspaces, text))
+        self.screen = self.screen[:len(self.screen) - backspaces] + text
+        return True
+
+
+@pytest.fixture
+def session(main):
+    return main.DictationSession(voice=None, injector=RecordingInjector())
+
+
+@pytest.mark.parametrize("text, words, stop", [
+    ("see you at the weekend dictation is fun", "see you at the weekend dictation is fun", False),
+    ("hello world stop dictation", "hello world", True),
+    ("stop dictation", "", True),
+    ("please end dictation now", "please", True),
+    ("nonstop dictations", "nonstop dictations", False),
+])
+def test_stop_phrase_matches_whole_words(session, text, words, stop):
+    assert session._strip_stop(text.split()) == (words.split(), stop)
+
+
+@pytest.mark.parametrize("words, leading, expected", [
+    ("hello comma world period", False, "hello, world."),
+    ("is it done question mark", True, " is it done?"),
+    ("first new line second", False, "first\nsecond"),
+    ("full stop", False, "."),
+])
+def test_format_spoken_punctuation(session, words, leading, expected):
+    assert session._format(words.split(), leading) == expected
+
+
+def test_show_only_rewrites_the_changed_tail(session):
+    session.stats = {"updates": 0, "chars_typed": 0, "chars_corrected": 0}
+    session._shown = ""
+    session._show("the cat")
+    session._show("the cap sat")
+    assert session.injector.screen == "the cap sat"
+    assert session.injector.edits == [(0, "the cat"), (1, "p sat")]
+    assert session.stats["chars_corrected"] == 1
+
+
+def test_dictate_refused_without_listening_loop(assistant):
+    assert not assistant.dictation.attached
+    result = assistant.parse_and_execute("pink dictate", speak=False)
+    assert result["intent"] == "dictation_start" and not result["success"]
+    assert not assistant.dictation.requested.is_set()
+
+
+def test_dictate_requested_when_loop_attached(assistant):
+    assistant.dictation.attached = True
+    try:
+        result = assistant.parse_and_execute("pink dictate", speak=False)
+        assert result["success"] and assistant.dictation.requested.is_set()
+    finally:
+        assistant.dictation.attached = False
+        assistant.dictation.requested.clear()
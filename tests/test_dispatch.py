@@ -0,0 +1,19 @@
+import threading
+
+
+def test_playback_confirmation_does_not_block_the_next_command(assistant, main, monkeypatch):
+    release = threading.Event()
+    np = assistant.system.now_playing
+
+    def slow_wait(source, since, timeout=1.5):
+        release.wait(5)
+        return None
+
+    monkeypatch.setattr(np, "wait_for_change", slow_wait)
+    pending = assistant.actions.submit("pink next", speak=False)
+    quick = assistant.parse_and_execute("pink time", speak=False)
+    assert quick["intent"] == "time" and not pending.done()
+    release.set()
+    result = pending.result(5)
+    assert result["intent"] == "spotify_next" and result["reply"] == "Skipped to next track."
+    assert "confirm_ms" in result["timing"]
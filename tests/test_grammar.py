@@ -0,0 +1,25 @@
+def test_templates_expand_with_wake_word_and_slots(main):
+    grammar = main.CommandGrammar(intents={"volume": ["set volume to <number>"], "open": ["open <app>"]},
+                                  apps=["notepad"], wake_word="pink")
+    phrases = grammar.phrases()
+    assert "pink set volume to fifty" in phrases
+    assert "pink open notepad" in phrases
+    assert '"[unk]"' in grammar.to_json()
+
+
+def test_adding_an_app_only_touches_app_intents(main):
+    grammar = main.CommandGrammar(intents={"time": ["time"], "open": ["open <app>"]}, apps=[], wake_word="pink")
+    version = grammar.version
+    grammar.add_app("Calculator")
+    assert "pink open calculator" in grammar.phrases()
+    assert grammar.version == version + 1
+    grammar.remove_app("calculator")
+    assert "pink open calculator" not in grammar.phrases()
+
+
+def test_free_text_slots_need_open_vocabulary(main):
+    grammar = main.CommandGrammar(intents={"yt": ["play <query> on youtube"], "time": ["time"]}, wake_word="pink")
+    assert grammar.needs_open_vocab("pink play [unk] on youtube")
+    assert grammar.needs_open_vocab("pink play faded on youtube")
+    assert not grammar.needs_open_vocab("pink time")
+    assert not grammar.needs_open_vocab("play faded on youtube")
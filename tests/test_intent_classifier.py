@@ -0,0 +1,31 @@
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+
+@pytest.mark.parametrize("content", [b"", b"PK\x03\x04truncated", b"not a zip at all"])
+def test_corrupt_model_file_is_retrained(main, tmp_path, content):
+    path = tmp_path / "pink-intents.npz"
+    path.write_bytes(content)
+    clf = main.IntentClassifier.load_or_train(str(path), dim=1024)
+    assert clf.classify("turn it up")[0] == "volume_up"
+    again = main.IntentClassifier.load_or_train(str(path), dim=1024)
+    assert again.labels == clf.labels
+
+
+def test_save_leaves_no_temp_files(main, tmp_path):
+    path = tmp_path / "models" / "pink-intents.npz"
+    main.IntentClassifier.load_or_train(str(path), dim=1024)
+    assert os.listdir(path.parent) == ["pink-intents.npz"]
+
+
+@pytest.mark.parametrize("text, label", [
+    ("skip this song", "spotify_next"),
+    ("make it softer", "volume_down"),
+    ("who sings this", "now_playing"),
+])
+def test_classifier_paraphrases(main, text, label):
+    clf = main.IntentClassifier.train(dim=2048)
+    assert clf.classify(text)[0] == label
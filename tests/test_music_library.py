@@ -0,0 +1,44 @@
+import os
+
+import pytest
+
+
+@pytest.fixture
+def library(main, tmp_path):
+    music = tmp_path / "music"
+    (music / "Discovery").mkdir(parents=True)
+    (music / "Faded").mkdir()
+    for rel in ("Discovery/01 - Daft Punk - One More Time.mp3", "Discovery/02 - Daft Punk - Aerodynamic.mp3",
+                "Faded/Alan Walker - Faded.flac", "Faded/notes.txt"):
+        (music / rel).write_bytes(b"")
+    lib = main.MusicLibrary(":memory:", [str(music)])
+    lib.scan()
+    return lib, music
+
+
+def test_scan_indexes_audio_files_only(library):
+    lib, _ = library
+    assert lib.status()["tracks"] == 3
+
+
+@pytest.mark.parametrize("query, title", [
+    ("one more time", "One More Time"),
+    ("daft punk aerodynamic", "Aerodynamic"),
+    ("faded by alan walker", "Faded"),
+    ("aerodyn", "Aerodynamic"),
+])
+def test_search_ranks_the_right_track_first(library, query, title):
+    lib, _ = library
+    assert lib.search(query, limit=1)[0]["title"] == title
+
+
+def test_search_without_match_is_empty(library):
+    lib, _ = library
+    assert lib.search("bohemian rhapsody") == []
+
+
+def test_rescan_drops_removed_files(library):
+    lib, music = library
+    os.remove(music / "Faded" / "Alan Walker - Faded.flac")
+    stats = lib.scan()
+    assert stats["removed"] == 1 and lib.search("faded") == []
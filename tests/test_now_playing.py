@@ -0,0 +1,40 @@
+import pink_fakes
+
+
+def tracker(main):
+    return main.NowPlayingTracker(main.WinEventWatcher())
+
+
+def test_spotify_title_tracks_playing(main):
+    np = tracker(main)
+    np.update(1, "Daft Punk - One More Time", process="spotify.exe")
+    assert np.snapshot("spotify")["playing"] and np.snapshot("spotify")["track"] == "One More Time"
+    np.update(1, "Spotify Premium", process="spotify.exe")
+    assert not np.snapshot("spotify")["playing"]
+
+
+def test_open_youtube_tab_alone_is_not_media(main):
+    np = tracker(main)
+    yt = main.YouTubeController(windows=object(), now_playing=np)
+    np.update(2, "Faded - YouTube - Google Chrome", process="chrome.exe")
+    assert yt.media_playing()
+    np.set_playing("youtube", False)
+    np.update(2, "Faded - YouTube - Google Chrome", process="chrome.exe")
+    assert not yt.media_playing()
+    np.update(2, "Alone - YouTube - Google Chrome", process="chrome.exe")
+    assert yt.media_playing()
+
+
+def test_media_playing_follows_the_player_over_devtools(main):
+    server = pink_fakes.FakeCdpServer().start()
+    try:
+        np = tracker(main)
+        yt = main.YouTubeController(windows=object(), now_playing=np)
+        yt.cdp = main.CdpYouTube(port=server.port)
+        np.update(2, "Faded - YouTube - Google Chrome", process="chrome.exe")
+        yt.cdp.toggle()                     # attaches the tab and pauses the video
+        yt.media_playing(max_age=0)
+        yt._playing_refresh.join(5)
+        assert not yt.media_playing(max_age=60)
+    finally:
+        server.stop()
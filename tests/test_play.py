@@ -0,0 +1,65 @@
+import pytest
+
+
+@pytest.mark.parametrize("command, intent", [
+    ("pink play pause", "spotify_playpause"),
+    ("pink play that again", "spotify_previous"),
+    ("pink play in random order", "spotify_shuffle"),
+    ("pink play 2", "spotify_play_nth"),
+    ("pink play two", "spotify_play_nth"),
+    ("pink play number three", "spotify_play_nth"),
+    ("pink play faded", "spotify_play"),
+])
+def test_play_routing(assistant, command, intent):
+    result = assistant.parse_and_execute(command, speak=False)
+    assert result["intent"] == intent
+
+
+@pytest.mark.parametrize("command, query", [
+    ("pink play stop and go", "stop and go"),
+    ("pink play the pause song", "the pause song"),
+    ("pink play it again", "it again"),
+    ("pink play don't stop believin'", "don't stop believin'"),
+    ("pink play don't stop me now", "don't stop me now"),
+    ("pink play random access memories", "random access memories"),
+])
+def test_titles_with_control_words_are_searched(assistant, command, query):
+    result = assistant.parse_and_execute(command, speak=False)
+    assert result["intent"] == "spotify_play"
+    assert result["slots"].get("query") == query
+
+
+def test_closed_play_phrases_stay_on_the_grammar_path(main):
+    grammar = main.CommandGrammar(wake_word="pink")
+    assert not grammar.needs_open_vocab("pink play two")
+    assert not grammar.needs_open_vocab("pink play")
+    assert grammar.needs_open_vocab("pink play faded")
+
+
+def test_free_text_play_searches(assistant):
+    result = assistant.parse_and_execute("pink play faded", speak=False)
+    assert result["slots"].get("query") == "faded"
+
+
+EVIL = "/music/Evil - a$(touch${IFS}pwned_marker).mp3"
+
+
+def test_player_template_keeps_path_one_argument(main):
+    lib = main.MusicLibrary(":memory:", [], player='vlc --one-instance "{path}"')
+    assert lib._player_argv(EVIL) == ["vlc", "--one-instance", EVIL]
+
+
+def test_player_template_without_placeholder_appends_path(main):
+    lib = main.MusicLibrary(":memory:", [], player="mpv --no-video")
+    assert lib._player_argv(EVIL) == ["mpv", "--no-video", EVIL]
+
+
+def test_local_play_never_uses_a_shell(main, env, tmp_path):
+    track = tmp_path / "Evil - a$(touch${IFS}pwned_marker).mp3"
+    track.write_bytes(b"")
+    lib = main.MusicLibrary(":memory:", [])
+    env.recorder.reset()
+    assert lib.play({"path": str(track)})
+    calls = [c for c in env.recorder.calls if c[1] == "process"]
+    assert calls == [calls[0]] and calls[0][2] == "open" and calls[0][3] == (str(track),)
+    assert not (tmp_path / "pwned_marker").exists()
@@ -0,0 +1,61 @@
+import threading
+
+import pytest
+
+
+@pytest.fixture
+def battery(env, monkeypatch):
+    """Set the fake battery reading: (percent, plugged) or None for a desktop."""
+    def set_reading(reading):
+        monkeypatch.setattr(env, "battery", reading)
+    return set_reading
+
+
+@pytest.mark.parametrize("reading, profile", [
+    ((80, True), "performance"),
+    ((80, False), "low_power"),
+    ((5, True), "performance"),
+    (None, "performance"),
+])
+def test_profile_follows_ac_state(main, battery, reading, profile):
+    battery(reading)
+    policy = main.PowerPolicy()
+    policy.sample()
+    assert policy.name == profile
+    assert policy.battery == (None if reading is None else {"percent": reading[0], "plugged": reading[1]})
+
+
+def test_listeners_hear_each_switch_once(main, battery):
+    policy = main.PowerPolicy()
+    heard = []
+    policy.on_change(lambda name, profile: heard.append((name, profile["camera_fps"])))
+    for reading in ((50, False), (49, False), (49, True)):
+        battery(reading)
+        policy.sample()
+    assert heard == [("low_power", 12), ("performance", 30)]
+    assert policy.counters["switches"] == 2
+
+
+def test_background_work_waits_for_the_charger(main, battery):
+    battery((40, False))
+    policy = main.PowerPolicy()
+    policy.sample()
+    ran = threading.Event()
+    assert policy.defer("scan", ran.set) is False
+    assert policy.defer("scan", ran.set) is False       # deduplicated by key
+    assert not ran.wait(0.05)
+    battery((40, True))
+    policy.sample()
+    assert ran.wait(2)
+    assert policy.counters["deferred_run"] == 1 and policy.status()["deferred_pending"] == []
+
+
+def test_touchscreen_is_retuned_on_profile_switch(main, battery):
+    policy = main.PowerPolicy()
+    ts = main.TouchscreenController(voice_engine=None, power=policy)
+    sent = []
+    ts._send = lambda msg: sent.append(msg) or True
+    ts.running = True
+    battery((30, False))
+    policy.sample()
+    assert sent == [{"type": "profile", "profile": main.POWER_PROFILES["low_power"]}]
@@ -0,0 +1,16 @@
+import os
+
+
+def test_profile_dir_is_anchored_to_the_script(main):
+    assert os.path.isabs(main.CONFIG["profile_dir"])
+    assert os.path.dirname(main.CONFIG["profile_dir"]) == os.path.dirname(os.path.abspath(main.__file__))
+
+
+def test_listeners_follow_start_and_stop(main, tmp_path):
+    calls = []
+    profiler = main.SamplingProfiler(interval=0.001, out_dir=str(tmp_path), name="pink-test")
+    profiler.listeners.append(calls.append)
+    assert profiler.start()
+    collapsed, top = profiler.stop()
+    assert calls == [True, False]
+    assert os.path.basename(collapsed).startswith("pink-test-") and os.path.exists(top)
@@ -0,0 +1,50 @@
+import threading
+
+import pytest
+
+
+class StubBackend:
+    def __init__(self, name, text="pink next", conf=0.9, delay=0.0, fail=False):
+        self.name, self.text, self.conf, self.delay, self.fail = name, text, conf, delay, fail
+        self.calls = 0
+
+    def recognize(self, audio):
+        self.calls += 1
+        threading.Event().wait(self.delay)
+        if self.fail:
+            raise RuntimeError("offline")
+        return self.text, self.conf
+
+
+def test_untried_cloud_backend_is_not_raced(main):
+    local, cloud = StubBackend("vosk", delay=0.05), StubBackend("google")
+    pool = main.RecognizerPool([local, cloud], max_hedge_delay=1.0)
+    assert pool.recognize(b"")[2] == "vosk"
+    assert cloud.calls == 0
+
+
+def test_slow_primary_is_hedged(main):
+    slow, fast = StubBackend("vosk", delay=0.5), StubBackend("remote")
+    pool = main.RecognizerPool([slow, fast], max_hedge_delay=0.05)
+    assert pool.recognize(b"")[2] == "remote"
+
+
+def test_failing_primary_falls_through(main):
+    pool = main.RecognizerPool([StubBackend("vosk", fail=True), StubBackend("remote")], max_hedge_delay=1.0)
+    assert pool.recognize(b"")[2] == "remote"
+
+
+def test_every_backend_failing_raises_request_error(main):
+    pool = main.RecognizerPool([StubBackend("vosk", fail=True), StubBackend("remote", fail=True)])
+    with pytest.raises(main.sr.RequestError):
+        pool.recognize(b"")
+
+
+def test_cloud_backend_is_opt_in(main, monkeypatch):
+    monkeypatch.setitem(main.CONFIG, "asr_pool", {"remote_url": "http://127.0.0.1:1/recognize"})
+    engine = main.VoiceEngine.__new__(main.VoiceEngine)
+    engine.grammar_recognizer = None
+    engine.recognizer = None
+    assert [b.name for b in engine._init_pool().backends] == ["remote"]
+    monkeypatch.setitem(main.CONFIG, "asr_pool", {"remote_url": "http://127.0.0.1:1/recognize", "cloud_fallback": True})
+    assert [b.name for b in engine._init_pool().backends] == ["remote", "google"]
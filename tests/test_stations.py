@@ -0,0 +1,31 @@
+import concurrent.futures
+
+import pytest
+
+
+@pytest.fixture
+def decode_pool():
+    pool = concurrent.futures.ThreadPoolExecutor(max_workers=2)
+    yield pool
+    pool.shutdown(wait=False)
+
+
+def test_station_wake_word_reaches_grammar_and_queue(main, decode_pool):
+    station = main.StationSession("lab", decode_pool, wake_word="jarvis")
+    assert station.assistant.wake_word == "jarvis"
+    assert station.voice.grammar.wake_word == "jarvis"
+    assert station.assistant.actions.plan("jarvis volume up") == ("volume", "delta", 10)
+
+
+def test_station_backends_share_the_decode_pool(main, decode_pool):
+    station = main.StationSession("desk", decode_pool)
+    assert station.voice.pool.executor is decode_pool
+
+
+def test_host_reports_configured_workers(main):
+    host = main.MultiSessionHost(sessions=[{"name": "desk"}], workers=3)
+    try:
+        assert host.status()["workers"] == 3
+    finally:
+        host.pool.shutdown(wait=False)
+
@@ -0,0 +1,57 @@
+import time
+
+import pink_fakes
+
+
+class Voice:
+    def __init__(self):
+        self.spoken = []
+
+    def speak(self, text):
+        self.spoken.append(text)
+
+
+def wait_for(predicate, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return predicate()
+
+
+def supervisor_done(ts):
+    thread = ts._supervisor
+    return thread is None or not thread.is_alive()
+
+
+def test_crashing_worker_is_restarted_with_backoff_then_given_up(main, env):
+    env.recorder.calls.clear()
+    voice = Voice()
+    ts = main.TouchscreenController(voice, worker=pink_fakes.crashing_touchscreen_worker)
+    assert ts.start() is True
+    assert wait_for(lambda: voice.spoken)
+    assert wait_for(lambda: supervisor_done(ts))
+    assert ts.info["restarts"] == ts.max_restarts + 1
+    assert ts.running is False and ts._supervisor is None
+    assert voice.spoken == ["Touchscreen mode stopped after repeated crashes."]
+    delays = [c[3][0] for c in env.recorder.calls if c[1:3] == ("time", "sleep")]
+    assert delays == [ts.restart_backoff * 2 ** i for i in range(ts.max_restarts)]
+    assert ts.status()["worker_alive"] is False
+
+
+def test_worker_exit_after_stop_ends_supervision_without_restart(main):
+    voice = Voice()
+    ts = main.TouchscreenController(voice, worker=pink_fakes.idle_touchscreen_worker)
+    assert ts.start() is True
+    assert wait_for(lambda: ts.info["ready"])
+    proc = ts._proc
+    ts.close()
+    assert wait_for(lambda: not proc.is_alive())
+    assert wait_for(lambda: supervisor_done(ts))
+    assert ts._supervisor is None and ts._proc is proc
+    assert ts.info["restarts"] == 0 and ts.info["ready"] is False
+    assert ts.running is False and voice.spoken == []
+    assert ts.start() is True                            # the next activation respawns the worker
+    assert ts._proc is not proc and wait_for(lambda: ts.info["ready"])
+    ts.close()
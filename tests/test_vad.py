@@ -0,0 +1,82 @@
+import array
+import math
+
+import pytest
+
+RATE, FRAME_MS = 16000, 30
+SAMPLES = RATE * FRAME_MS // 1000
+
+
+def frame(amplitude):
+    return array.array("h", (int(amplitude * math.sin(i / 3.0)) for i in range(SAMPLES))).tobytes()
+
+
+class ScriptedStream:
+    def __init__(self, frames):
+        self.frames = list(frames)
+
+    def read(self, size):
+        return self.frames.pop(0) if self.frames else b""
+
+
+class ScriptedSource:
+    SAMPLE_RATE, SAMPLE_WIDTH = RATE, 2
+
+    def __init__(self, frames):
+        self.stream = ScriptedStream(frames)
+
+
+@pytest.fixture
+def vad(main):
+    v = main.VadEndpointer(frame_ms=FRAME_MS, hangover_ms=210, pre_roll_ms=90, min_speech_ms=90)
+    v.vad = v.strict_vad = None     # exercise the energy detector deterministically
+    return v
+
+
+def test_utterance_ends_after_hangover(vad):
+    quiet, loud = frame(20), frame(4000)
+    source = ScriptedSource([quiet] * 10 + [loud] * 10 + [quiet] * 20)
+    audio = vad.listen(source, timeout=5, phrase_time_limit=6)
+    assert audio is not None
+    stats = vad.last_stats
+    assert stats["endpoint_delay_ms"] == 210
+    assert stats["speech_ms"] == 10 * FRAME_MS
+    # pre-roll + speech + hangover, nothing after the endpoint
+    assert stats["kept_ms"] == (3 + 10 + 7) * FRAME_MS
+    assert len(source.stream.frames) == 20 - 7
+
+
+def test_short_click_does_not_start_an_utterance(vad):
+    quiet, loud = frame(20), frame(4000)
+    source = ScriptedSource([quiet] * 10 + [loud] * 2 + [quiet] * 40)
+    assert vad.listen(source, timeout=1, phrase_time_limit=6) is None
+    assert vad.totals["timeouts"] == 1
+
+
+class PassThroughGate:
+    """Active echo gate that never suppresses anything."""
+    class loopback:
+        available = True
+
+    def __init__(self):
+        self.counters = {}
+
+    def active(self, now):
+        return True
+
+    def media_active(self):
+        return False
+
+    def process(self, frame, width, now, speech_like):
+        return frame, False
+
+
+def test_echo_gate_does_not_change_the_noise_floor(main):
+    frames = [frame(a) for a in (20, 30, 25, 40, 35, 30, 20, 25, 30, 35)]
+    floors = []
+    for gate in (None, PassThroughGate()):
+        v = main.VadEndpointer(frame_ms=FRAME_MS, gate=gate)
+        v.vad = v.strict_vad = None
+        v.listen(ScriptedSource(frames), timeout=1, phrase_time_limit=6)
+        floors.append(v.noise_floor)
+    assert floors[0] == pytest.approx(floors[1])
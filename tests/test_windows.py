@@ -0,0 +1,82 @@
+import pytest
+
+import pink_fakes
+
+
+@pytest.fixture
+def windows(env, monkeypatch):
+    """Fake window backend: a private copy of env.windows, nothing in front, a clean recorder."""
+    monkeypatch.setattr(env, "windows", list(env.windows))
+    monkeypatch.setattr(env, "active", None)
+    env.recorder.reset()
+    return env
+
+
+def window(env, prefix):
+    return next(w for w in env.windows if w.title.startswith(prefix))
+
+
+def calls(env, name):
+    return [c[3] for c in env.recorder.calls if c[1:3] == ("window", name)]
+
+
+def test_handle_is_served_from_cache(main, windows):
+    watcher = pink_fakes.FakeWinEventWatcher(windows)
+    registry = main.WindowRegistry(watcher)
+    spotify = window(windows, "Spotify")
+    assert registry.handle("spotify") == spotify._hWnd
+    assert registry.handle("spotify") == spotify._hWnd
+    assert len(calls(windows, "enumWindows")) == 1
+    assert registry.counters["handle_misses"] == 1 and registry.counters["handle_hits"] == 1
+    assert watcher.tracked == {spotify._hWnd}
+
+
+def test_destroyed_window_invalidates_its_handle(main, windows):
+    watcher = pink_fakes.FakeWinEventWatcher(windows)
+    registry = main.WindowRegistry(watcher)
+    old = window(windows, "Spotify")
+    assert registry.handle("spotify") == old._hWnd
+    windows.windows.remove(old)
+    new = pink_fakes.FakeWindow(windows, "Spotify Premium")
+    windows.windows.append(new)
+    watcher.fire(main.WinEventWatcher.EVENT_OBJECT_DESTROY, old._hWnd)
+    assert registry.handle("spotify") == new._hWnd
+    assert registry.counters["handle_misses"] == 2
+
+
+def test_title_change_re_resolves_youtube(main, windows, monkeypatch):
+    watcher = pink_fakes.FakeWinEventWatcher(windows)
+    registry = main.WindowRegistry(watcher)
+    tab = window(windows, "Faded")
+    assert registry.handle("youtube") == tab._hWnd
+    monkeypatch.setattr(tab, "title", "New Tab - Google Chrome")
+    watcher.fire(main.WinEventWatcher.EVENT_OBJECT_NAMECHANGE, tab._hWnd)
+    assert registry.handle("youtube") is None
+    other = pink_fakes.FakeWindow(windows, "Lofi - YouTube - Microsoft Edge")
+    windows.windows.append(other)
+    watcher.fire(main.WinEventWatcher.EVENT_OBJECT_CREATE, other._hWnd)     # unresolved targets retry
+    assert registry.handle("youtube") == other._hWnd
+
+
+def test_focus_skips_activation_when_already_in_front(main, windows):
+    watcher = pink_fakes.FakeWinEventWatcher(windows)
+    registry = main.WindowRegistry(watcher)
+    spotify = window(windows, "Spotify")
+    watcher.fire(main.WinEventWatcher.EVENT_SYSTEM_FOREGROUND, spotify._hWnd)
+    assert registry.focus("spotify") is True
+    assert registry.counters["focus_elided"] == 1 and registry.counters["focus_activated"] == 0
+
+
+def test_focus_without_hooks_activates_only_a_background_window(main, windows):
+    registry = main.WindowRegistry(main.WinEventWatcher(), settle=0.3)
+    assert registry.live is False
+    spotify = window(windows, "Spotify")
+    windows.active = spotify
+    assert registry.focus("spotify") is True
+    assert calls(windows, "activate") == []
+    assert registry.counters["focus_elided"] == 1
+    windows.active = window(windows, "Faded")
+    assert registry.focus("spotify") is True
+    assert calls(windows, "activate") == [(spotify.title,)]
+    assert ("time", "sleep", (0.3,)) in [c[1:] for c in windows.recorder.calls]
+    assert registry.counters["focus_activated"] == 1 and windows.active is spotify
@@ -0,0 +1,44 @@
+import pytest
+
+import pink_fakes
+
+
+@pytest.mark.parametrize("command, rate", [
+    ("pink youtube speed 1.5", 1.5),
+    ("pink youtube speed 3", 2.0),
+    ("pink youtube speed 150 percent", 1.5),
+    ("pink youtube speed 75 %", 0.75),
+    ("pink youtube double speed", 2.0),
+    ("pink youtube normal speed", 1.0),
+])
+def test_speed_parsing(assistant, command, rate):
+    result = assistant.parse_and_execute(command, speak=False)
+    assert result["intent"] == "youtube_speed"
+    assert assistant.youtube.rate == rate
+
+
+def test_play_query_fallback_is_not_reported_as_success(assistant):
+    result = assistant.parse_and_execute("pink play faded on youtube", speak=False)
+    assert result["intent"] == "youtube_play" and not result["success"]
+
+
+@pytest.fixture
+def cdp_youtube(assistant, main):
+    server = pink_fakes.FakeCdpServer().start()
+    saved = assistant.youtube.cdp, assistant.youtube._cdp_up
+    assistant.youtube.cdp, assistant.youtube._cdp_up = main.CdpYouTube(port=server.port), True
+    yield server
+    assistant.youtube.cdp, assistant.youtube._cdp_up = saved
+    server.stop()
+
+
+@pytest.mark.parametrize("command, seconds", [
+    ("pink youtube go to 90 seconds", 90),
+    ("pink youtube jump to 2 minutes", 120),
+    ("pink youtube restart", 0),
+])
+def test_seek_to_over_devtools(assistant, cdp_youtube, command, seconds):
+    result = assistant.parse_and_execute(command, speak=False)
+    assert result["intent"] == "youtube_seek_to" and result["success"]
+    video = next(iter(cdp_youtube.tabs.values()))["video"]
+    assert video["currentTime"] == seconds